@@ -0,0 +1,75 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from functools import wraps
+from http import HTTPStatus
+from hmac import compare_digest
+
+# 3rd party:
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+# Internal:
+from app.config import Settings
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'admin_only',
+    'admin_token_required'
+]
+
+
+def _is_authorised(request: Request) -> bool:
+    scheme, _, token = request.headers.get("authorization", str()).partition(" ")
+
+    return scheme.lower() == "bearer" and compare_digest(token.encode(), Settings.admin_token.encode())
+
+
+def _unauthorised() -> PlainTextResponse:
+    return PlainTextResponse(
+        HTTPStatus.UNAUTHORIZED.phrase,
+        status_code=HTTPStatus.UNAUTHORIZED.real,
+        headers={"WWW-Authenticate": "Bearer"}
+    )
+
+
+def admin_only(func):
+    """
+    Restricts an endpoint to requests carrying the admin token as a
+    bearer token. Admin endpoints do not exist (404) unless
+    ``ADMIN_TOKEN`` is set.
+    """
+    @wraps(func)
+    async def process(request: Request, *args, **kwargs):
+        if not Settings.admin_token:
+            return PlainTextResponse(
+                HTTPStatus.NOT_FOUND.phrase,
+                status_code=HTTPStatus.NOT_FOUND.real
+            )
+
+        if not _is_authorised(request):
+            return _unauthorised()
+
+        return await func(request, *args, **kwargs)
+
+    return process
+
+
+def admin_token_required(func):
+    """
+    Restricts an endpoint to requests carrying the admin token as a
+    bearer token, where ``ADMIN_TOKEN`` is set - e.g. the metrics, which
+    must remain available to the scrapers otherwise.
+    """
+    @wraps(func)
+    async def process(request: Request, *args, **kwargs):
+        if Settings.admin_token and not _is_authorised(request):
+            return _unauthorised()
+
+        return await func(request, *args, **kwargs)
+
+    return process
+
@@ -0,0 +1,109 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from http import HTTPStatus
+
+# 3rd party:
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+# Internal:
+from app.diagnostics.profiler import arm_profiler, list_profiles, read_profile
+from app.diagnostics.memory import set_memory_tracing, get_memory_reports, get_node_memory
+from app.popularity import get_top_areas
+from .auth import admin_only
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'admin_routes'
+]
+
+
+MAX_PROFILED_REQUESTS = 100
+MAX_TRACEBACK_FRAMES = 25
+
+
+@admin_only
+async def set_profiler(request: Request) -> JSONResponse:
+    try:
+        requests = int(request.query_params.get("requests", 1))
+    except ValueError:
+        return JSONResponse(
+            {"error": "'requests' must be an integer."},
+            status_code=HTTPStatus.BAD_REQUEST.real
+        )
+
+    armed = arm_profiler(min(requests, MAX_PROFILED_REQUESTS))
+
+    return JSONResponse({"armed": armed})
+
+
+@admin_only
+async def get_profiles(request: Request) -> JSONResponse:
+    return JSONResponse(list_profiles())
+
+
+@admin_only
+async def get_profile(request: Request) -> PlainTextResponse:
+    profile = read_profile(request.path_params["profile_id"])
+
+    if profile is None:
+        return PlainTextResponse(
+            HTTPStatus.NOT_FOUND.phrase,
+            status_code=HTTPStatus.NOT_FOUND.real
+        )
+
+    return PlainTextResponse(profile)
+
+
+@admin_only
+async def get_memory(request: Request) -> JSONResponse:
+    return JSONResponse(get_memory_reports())
+
+
+@admin_only
+async def get_memory_of_node(request: Request) -> JSONResponse:
+    return JSONResponse(get_node_memory())
+
+
+@admin_only
+async def set_memory_tracing_frames(request: Request) -> JSONResponse:
+    try:
+        frames = int(request.query_params.get("frames", 1))
+    except ValueError:
+        return JSONResponse(
+            {"error": "'frames' must be an integer."},
+            status_code=HTTPStatus.BAD_REQUEST.real
+        )
+
+    tracing = set_memory_tracing(min(frames, MAX_TRACEBACK_FRAMES))
+
+    return JSONResponse({"frames": tracing})
+
+
+@admin_only
+async def get_popular_areas(request: Request) -> JSONResponse:
+    try:
+        count = int(request.query_params.get("n", 20))
+    except ValueError:
+        return JSONResponse(
+            {"error": "'n' must be an integer."},
+            status_code=HTTPStatus.BAD_REQUEST.real
+        )
+
+    return JSONResponse([area._asdict() for area in get_top_areas(count)])
+
+
+admin_routes = [
+    Route('/easy_read/admin/profiler', endpoint=set_profiler, methods=["POST"]),
+    Route('/easy_read/admin/profiles', endpoint=get_profiles, methods=["GET"]),
+    Route('/easy_read/admin/profiles/{profile_id:str}', endpoint=get_profile, methods=["GET"]),
+    Route('/easy_read/admin/memory', endpoint=get_memory, methods=["GET"]),
+    Route('/easy_read/admin/memory/node', endpoint=get_memory_of_node, methods=["GET"]),
+    Route('/easy_read/admin/memory/tracing', endpoint=set_memory_tracing_frames, methods=["POST"]),
+    Route('/easy_read/admin/popularity', endpoint=get_popular_areas, methods=["GET"]),
+]
@@ -0,0 +1,207 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from asyncio import sleep, wait_for
+from fcntl import lockf, LOCK_EX, LOCK_NB
+from logging import getLogger
+from os import listdir, makedirs, path, remove, replace
+from os.path import abspath, split as split_path, join as join_path
+from time import time
+from typing import Any, Dict, Iterable, Mapping, Tuple, Union
+
+# 3rd party:
+from orjson import dumps, loads
+
+# Internal:
+from app.config import Settings
+from app.database.postgres import Connection
+from app.common.early_refresh import RefreshingValue
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'AREA_TYPES',
+    'AreaHierarchy',
+    'get_area_hierarchy',
+    'get_area_ids'
+]
+
+
+logger = getLogger("app")
+
+curr_dir, _ = split_path(abspath(__file__))
+queries_dir = join_path(curr_dir, "queries")
+
+with open(join_path(queries_dir, "hierarchy.sql")) as fp:
+    hierarchy_query = fp.read()
+
+with open(join_path(queries_dir, "area_reference.sql")) as fp:
+    area_reference_query = fp.read()
+
+
+# Area types that may be addressed directly - from the smallest.
+AREA_TYPES = ("msoa", "ltla", "utla", "region", "nation")
+
+# Area types whose data are shown with those of the areas above, but
+# which do not nest within them.
+ATTACHED_AREA_TYPES = ("nhsTrust",)
+
+POLL_INTERVAL = 0.5  # seconds
+
+
+class AreaHierarchy:
+    """
+    Areas of the types in ``AREA_TYPES``, each with the IDs of the areas
+    whose data make up its page: the area itself, the areas it lies in,
+    and the areas in ``ATTACHED_AREA_TYPES`` that serve it.
+
+    The hierarchy is derived from the postcodes - see ``from_chains`` -
+    and saved to a file that the other workers on the node load.
+    """
+
+    def __init__(self, areas: Dict[Tuple[str, str], Tuple[int, ...]]):
+        self._areas = areas
+
+    @classmethod
+    def from_chains(cls, references: Iterable[Mapping[str, Any]],
+                    chains: Iterable[Mapping[str, Any]]) -> 'AreaHierarchy':
+        """
+        Each chain is the set of areas a postcode lies in. Chains are
+        expected from the most common, so that an area takes its parents
+        from the chain shared by most of its postcodes.
+        """
+        codes = {
+            row["id"]: (row["area_type"], row["area_code"])
+            for row in references
+        }
+
+        areas: Dict[Tuple[str, str], Tuple[int, ...]] = dict()
+
+        for chain in chains:
+            area_ids = [chain[area_type] for area_type in AREA_TYPES]
+            attached = [chain[area_type] for area_type in ATTACHED_AREA_TYPES]
+
+            for index, area_id in enumerate(area_ids):
+                key = codes.get(area_id)
+                if key is None or key in areas:
+                    continue
+
+                areas[key] = tuple(
+                    item for item in (*area_ids[index:], *attached)
+                    if item is not None
+                )
+
+        return cls(areas)
+
+    @classmethod
+    def load(cls, filename: str) -> 'AreaHierarchy':
+        with open(filename, "rb") as fp:
+            payload = loads(fp.read())
+
+        return cls({
+            tuple(key.split("/", 1)): tuple(area_ids)
+            for key, area_ids in payload.items()
+        })
+
+    def save(self, filename: str):
+        payload = {
+            f"{area_type}/{area_code}": area_ids
+            for (area_type, area_code), area_ids in self._areas.items()
+        }
+
+        with open(f"{filename}.tmp", "wb") as fp:
+            fp.write(dumps(payload))
+
+        replace(f"{filename}.tmp", filename)
+
+    def get_area_ids(self, area_type: str, area_code: str) -> Union[Tuple[int, ...], None]:
+        return self._areas.get((area_type, area_code))
+
+    def __len__(self) -> int:
+        return len(self._areas)
+
+
+async def _fetch_hierarchy() -> AreaHierarchy:
+    async with Connection() as conn:
+        references = await conn.fetch(area_reference_query)
+        chains = await conn.fetch(hierarchy_query, timeout=Settings.area_hierarchy_timeout)
+
+    return AreaHierarchy.from_chains(references, chains)
+
+
+def _get_filename() -> str:
+    # One file per period of `AREA_HIERARCHY_TTL`, so that the workers
+    # agree on when the hierarchy is due to be built again.
+    period = int(time() // Settings.area_hierarchy_ttl)
+    return path.join(Settings.shared_cache_dir, f"areas-{period}.json")
+
+
+async def _build_hierarchy(filename: str):
+    hierarchy = await _fetch_hierarchy()
+    hierarchy.save(filename)
+
+    logger.info(f"Built the hierarchy of {len(hierarchy)} areas: {filename}")
+
+    # Workers load the file whole: previous ones are no longer needed.
+    for name in listdir(Settings.shared_cache_dir):
+        previous = path.join(Settings.shared_cache_dir, name)
+        if name.startswith("areas-") and name.endswith(".json") and previous != filename:
+            remove(previous)
+
+
+async def _load_shared_hierarchy() -> AreaHierarchy:
+    makedirs(Settings.shared_cache_dir, exist_ok=True)
+    filename = _get_filename()
+
+    with open(path.join(Settings.shared_cache_dir, "areas.lock"), "a+b") as lock_file:
+        while not path.exists(filename):
+            try:
+                lockf(lock_file, LOCK_EX | LOCK_NB)
+            except OSError:
+                # Being built by another worker.
+                await sleep(POLL_INTERVAL)
+                continue
+
+            # The lock is released as the file is closed.
+            if not path.exists(filename):
+                await _build_hierarchy(filename)
+
+    return AreaHierarchy.load(filename)
+
+
+async def _load_hierarchy() -> AreaHierarchy:
+    """
+    Loads the hierarchy built by one worker on the node - building it
+    first where no worker has yet.
+    """
+    if Settings.area_hierarchy_ttl <= 0:
+        return await _fetch_hierarchy()
+
+    hierarchy = await wait_for(_load_shared_hierarchy(), timeout=Settings.area_hierarchy_timeout)
+    logger.info(f"Loaded the hierarchy of {len(hierarchy)} areas")
+
+    return hierarchy
+
+
+# The hierarchy only changes with the boundaries; it is refreshed in
+# the background ahead of its expiry.
+_hierarchy = RefreshingValue(_load_hierarchy, ttl=Settings.area_hierarchy_ttl)
+
+
+async def get_area_hierarchy() -> AreaHierarchy:
+    return await _hierarchy.get()
+
+
+async def get_area_ids(area_type: str, area_code: str) -> Union[Tuple[int, ...], None]:
+    """
+    Returns the IDs of the areas whose data make up the page of the
+    area, or ``None`` if the area is not in the hierarchy.
+    """
+    if area_type not in AREA_TYPES:
+        return None
+
+    hierarchy = await get_area_hierarchy()
+
+    return hierarchy.get_area_ids(area_type, area_code)
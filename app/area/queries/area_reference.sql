@@ -0,0 +1,3 @@
+SELECT id, area_type, area_code
+FROM covid19.area_reference
+WHERE area_type IN ( 'msoa', 'ltla', 'utla', 'region', 'nation' );
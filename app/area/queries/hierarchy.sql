@@ -0,0 +1,17 @@
+WITH
+     chains AS (
+        SELECT MAX(area_id) FILTER ( WHERE area_type = 'msoa' )     AS msoa,
+               MAX(area_id) FILTER ( WHERE area_type = 'ltla' )     AS ltla,
+               MAX(area_id) FILTER ( WHERE area_type = 'utla' )     AS utla,
+               MAX(area_id) FILTER ( WHERE area_type = 'region' )   AS region,
+               MAX(area_id) FILTER ( WHERE area_type = 'nation' )   AS nation,
+               MAX(area_id) FILTER ( WHERE area_type = 'nhsTrust' ) AS "nhsTrust"
+        FROM covid19.postcode_lookup
+            JOIN covid19.area_reference AS ref ON ref.id = area_id
+        WHERE area_type IN ( 'msoa', 'ltla', 'utla', 'region', 'nation', 'nhsTrust' )
+        GROUP BY postcode
+    )
+SELECT msoa, ltla, utla, region, nation, "nhsTrust", COUNT(*) AS postcodes
+FROM chains
+GROUP BY msoa, ltla, utla, region, nation, "nhsTrust"
+ORDER BY postcodes DESC;
@@ -0,0 +1,110 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from datetime import datetime
+from http import HTTPStatus
+from os.path import abspath, split as split_path, join as join_path
+from typing import Any, List, Tuple, Union, TYPE_CHECKING
+
+# 3rd party:
+from starlette.exceptions import HTTPException
+
+# Imported on first use; see `records_to_frame`.
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Internal:
+from .hierarchy import get_area_ids
+from ..database.postgres import Connection, records_to_frame
+from ..template_processor import render_template
+from ..diagnostics import loop_phase
+from ..resilience import with_fallback
+from ..cache import cached_dataset
+from ..popularity import record_area_view
+from ..common.metric_registry import get_metric_ids
+from ..postcode.views import postcode_page, query_data
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'area_page'
+]
+
+
+curr_dir, _ = split_path(abspath(__file__))
+queries_dir = join_path(curr_dir, "queries")
+
+with open(join_path(queries_dir, "area_data.sql")) as fp:
+    area_data_query = fp.read()
+
+
+async def get_area_data(conn: Any, timestamp: str, area_ids: Tuple[int, ...],
+                        metric_ids: List[int]) -> 'DataFrame':
+    ts = datetime.fromisoformat(timestamp.replace("5Z", ""))
+    partition_ts = f"{ts:%Y_%-m_%-d}"
+    msoa_metric = query_data["local_data"]["msoa_metric"]
+
+    query = area_data_query.format(partition_date=partition_ts)
+
+    substitutes = (
+        metric_ids,
+        list(area_ids),
+        f"{msoa_metric}%",
+        ["%Percentage%", "%Rate%"]
+    )
+
+    records = await conn.fetch_prepared(query, *substitutes)
+
+    with loop_phase("dataframe:area"):
+        df = records_to_frame(
+            records,
+            columns=query_data["local_data"]["column_names"]
+        )
+
+    return df
+
+
+async def area_page(request, timestamp: str, render=True) -> Union[render_template, 'DataFrame']:
+    area_type = request.path_params["area_type"]
+    area_code = request.path_params["area_code"].upper()
+
+    area_ids = await get_area_ids(area_type, area_code)
+
+    if area_ids is None:
+        # Links issued before areas could be addressed directly.
+        if "postcode" in request.query_params:
+            return await postcode_page(request, timestamp, render=render)
+
+        raise HTTPException(HTTPStatus.NOT_FOUND.real, f'Unknown area: "{area_type}/{area_code}"')
+
+    async def fetch_from_db():
+        # Resolved before a connection is taken from the pool.
+        metric_ids = await get_metric_ids()
+
+        async with Connection() as conn:
+            return await get_area_data(conn, timestamp, area_ids, metric_ids)
+
+    async def fetch_data():
+        return await cached_dataset(timestamp, f"area:{area_type}:{area_code}", fetch_from_db)
+
+    data = await with_fallback(("area", area_type, area_code), fetch_data)
+
+    if not render:
+        return data
+
+    record_area_view(area_type, area_code)
+
+    # Imported here: `app.easy_read` depends on this module.
+    from app.easy_read.speculative import schedule_pdf_build
+    schedule_pdf_build(request, timestamp, data)
+
+    return await render_template(
+        request,
+        "html/easy_read.html",
+        context={
+            "timestamp": timestamp,
+            "data": data
+        }
+    )
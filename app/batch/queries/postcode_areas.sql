@@ -0,0 +1,5 @@
+SELECT UPPER(REPLACE(postcode, ' ', ''))   AS postcode,
+       ARRAY_AGG(area_id ORDER BY area_id) AS area_ids
+FROM covid19.postcode_lookup
+WHERE UPPER(REPLACE(postcode, ' ', '')) = ANY( $1::VARCHAR[] )
+GROUP BY UPPER(REPLACE(postcode, ' ', ''));
@@ -0,0 +1,282 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from asyncio import Semaphore, gather
+from http import HTTPStatus
+from logging import getLogger
+from os.path import abspath, split as split_path, join as join_path
+from typing import Any, Dict, List, Tuple, Union, TYPE_CHECKING
+
+# 3rd party:
+from orjson import dumps, OPT_SERIALIZE_NUMPY
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Internal:
+from app.config import Settings
+from app.database.postgres import Connection, PRIMARY
+from app.resilience import with_fallback
+from app.cache import cached_dataset
+from app.common.utils import get_release_timestamp
+from app.common.metric_registry import get_metric_ids
+from app.metrics.registry import Counter
+from app.area.hierarchy import get_area_ids
+from app.area.views import get_area_data
+from app.template_processor.template import SUPPRESSED_MSOA
+from app.postcode.utils import get_validated_postcode
+from app.postcode.bloom import is_unknown_postcode, mark_unknown_postcode
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'ORJSONResponse',
+    'get_batch_data'
+]
+
+
+logger = getLogger("app")
+
+curr_dir, _ = split_path(abspath(__file__))
+queries_dir = join_path(curr_dir, "queries")
+
+with open(join_path(queries_dir, "postcode_areas.sql")) as fp:
+    postcode_areas_query = fp.read()
+
+POSTCODE = "postcode"
+AREA = "area"
+
+INVALID_POSTCODE = "Invalid postcode."
+UNKNOWN_POSTCODE = "Unknown postcode."
+INVALID_AREA = "Invalid area: expected '<area type>/<area code>'."
+UNKNOWN_AREA = "Unknown area."
+UNAVAILABLE = "Data unavailable."
+
+batch_items = Counter(
+    "easyread_batch_items",
+    "Number of postcodes and areas requested in batches, by kind and outcome.",
+    labelnames=("kind", "outcome")
+)
+
+AreaSet = Tuple[int, ...]
+
+# Bounds the queries of all batches in the worker; created on first use
+# so that it binds to the running loop.
+_worker_queries: Union[Semaphore, None] = None
+
+
+def get_worker_semaphore() -> Semaphore:
+    global _worker_queries
+
+    if _worker_queries is None:
+        _worker_queries = Semaphore(max(Settings.batch_max_queries, 1))
+
+    return _worker_queries
+
+
+class ORJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content, option=OPT_SERIALIZE_NUMPY)
+
+
+def get_latest_values(data: 'DataFrame') -> Dict[str, Dict[str, Any]]:
+    """
+    Latest value of each metric, for the most local area that has it -
+    as shown on the pages. Suppressed values are given as ``null``.
+    """
+    latest = data.drop_duplicates("metric")
+    columns = ["metric", "areaType", "areaCode", "areaName", "date", "value"]
+
+    results = dict()
+    for row in latest.loc[:, columns].to_dict("records"):
+        if row["value"] == SUPPRESSED_MSOA:
+            row["value"] = None
+
+        results[row.pop("metric")] = row
+
+    return results
+
+
+async def resolve_postcodes(postcodes: List[str]) -> Dict[str, AreaSet]:
+    """
+    Returns the IDs of the areas each postcode lies in, for those that
+    exist - in one query for all postcodes.
+    """
+    if not postcodes:
+        return dict()
+
+    async with Connection() as conn:
+        records = await conn.fetch_prepared(postcode_areas_query, postcodes)
+        from_primary = conn.is_primary
+
+    found = {
+        record["postcode"]: tuple(record["area_ids"])
+        for record in records
+    }
+
+    missing = [postcode for postcode in postcodes if postcode not in found]
+
+    # Replicas may lag behind: postcodes are only taken to be unknown
+    # once the primary agrees.
+    if missing and not from_primary:
+        async with Connection(role=PRIMARY) as conn:
+            records = await conn.fetch_prepared(postcode_areas_query, missing)
+
+        found.update(
+            (record["postcode"], tuple(record["area_ids"]))
+            for record in records
+        )
+
+    return found
+
+
+async def resolve_area(value: str) -> Union[Tuple[str, AreaSet], str]:
+    """
+    Returns the key of the dataset of the area - as used by its page -
+    and the IDs of the areas that make it up, or else an error.
+    """
+    area_type, _, area_code = value.partition("/")
+
+    if not area_type or not area_code:
+        return INVALID_AREA
+
+    area_code = area_code.upper()
+    area_ids = await get_area_ids(area_type, area_code)
+
+    if area_ids is None:
+        return UNKNOWN_AREA
+
+    return f"area:{area_type}:{area_code}", area_ids
+
+
+async def fetch_area_set(timestamp: str, key: str, area_ids: AreaSet, metric_ids: List[int],
+                         semaphore: Semaphore) -> Dict[str, Dict[str, Any]]:
+    async def fetch_from_db():
+        # Bounds the connections a single request - and all batches in
+        # the worker - may hold.
+        async with semaphore, get_worker_semaphore():
+            async with Connection() as conn:
+                return await get_area_data(conn, timestamp, area_ids, metric_ids)
+
+    async def fetch_data():
+        return await cached_dataset(timestamp, key, fetch_from_db)
+
+    data = await with_fallback(("area_set", area_ids), fetch_data)
+
+    return get_latest_values(data)
+
+
+async def get_batch_data(request: Request) -> JSONResponse:
+    """
+    Latest values of the metrics of the pages for up to
+    ``BATCH_MAX_ITEMS`` postcodes and areas - given as repeated
+    ``postcode`` and ``area`` parameters, the latter as
+    ``<area type>/<area code>``:
+
+        /easy_read/batch?postcode=SW1A1AA&postcode=M11AE&area=ltla/E09000033
+
+    Postcodes and areas are resolved to the sets of areas whose data
+    make up their pages. Each distinct set is fetched once - from the
+    caches of the pages where possible - with no more than
+    ``BATCH_CONCURRENCY`` queries at a time, and no more than
+    ``BATCH_MAX_QUERIES`` across all batches in the worker.
+    """
+    postcodes = list(dict.fromkeys(request.query_params.getlist(POSTCODE)))
+    areas = list(dict.fromkeys(request.query_params.getlist(AREA)))
+
+    if not postcodes and not areas:
+        return ORJSONResponse(
+            {"error": "Expected at least one 'postcode' or 'area' parameter."},
+            status_code=HTTPStatus.BAD_REQUEST.real
+        )
+
+    if len(postcodes) + len(areas) > Settings.batch_max_items:
+        return ORJSONResponse(
+            {"error": f"Expected up to {Settings.batch_max_items} postcodes and areas."},
+            status_code=HTTPStatus.BAD_REQUEST.real
+        )
+
+    timestamp = await get_release_timestamp()
+
+    results: Dict[str, Dict[str, Any]] = {POSTCODE: dict(), AREA: dict()}
+    # Requested items by the set of areas that make up their data.
+    requested: Dict[AreaSet, List[Tuple[str, str]]] = dict()
+    # Datasets by the set of areas: the first key to claim a set is used.
+    keys: Dict[AreaSet, str] = dict()
+
+    # Areas first, so that their sets use the datasets of their pages.
+    for value in areas:
+        resolved = await resolve_area(value)
+
+        if isinstance(resolved, str):
+            results[AREA][value] = {"error": resolved}
+            batch_items.inc(kind=AREA, outcome="unknown" if resolved == UNKNOWN_AREA else "invalid")
+            continue
+
+        key, area_ids = resolved
+        area_set = tuple(sorted(area_ids))
+        keys.setdefault(area_set, key)
+        requested.setdefault(area_set, list()).append((AREA, value))
+
+    validated = dict()
+    for value in postcodes:
+        postcode = get_validated_postcode(value)
+
+        if postcode is None:
+            results[POSTCODE][value] = {"error": INVALID_POSTCODE}
+            batch_items.inc(kind=POSTCODE, outcome="invalid")
+        elif is_unknown_postcode(postcode):
+            results[POSTCODE][value] = {"error": UNKNOWN_POSTCODE}
+            batch_items.inc(kind=POSTCODE, outcome="unknown")
+        else:
+            validated[value] = postcode
+
+    postcode_areas = await resolve_postcodes(list(set(validated.values())))
+
+    for value, postcode in validated.items():
+        area_ids = postcode_areas.get(postcode)
+
+        if area_ids is None:
+            mark_unknown_postcode(postcode)
+            results[POSTCODE][value] = {"error": UNKNOWN_POSTCODE}
+            batch_items.inc(kind=POSTCODE, outcome="unknown")
+            continue
+
+        area_set = tuple(sorted(area_ids))
+        keys.setdefault(area_set, f"area_set:{','.join(map(str, area_set))}")
+        requested.setdefault(area_set, list()).append((POSTCODE, value))
+
+    # Resolved before connections are taken from the pool.
+    metric_ids = await get_metric_ids() if requested else list()
+    semaphore = Semaphore(max(Settings.batch_concurrency, 1))
+
+    area_sets = list(requested)
+    responses = await gather(
+        *(
+            fetch_area_set(timestamp, keys[area_set], area_set, metric_ids, semaphore)
+            for area_set in area_sets
+        ),
+        return_exceptions=True
+    )
+
+    for area_set, response in zip(area_sets, responses):
+        if isinstance(response, BaseException):
+            logger.warning(f"Failed to fetch the data of areas {area_set}: {response!r}")
+            outcome, result = "failed", {"error": UNAVAILABLE}
+        else:
+            outcome, result = "served", {"metrics": response}
+
+        for kind, value in requested[area_set]:
+            results[kind][value] = result
+            batch_items.inc(kind=kind, outcome=outcome)
+
+    # In the order requested.
+    return ORJSONResponse({
+        "timestamp": timestamp,
+        "postcodes": {value: results[POSTCODE][value] for value in postcodes},
+        "areas": {value: results[AREA][value] for value in areas}
+    })
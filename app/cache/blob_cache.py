@@ -0,0 +1,229 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from asyncio import Task, get_running_loop, wait_for
+from datetime import date, datetime
+from decimal import Decimal
+from gzip import compress, decompress
+from hashlib import blake2b
+from logging import getLogger
+from numbers import Integral, Real
+from typing import Any, Dict, Set, Union, TYPE_CHECKING
+
+# 3rd party:
+from orjson import dumps, loads, OPT_PASSTHROUGH_DATETIME, OPT_SERIALIZE_NUMPY
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Internal:
+from app.config import Settings
+from app.storage import AsyncStorageClient
+from app.diagnostics import loop_phase
+from app.common.deadline import no_deadline
+from app.metrics.registry import Counter
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'is_blob_cache_enabled',
+    'get_from_blob',
+    'store_in_blob',
+    'store_frame_in_blob',
+    'encode_frame',
+    'decode_frame'
+]
+
+
+logger = getLogger("app")
+
+BLOB_CONTENT_TYPE = "application/octet-stream"
+BLOB_CACHE_CONTROL = "no-cache, max-age=0"
+DATE_TAG = "$date"
+DATETIME_TAG = "$datetime"
+DECIMAL_TAG = "$decimal"
+
+blob_cache_operations = Counter(
+    "easyread_blob_cache_operations",
+    "Number of operations on the blob storage cache shared by all instances, by outcome.",
+    labelnames=("operation",)
+)
+
+# References to the uploads in flight - the event loop only keeps weak ones.
+_uploads: Set[Task] = set()
+
+
+def is_blob_cache_enabled() -> bool:
+    return bool(Settings.l2_cache_container)
+
+
+def _get_blob_path(timestamp: str, key: str) -> str:
+    # Grouped by release, so that the entries of past releases may be
+    # removed by a lifecycle rule on the prefix.
+    release = timestamp.replace(":", "-")
+    digest = blake2b(key.encode(), digest_size=16).hexdigest()
+    return f"{release}/{digest}"
+
+
+def _encode_value(value: Any) -> Dict[str, str]:
+    if isinstance(value, datetime):
+        return {DATETIME_TAG: value.isoformat()}
+
+    if isinstance(value, date):
+        return {DATE_TAG: value.isoformat()}
+
+    # NUMERIC values arrive as decimals where they are not parsed.
+    if isinstance(value, Decimal):
+        return {DECIMAL_TAG: str(value)}
+
+    if isinstance(value, Integral):
+        return int(value)
+
+    if isinstance(value, Real):
+        return float(value)
+
+    raise TypeError(f"Cannot encode value of type {type(value).__name__}")
+
+
+def _decode_value(value: Any) -> Any:
+    if isinstance(value, dict):
+        if DATE_TAG in value:
+            return date.fromisoformat(value[DATE_TAG])
+
+        if DATETIME_TAG in value:
+            return datetime.fromisoformat(value[DATETIME_TAG])
+
+        if DECIMAL_TAG in value:
+            return Decimal(value[DECIMAL_TAG])
+
+    return value
+
+
+def encode_frame(df: 'DataFrame') -> bytes:
+    """
+    Serialises a data frame as JSON, keeping dates - which the templates
+    rely on - and decimals as such.
+    """
+    payload = {
+        "columns": df.columns.tolist(),
+        "data": df.values.tolist()
+    }
+
+    return dumps(
+        payload,
+        default=_encode_value,
+        option=OPT_PASSTHROUGH_DATETIME | OPT_SERIALIZE_NUMPY
+    )
+
+
+def decode_frame(data: bytes) -> 'DataFrame':
+    from pandas import DataFrame
+
+    payload = loads(data)
+    records = [
+        [_decode_value(value) for value in row]
+        for row in payload["data"]
+    ]
+
+    return DataFrame(records, columns=payload["columns"])
+
+
+async def _download(path: str) -> bytes:
+    async with AsyncStorageClient(Settings.l2_cache_container, path) as client:
+        download = await client.download()
+        return await download.readall()
+
+
+async def get_from_blob(timestamp: str, key: str) -> Union[bytes, None]:
+    """
+    Returns the value stored under ``key`` for the given release by any
+    instance of the service, or ``None``.
+
+    Errors are treated as misses: the cache must never be the reason
+    for a failed request.
+    """
+    if not is_blob_cache_enabled():
+        return None
+
+    from azure.core.exceptions import ResourceNotFoundError
+
+    path = _get_blob_path(timestamp, key)
+
+    try:
+        # A slow cache is worse than none: Postgres is the fallback.
+        data = await wait_for(_download(path), timeout=Settings.l2_cache_timeout)
+    except ResourceNotFoundError:
+        blob_cache_operations.inc(operation="miss")
+        return None
+    except Exception as err:
+        logger.warning(f"Failed to read '{path}' from the blob cache: {err!r}")
+        blob_cache_operations.inc(operation="error")
+        return None
+
+    blob_cache_operations.inc(operation="hit")
+
+    with loop_phase("gzip"):
+        return decompress(data)
+
+
+async def _upload(path: str, value: bytes):
+    try:
+        with loop_phase("gzip"):
+            data = compress(value)
+
+        with no_deadline():
+            client = AsyncStorageClient(
+                Settings.l2_cache_container,
+                path,
+                content_type=BLOB_CONTENT_TYPE,
+                cache_control=BLOB_CACHE_CONTROL,
+                compressed=False
+            )
+
+            async with client:
+                await client.upload(data)
+
+        blob_cache_operations.inc(operation="store")
+    except Exception as err:
+        logger.warning(f"Failed to store '{path}' in the blob cache: {err!r}")
+        blob_cache_operations.inc(operation="error")
+
+
+def store_in_blob(timestamp: str, key: str, value: bytes):
+    """
+    Stores ``value`` under ``key`` for the given release in the
+    background; the response does not wait for the upload.
+
+    Uploads beyond ``L2_CACHE_MAX_UPLOADS`` in flight are dropped.
+    """
+    if not is_blob_cache_enabled():
+        return
+
+    if len(_uploads) >= Settings.l2_cache_max_uploads:
+        blob_cache_operations.inc(operation="dropped")
+        return
+
+    task = get_running_loop().create_task(_upload(_get_blob_path(timestamp, key), value))
+    _uploads.add(task)
+    task.add_done_callback(_uploads.discard)
+
+
+def store_frame_in_blob(timestamp: str, key: str, df: 'DataFrame'):
+    """
+    Stores the data frame under ``key`` for the given release in the
+    background, as with ``store_in_blob``. Data frames that cannot be
+    serialised are not stored.
+    """
+    if not is_blob_cache_enabled():
+        return
+
+    try:
+        value = encode_frame(df)
+    except (TypeError, ValueError) as err:
+        logger.warning(f"Failed to encode '{key}' for the blob cache: {err!r}")
+        blob_cache_operations.inc(operation="error")
+        return
+
+    store_in_blob(timestamp, key, value)
@@ -0,0 +1,164 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from logging import getLogger
+from pickle import dumps, loads, HIGHEST_PROTOCOL
+from typing import Awaitable, Callable, Tuple, Union, TYPE_CHECKING
+
+# 3rd party:
+from starlette.requests import Request
+from starlette.responses import Response
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Internal:
+from app.config import Settings
+from app.diagnostics import register_cache
+from app.resilience import stale_since
+from app.metrics.registry import Counter
+from .shared_memory import SharedMemoryCache
+from .blob_cache import get_from_blob, store_in_blob, store_frame_in_blob, decode_frame
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'render_cache',
+    'get_cached_page',
+    'cache_page',
+    'cached_dataset'
+]
+
+
+logger = getLogger("app")
+
+# Tiers, from the nearest: shared memory on the node, blob storage shared
+# by all instances, and the origin - i.e. Postgres or the renderer.
+NODE_TIER = "node"
+BLOB_TIER = "blob"
+ORIGIN_TIER = "origin"
+
+cache_tier_served = Counter(
+    "easyread_cache_tier_served",
+    "Number of pages and datasets, by the cache tier they were served from.",
+    labelnames=("kind", "tier")
+)
+
+render_cache = SharedMemoryCache(
+    name="render",
+    directory=Settings.shared_cache_dir,
+    slots=Settings.shared_cache_slots,
+    slot_size=Settings.shared_cache_slot_size,
+    ways=Settings.shared_cache_ways
+)
+
+
+def _is_enabled() -> bool:
+    return Settings.shared_cache_slots > 0
+
+
+CachedPage = Tuple[Response, Union[str, None]]
+
+
+def _encode_page(response: Response, view: Union[str, None]) -> bytes:
+    return b"\n".join([response.media_type.encode(), (view or "").encode(), response.body])
+
+
+def _decode_page(value: bytes) -> CachedPage:
+    media_type, view, body = value.split(b"\n", 2)
+    return Response(body, media_type=media_type.decode()), view.decode() or None
+
+
+async def get_cached_page(page_key: str, timestamp: str) -> Union[CachedPage, None]:
+    """
+    Returns the page stored under ``page_key`` for the given release by
+    any worker on the node or - where enabled - any instance of the
+    service, with the view it was stored with; or ``None``.
+    """
+    # Keys include the release: entries of past releases are never read
+    # again, and are left to be evicted.
+    key = f"page:{page_key}"
+
+    if _is_enabled():
+        value = render_cache.get(f"{timestamp}:{key}")
+        if value is not None:
+            cache_tier_served.inc(kind="page", tier=NODE_TIER)
+            return _decode_page(value)
+
+    value = await get_from_blob(timestamp, key)
+    if value is None:
+        return None
+
+    if _is_enabled():
+        render_cache.set(f"{timestamp}:{key}", value)
+
+    cache_tier_served.inc(kind="page", tier=BLOB_TIER)
+    return _decode_page(value)
+
+
+def is_service_request(request: Request) -> bool:
+    return bool(Settings.service_domain) and request.url.hostname == Settings.service_domain
+
+
+def cache_page(page_key: Union[str, None], timestamp: str, response: Response,
+               request: Request, view: Union[str, None] = None):
+    # Pages rendered from stale data must not be shared, nor pages
+    # without a key. Keys do not include the host: only pages rendered
+    # for the service domain - that of `request` - may be shared by the
+    # workers. The view - see `app.popularity.viewed_area` - is kept so
+    # that pages served from the caches still count as views.
+    if page_key is None or response.status_code != 200 or stale_since.get() is not None:
+        return
+
+    if not is_service_request(request):
+        logger.warning(f"Page '{page_key}' rendered for '{request.url.hostname}' not cached")
+        return
+
+    key = f"page:{page_key}"
+    value = _encode_page(response, view)
+    cache_tier_served.inc(kind="page", tier=ORIGIN_TIER)
+
+    if _is_enabled():
+        render_cache.set(f"{timestamp}:{key}", value)
+
+    store_in_blob(timestamp, key, value)
+
+
+async def cached_dataset(timestamp: str, key: str, fetch: Callable[[], Awaitable['DataFrame']]) -> 'DataFrame':
+    """
+    Returns the dataset stored under ``key`` for the given release by any
+    worker on the node or - where enabled - any instance of the service,
+    or else the result of ``fetch``, which is then stored in both.
+    """
+    node_key = f"{timestamp}:dataset:{key}"
+
+    if _is_enabled():
+        value = render_cache.get(node_key)
+        if value is not None:
+            cache_tier_served.inc(kind="dataset", tier=NODE_TIER)
+            return loads(value)
+
+    data = None
+    value = await get_from_blob(timestamp, f"dataset:{key}")
+    if value is not None:
+        try:
+            data = decode_frame(value)
+            tier = BLOB_TIER
+        except ValueError as err:
+            logger.warning(f"Discarded an invalid dataset from the blob cache: {err}")
+
+    if data is None:
+        data = await fetch()
+        tier = ORIGIN_TIER
+        store_frame_in_blob(timestamp, f"dataset:{key}", data)
+
+    if _is_enabled():
+        render_cache.set(node_key, dumps(data, protocol=HIGHEST_PROTOCOL))
+
+    cache_tier_served.inc(kind="dataset", tier=tier)
+    return data
+
+
+register_cache("shared_render_cache", render_cache)
@@ -0,0 +1,239 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import mmap
+from logging import getLogger
+from fcntl import lockf, LOCK_EX, LOCK_UN
+from hashlib import blake2b
+from os import getpid, makedirs, path, posix_fallocate
+from struct import Struct
+from threading import Lock
+from time import time
+from typing import Union
+
+# 3rd party:
+
+# Internal:
+from app.metrics.registry import Counter
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'SharedMemoryCache'
+]
+
+
+# Slot header: sequence, key hash, last used, expiry, key length, value length.
+_slot_struct = Struct("QQddII")
+_seq_struct = Struct("Q")
+_time_struct = Struct("d")
+
+LAST_USED_OFFSET = 16
+
+logger = getLogger("app")
+
+shared_cache_operations = Counter(
+    "easyread_shared_cache_operations",
+    "Number of operations on the node-local shared cache, by cache and outcome.",
+    labelnames=("cache", "operation")
+)
+
+
+def _hash_key(key: bytes) -> int:
+    # Must be stable across processes; `hash()` is salted per process.
+    return int.from_bytes(blake2b(key, digest_size=8).digest(), "little") or 1
+
+
+class SharedMemoryCache:
+    """
+    Cache of byte strings in a memory-mapped file - e.g. under ``/dev/shm`` -
+    shared by all workers on the node: an entry stored by any worker is
+    visible to all others.
+
+    Layout
+    ------
+    The file is a fixed number of fixed-size slots, grouped into sets of
+    ``ways`` slots. A key may only be stored in the set given by its hash,
+    so that a lookup reads at most ``ways`` slot headers. When the set is
+    full, the least recently used slot of the set is evicted.
+
+    Each slot starts with a header (see ``_slot_struct``) followed by the
+    key and the value. Entries that do not fit in a slot are not cached.
+
+    Concurrency
+    -----------
+    Reads take no lock. Every slot carries a sequence number that writers
+    make odd for the duration of a write; a reader that sees an odd number,
+    or a number that has changed by the end of the read, treats the lookup
+    as a miss. Writers to the same set are serialised with a byte-range
+    lock on the set.
+    """
+
+    def __init__(self, name: str, directory: str, slots: int, slot_size: int, ways: int = 8):
+        self.name = name
+        self.ways = max(min(ways, slots), 1)
+        self.sets = max(slots // self.ways, 1)
+        self.slot_size = slot_size
+        self.size = self.sets * self.ways * self.slot_size
+        # The layout is part of the name, so that processes with different
+        # settings never map the same file.
+        self.filename = path.join(directory, f"{name}-{self.sets}x{self.ways}x{slot_size}.cache")
+        self._directory = directory
+        self._buffer: Union[mmap.mmap, None] = None
+        self._pid = None
+        self._lock = Lock()
+        self._disabled = False
+
+    def _get_buffer(self) -> mmap.mmap:
+        pid = getpid()
+        if self._buffer is not None and self._pid == pid:
+            return self._buffer
+
+        with self._lock:
+            if self._buffer is None or self._pid != pid:
+                makedirs(self._directory, exist_ok=True)
+                self._fp = open(self.filename, "a+b")
+
+                # Zero-filled on creation; an empty slot has a zero hash. The
+                # space is allocated upfront: writing to a page that cannot be
+                # allocated later on would crash the process.
+                lockf(self._fp, LOCK_EX)
+                try:
+                    if self._fp.seek(0, 2) < self.size:
+                        posix_fallocate(self._fp.fileno(), 0, self.size)
+                finally:
+                    lockf(self._fp, LOCK_UN)
+
+                self._buffer = mmap.mmap(self._fp.fileno(), self.size)
+                self._pid = pid
+
+        return self._buffer
+
+    def _try_get_buffer(self) -> Union[mmap.mmap, None]:
+        if self._disabled:
+            return None
+
+        try:
+            return self._get_buffer()
+        except OSError as err:
+            logger.warning(f"Shared cache '{self.name}' disabled: {err}")
+            self._disabled = True
+            return None
+
+    def _slot_offsets(self, key_hash: int):
+        first = (key_hash % self.sets) * self.ways
+        return [(first + way) * self.slot_size for way in range(self.ways)]
+
+    def get(self, key: str) -> Union[bytes, None]:
+        buffer = self._try_get_buffer()
+        if buffer is None:
+            return None
+
+        raw_key = key.encode()
+        key_hash = _hash_key(raw_key)
+        now = time()
+
+        for offset in self._slot_offsets(key_hash):
+            seq, slot_hash, _, expires, key_len, value_len = _slot_struct.unpack_from(buffer, offset)
+
+            if slot_hash != key_hash or key_len != len(raw_key):
+                continue
+
+            start = offset + _slot_struct.size
+            data = buffer[start: start + key_len + value_len]
+
+            # Written while being read - or already being written.
+            if seq & 1 or _seq_struct.unpack_from(buffer, offset)[0] != seq:
+                break
+
+            if data[:key_len] != raw_key:
+                continue
+
+            if expires and expires < now:
+                break
+
+            # Unsynchronised; a lost update only makes the LRU less exact.
+            _time_struct.pack_into(buffer, offset + LAST_USED_OFFSET, now)
+            shared_cache_operations.inc(cache=self.name, operation="hit")
+            return data[key_len:]
+
+        shared_cache_operations.inc(cache=self.name, operation="miss")
+        return None
+
+    def set(self, key: str, value: bytes, ttl: Union[float, None] = None) -> bool:
+        """
+        Stores ``value`` under ``key`` for ``ttl`` seconds - or until
+        evicted if ``None``.
+
+        Returns
+        -------
+        bool
+            Whether the value was stored; values that do not fit in a
+            slot are not.
+        """
+        buffer = self._try_get_buffer()
+        if buffer is None:
+            return False
+
+        raw_key = key.encode()
+        if _slot_struct.size + len(raw_key) + len(value) > self.slot_size:
+            shared_cache_operations.inc(cache=self.name, operation="too_large")
+            return False
+
+        key_hash = _hash_key(raw_key)
+        offsets = self._slot_offsets(key_hash)
+        now = time()
+        expires = now + ttl if ttl else 0.0
+
+        lockf(self._fp, LOCK_EX, self.ways * self.slot_size, offsets[0])
+        try:
+            target = None
+            for offset in offsets:
+                _, slot_hash, _, _, key_len, _ = _slot_struct.unpack_from(buffer, offset)
+                start = offset + _slot_struct.size
+
+                if slot_hash == key_hash and buffer[start: start + key_len] == raw_key:
+                    target = offset
+                    break
+
+            if target is None:
+                # An empty slot if there is one, or else the least recently used.
+                candidates = list()
+                for offset in offsets:
+                    _, slot_hash, last_used, *_ = _slot_struct.unpack_from(buffer, offset)
+                    candidates.append((last_used if slot_hash else -1.0, offset))
+
+                last_used, target = min(candidates)
+
+                if last_used >= 0:
+                    shared_cache_operations.inc(cache=self.name, operation="evict")
+
+            seq = _seq_struct.unpack_from(buffer, target)[0]
+            _seq_struct.pack_into(buffer, target, seq + 1)
+
+            start = target + _slot_struct.size
+            buffer[start: start + len(raw_key) + len(value)] = raw_key + value
+            _slot_struct.pack_into(
+                buffer, target, seq + 1, key_hash, now, expires, len(raw_key), len(value)
+            )
+
+            _seq_struct.pack_into(buffer, target, seq + 2)
+        finally:
+            lockf(self._fp, LOCK_UN, self.ways * self.slot_size, offsets[0])
+
+        shared_cache_operations.inc(cache=self.name, operation="store")
+        return True
+
+    def __len__(self) -> int:
+        buffer = self._try_get_buffer()
+        if buffer is None:
+            return 0
+
+        slots = self.sets * self.ways
+
+        return sum(
+            _slot_struct.unpack_from(buffer, index * self.slot_size)[1] != 0
+            for index in range(slots)
+        )
@@ -0,0 +1,123 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from asyncio import iscoroutine, wait_for, TimeoutError as AsyncTimeoutError
+from contextlib import contextmanager
+from contextvars import ContextVar
+from time import monotonic
+from typing import Awaitable, TypeVar, Union
+
+# 3rd party:
+
+# Internal:
+from app.metrics.instruments import deadline_exceeded
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'DeadlineExceeded',
+    'set_deadline',
+    'get_remaining',
+    'get_timeout',
+    'with_deadline',
+    'no_deadline'
+]
+
+
+T = TypeVar("T")
+
+request_deadline: ContextVar[Union[float, None]] = ContextVar("request_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    def __init__(self, stage: str):
+        self.stage = stage
+        deadline_exceeded.inc(stage=stage)
+        super().__init__(f"Request deadline exceeded before or during '{stage}'.")
+
+
+def set_deadline(budget: float):
+    """
+    Sets the deadline of the current request to ``budget`` seconds from now.
+    """
+    return request_deadline.set(monotonic() + budget)
+
+
+def get_remaining() -> Union[float, None]:
+    """
+    Seconds left in the budget of the current request, or ``None`` if
+    there is no deadline - e.g. outside of a request.
+    """
+    deadline = request_deadline.get()
+
+    if deadline is None:
+        return None
+
+    return deadline - monotonic()
+
+
+def get_timeout(stage: str, default: float) -> float:
+    """
+    Timeout for an operation: the smaller of ``default`` and the remaining
+    budget of the request.
+
+    Raises
+    ------
+    DeadlineExceeded
+        If the budget is already exhausted; there is no point in starting
+        an operation whose result cannot be used.
+    """
+    remaining = get_remaining()
+
+    if remaining is None:
+        return default
+
+    if remaining <= 0:
+        raise DeadlineExceeded(stage)
+
+    return min(default, remaining)
+
+
+async def with_deadline(awaitable: Awaitable[T], stage: str, default: float) -> T:
+    """
+    Awaits ``awaitable`` within the timeout given by ``get_timeout``,
+    cancelling it once the time is up.
+
+    Raises
+    ------
+    DeadlineExceeded
+        If the request deadline was the limiting factor.
+
+    asyncio.TimeoutError
+        If the operation took longer than ``default``.
+    """
+    try:
+        timeout = get_timeout(stage, default)
+    except DeadlineExceeded:
+        # Not awaited - the coroutine must be closed to avoid warnings.
+        if iscoroutine(awaitable):
+            awaitable.close()
+        raise
+
+    try:
+        return await wait_for(awaitable, timeout=timeout)
+    except AsyncTimeoutError:
+        remaining = get_remaining()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded(stage)
+        raise
+
+
+@contextmanager
+def no_deadline():
+    """
+    Lifts the deadline for the enclosed block - e.g. for the clean-up
+    that must run once the request has already run out of time.
+    """
+    token = request_deadline.set(None)
+    try:
+        yield
+    finally:
+        request_deadline.reset(token)
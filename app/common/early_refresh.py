@@ -0,0 +1,118 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from asyncio import Future, Task, get_running_loop, shield
+from logging import getLogger
+from math import log
+from random import random
+from time import monotonic
+from typing import Awaitable, Callable, Generic, TypeVar, Union
+
+# 3rd party:
+
+# Internal:
+from app.config import Settings
+from app.common.deadline import no_deadline
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'RefreshingValue',
+    'is_early_refresh_due'
+]
+
+
+T = TypeVar("T")
+
+logger = getLogger("app")
+
+
+def is_early_refresh_due(delta: float, expires: float, now: float, beta: float = 1.0) -> bool:
+    """
+    Probabilistic early recomputation ("XFetch"): whether to recompute a
+    value that expires at ``expires`` and takes ``delta`` seconds to
+    compute, ahead of its expiry.
+
+    The probability rises as the expiry approaches, and is higher for
+    values that are slow to compute; ``beta`` above 1 favours earlier
+    refreshes. As each process draws its own number, refreshes of the
+    same value are spread out instead of happening all at once at the
+    point of expiry.
+    """
+    # `1 - random()` is in (0, 1]; `log(0)` is undefined.
+    return now - delta * beta * log(1 - random()) >= expires
+
+
+class RefreshingValue(Generic[T]):
+    """
+    Per-worker cache of the result of ``fetch`` for ``ttl`` seconds.
+
+    Once the value has expired, callers wait for a single fetch shared
+    among them. Ahead of the expiry, the value is refreshed in the
+    background - see ``is_early_refresh_due`` - while callers carry on
+    with the current one.
+
+    A ``ttl`` of zero disables the cache: every call fetches the value.
+    """
+
+    def __init__(self, fetch: Callable[[], Awaitable[T]], ttl: float,
+                 beta: Union[float, None] = None):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.beta = Settings.early_refresh_beta if beta is None else beta
+        self._value: Union[T, None] = None
+        self._expires = 0.0
+        self._delta = 0.0
+        self._in_flight: Union[Future, None] = None
+
+    async def _fetch(self) -> T:
+        start = monotonic()
+        value = await self.fetch()
+        end = monotonic()
+
+        self._value = value
+        self._delta = end - start
+        self._expires = end + self.ttl
+
+        return value
+
+    def _start_fetch(self) -> Future:
+        if self._in_flight is None or self._in_flight.done():
+            # Not bound by the deadline of the request that happened to
+            # start it: other callers may be waiting for it.
+            with no_deadline():
+                self._in_flight: Task = get_running_loop().create_task(self._fetch())
+
+            self._in_flight.add_done_callback(self._log_failure)
+
+        return self._in_flight
+
+    @staticmethod
+    def _log_failure(task: Task):
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning(f"Failed to refresh a cached value: {task.exception()!r}")
+
+    def refresh(self):
+        """
+        Fetches the value again in the background - e.g. when it is known
+        to have changed. Callers carry on with the current value meanwhile.
+        """
+        if self.ttl > 0:
+            self._start_fetch()
+
+    async def get(self) -> T:
+        if self.ttl <= 0:
+            return await self.fetch()
+
+        now = monotonic()
+        if self._value is not None and now < self._expires:
+            if is_early_refresh_due(self._delta, self._expires, now, self.beta):
+                self._start_fetch()
+
+            return self._value
+
+        # Cancelling one caller must not cancel the fetch the others
+        # are waiting for.
+        return await shield(self._start_fetch())
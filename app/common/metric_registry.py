@@ -0,0 +1,85 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from json import load
+from logging import getLogger
+from math import inf
+from os.path import abspath, split as split_path, join as join_path
+from typing import Iterable, List, Union
+
+# 3rd party:
+
+# Internal:
+from app.database.postgres import Connection
+from app.common.early_refresh import RefreshingValue
+from app.common.utils import on_release_change
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'METRICS',
+    'MetricRegistry',
+    'get_metric_ids'
+]
+
+
+logger = getLogger("app")
+
+curr_dir, _ = split_path(abspath(__file__))
+
+with open(join_path(curr_dir, "queries", "metric_ids.sql")) as fp:
+    metric_ids_query = fp.read()
+
+# Metrics shown on the pages - on the landing page for England, and on
+# the pages of postcodes and areas for the most local area that has them.
+with open(join_path(curr_dir, "assets", "metrics.json")) as fp:
+    METRICS: List[str] = load(fp)
+
+
+class MetricRegistry:
+    """
+    IDs of metrics in ``metric_reference``, resolved from their names -
+    case-insensitively - once per worker, and again in the background
+    whenever the worker sees a new release.
+
+    Queries then filter the time series by ``metric_id``, instead of
+    matching the names of all metrics on each request.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.names = list(names)
+        self._ids = RefreshingValue(self._resolve, ttl=inf)
+
+    async def _resolve(self) -> List[int]:
+        async with Connection() as conn:
+            records = await conn.fetch(metric_ids_query, self.names)
+
+        found = {record["metric"].lower() for record in records}
+        missing = [name for name in self.names if name.lower() not in found]
+
+        if missing:
+            logger.warning(f"Metrics not found in the database: {', '.join(missing)}")
+
+        return [record["id"] for record in records]
+
+    async def get_ids(self) -> List[int]:
+        return await self._ids.get()
+
+    def refresh(self, timestamp: Union[str, None] = None):
+        self._ids.refresh()
+
+
+metric_registry = MetricRegistry(METRICS)
+
+
+async def get_metric_ids() -> List[int]:
+    """
+    Returns the IDs of the metrics in ``METRICS``.
+    """
+    return await metric_registry.get_ids()
+
+
+# Metrics may be added with a release.
+on_release_change(metric_registry.refresh)
@@ -0,0 +1,98 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import gc
+from importlib import import_module
+from time import perf_counter
+from typing import Any, Dict
+
+# 3rd party:
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'preload',
+    'import_deferred_modules'
+]
+
+
+# Everything but `app.main`: building the app starts the telemetry
+# exporters, whose threads would not survive the fork.
+# Heavy dependencies that are only imported on first use on their
+# code paths, so that they are not paid for by the import of the app.
+DEFERRED_MODULES = (
+    "pandas",
+    "azure.storage.blob.aio",
+    "latex",
+)
+
+PRELOADED_MODULES = (
+    "app.views",
+    "app.easy_read",
+    "app.healthcheck",
+    "app.exceptions",
+    "app.admin",
+    "app.metrics",
+    "app.middleware.tracers.starlette",
+    "app.middleware.admission",
+    "app.middleware.deadline",
+)
+
+
+def import_deferred_modules() -> int:
+    """
+    Imports the modules otherwise deferred to first use - e.g. during
+    the warm-up, so that no request has to wait for them.
+    """
+    for name in DEFERRED_MODULES:
+        import_module(name)
+
+    return len(DEFERRED_MODULES)
+
+
+def preload() -> Dict[str, Any]:
+    """
+    Runs in the gunicorn master before the workers are forked.
+
+    Imports the application - and with it, pandas, the Azure SDK and
+    opencensus - loads the queries and query parameters, and compiles
+    the templates, so that the workers share these pages copy-on-write
+    instead of building their own copies.
+
+    The objects created so far are then moved out of reach of the
+    garbage collector: collections in the workers would otherwise touch
+    - and so copy - the pages that hold them.
+    """
+    start = perf_counter()
+
+    # Collections during the imports would free slots in the pages to
+    # be shared, which the workers would then fill - and copy.
+    gc.disable()
+
+    for name in PRELOADED_MODULES:
+        import_module(name)
+
+    import_deferred_modules()
+
+    from app.template_processor.template import compile_templates
+    from app.metrics.registry import registry
+
+    templates = compile_templates()
+
+    # Values set during the imports are inherited by the workers, but
+    # must not be exposed as those of the master.
+    registry.discard_files()
+
+    gc.freeze()
+    gc.enable()
+
+    return {
+        "preloaded_modules": len(PRELOADED_MODULES) + len(DEFERRED_MODULES),
+        "preloaded_templates": templates,
+        "frozen_objects": gc.get_freeze_count(),
+        "preload_duration": round(perf_counter() - start, 3)
+    }
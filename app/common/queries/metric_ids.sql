@@ -0,0 +1,3 @@
+SELECT id, metric
+FROM covid19.metric_reference
+WHERE metric ILIKE ANY( $1::VARCHAR[] );
@@ -0,0 +1,155 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from asyncio import Task, get_running_loop, sleep, wait_for
+from fcntl import lockf, LOCK_EX, LOCK_NB
+from logging import getLogger
+from os import makedirs, path
+from random import uniform
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Union
+
+# 3rd party:
+
+# Internal:
+from app.config import Settings
+from app.common.deadline import set_deadline, request_deadline
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'ReleaseSwitch'
+]
+
+
+logger = getLogger("app")
+
+POLL_INTERVAL = 0.5  # seconds
+
+WARMED = "warmed"
+WAITED = "waited"
+FAILED = "failed"
+
+
+class ReleaseSwitch:
+    """
+    Decides which release the worker serves.
+
+    The first release seen is served straight away. When a new one is
+    published, the worker carries on serving the previous one - whose
+    pages and datasets are already cached - while the new one is warmed,
+    and switches once it is ready:
+
+    1. the worker waits for a random delay of up to ``RELEASE_STAGGER``
+       seconds, so that the nodes - and the workers on each node - do
+       not all query the database at the moment of the release;
+    2. the first worker on the node to wake up runs the warmer for the
+       new release and marks it as ready in ``SHARED_CACHE_DIR``; the
+       others wait for the mark, and then serve what the warmer stored
+       in the shared caches.
+
+    Whatever the outcome, the worker switches within
+    ``RELEASE_SWITCH_TIMEOUT`` seconds of seeing the new release.
+    """
+
+    def __init__(self, on_switch: Callable[[str], Any]):
+        self.serving: Union[str, None] = None
+        self.latest: Union[str, None] = None
+        self._on_switch = on_switch
+        self._warmer: Union[Callable[[str], Awaitable[Any]], None] = None
+        self._pending: Dict[str, Task] = dict()
+
+    def set_warmer(self, warmer: Callable[[str], Awaitable[Any]]):
+        self._warmer = warmer
+
+    def resolve(self, latest: str) -> str:
+        """
+        Returns the release to be served, given the latest one published.
+        """
+        self.latest = latest
+
+        if self.serving is None or Settings.release_switch_timeout <= 0:
+            self._switch(latest, WARMED)
+        elif latest != self.serving and latest not in self._pending:
+            # The deadline of the request is lifted below.
+            self._pending[latest] = get_running_loop().create_task(self._prepare(latest))
+
+        return self.serving
+
+    def _switch(self, release: str, outcome: str, started: Union[float, None] = None):
+        previous, self.serving = self.serving, release
+
+        if previous is None or previous == release:
+            self._on_switch(release)
+            return
+
+        logger.warning(
+            f"Switched from release {previous} to {release} ({outcome})",
+            extra=dict(
+                custom_dimensions=dict(
+                    event="release_switched",
+                    previous=previous,
+                    release=release,
+                    outcome=outcome,
+                    duration=monotonic() - started if started else None,
+                    server_location=Settings.server_location
+                )
+            )
+        )
+
+        self._on_switch(release)
+
+    def _get_marker(self, release: str) -> str:
+        return path.join(Settings.shared_cache_dir, f"release-{release.replace(':', '-')}.ready")
+
+    async def _warm(self, release: str):
+        if self._warmer is not None:
+            await self._warmer(release)
+
+    async def _stage(self, release: str) -> str:
+        await sleep(uniform(0, Settings.release_stagger))
+
+        if Settings.shared_cache_slots <= 0:
+            # Nothing is shared on the node: each worker warms its own.
+            await self._warm(release)
+            return WARMED
+
+        makedirs(Settings.shared_cache_dir, exist_ok=True)
+        marker = self._get_marker(release)
+
+        with open(path.join(Settings.shared_cache_dir, "release.lock"), "a+b") as lock_file:
+            while not path.exists(marker):
+                try:
+                    lockf(lock_file, LOCK_EX | LOCK_NB)
+                except OSError:
+                    # Being warmed by another worker. The lock is released
+                    # by the kernel should that worker die.
+                    await sleep(POLL_INTERVAL)
+                    continue
+
+                # The lock is released as the file is closed.
+                if not path.exists(marker):
+                    await self._warm(release)
+                    open(marker, "w").close()
+                    return WARMED
+
+        return WAITED
+
+    async def _prepare(self, release: str):
+        started = monotonic()
+        token = set_deadline(Settings.release_switch_timeout)
+
+        try:
+            outcome = await wait_for(self._stage(release), timeout=Settings.release_switch_timeout)
+        except Exception as err:
+            logger.warning(f"Failed to prepare release {release}: {err!r}")
+            outcome = FAILED
+        finally:
+            request_deadline.reset(token)
+            self._pending.pop(release, None)
+
+        # A later release may have been published in the meantime.
+        if release == self.latest:
+            self._switch(release, outcome, started)
@@ -0,0 +1,58 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from hmac import compare_digest, new as new_hmac
+from hashlib import sha256
+from time import time
+from typing import Union
+
+# 3rd party:
+
+# Internal:
+from app.config import Settings
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'sign_value',
+    'verify_signed_value'
+]
+
+
+def sign_value(value: str, expires: int) -> str:
+    payload = f"{value}.{expires}"
+    signature = new_hmac(Settings.admin_token.encode(), payload.encode(), sha256).hexdigest()
+    return f"{payload}.{signature}"
+
+
+def verify_signed_value(signed: Union[str, None]) -> Union[str, None]:
+    """
+    Verifies a value produced by ``sign_value`` - i.e. ``<value>.<expires>.<signature>``
+    with the signature being the HMAC-SHA256 of ``<value>.<expires>`` using
+    the admin token as the key.
+
+    Returns
+    -------
+    Union[str, None]
+        The value if the signature is valid and has not expired, otherwise ``None``.
+    """
+    if not signed or not Settings.admin_token:
+        return None
+
+    try:
+        payload, signature = signed.rsplit(".", 1)
+        value, expires = payload.rsplit(".", 1)
+        expires = int(expires)
+    except ValueError:
+        return None
+
+    if expires < time():
+        return None
+
+    expected = sign_value(value, expires).rsplit(".", 1)[1]
+    if not compare_digest(signature.encode(), expected.encode()):
+        return None
+
+    return value
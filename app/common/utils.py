@@ -13,15 +13,28 @@ Contributors:  Pouria Hadjibagheri
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
 from operator import itemgetter
+from logging import getLogger
+from typing import Any, Callable, Dict, List, Union
 
 # 3rd party:
+from starlette.requests import Request
+from starlette.routing import Router
 
 # Internal:
 from app.storage import AsyncStorageClient
 from app.config import Settings
+from app.resilience.breaker import storage_breaker
+from app.resilience.last_known_good import with_fallback
+from app.common.early_refresh import RefreshingValue
+from app.common.release import ReleaseSwitch
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
+logger = getLogger("app")
+
+_release_listeners: List[Callable[[str], Any]] = list()
+_last_release: Union[str, None] = None
+
 get_value = itemgetter("value")
 get_area_type = itemgetter("areaType")
 
@@ -61,9 +74,71 @@ def add_instance_role_id(envelope):
     return True
 
 
-async def get_release_timestamp():
+def get_synthetic_request(router: Router, path: str = "/", query_string: str = "",
+                          path_params: Union[Dict[str, str], None] = None) -> Request:
+    """
+    Request for the service domain, used to render pages outside of
+    a request - e.g. at startup.
+    """
+    host = Settings.service_domain or "localhost"
+
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "scheme": "https",
+        "server": (host, 443),
+        "path": path,
+        "root_path": "",
+        "query_string": query_string.encode(),
+        "headers": [(b"host", host.encode())],
+        "path_params": path_params or dict(),
+        "router": router
+    })
+
+
+def on_release_change(callback: Callable[[str], Any]):
+    """
+    Registers ``callback`` to be called with the new timestamp whenever
+    the worker sees a new release.
+    """
+    _release_listeners.append(callback)
+
+
+def _notify_release(timestamp: str):
+    global _last_release
+
+    if timestamp == _last_release:
+        return
+
+    _last_release = timestamp
+
+    for callback in _release_listeners:
+        try:
+            callback(timestamp)
+        except Exception as err:
+            logger.exception(f"Release change listener failed: {err}")
+
+
+async def _download_release_timestamp() -> str:
     async with AsyncStorageClient(**Settings.latest_published_timestamp) as client:
         data = await client.download()
-        timestamp = await data.readall()
+        timestamp = await storage_breaker.call(data.readall(), Settings.storage_timeout)
 
     return timestamp.decode()
+
+
+_latest_release = RefreshingValue(_download_release_timestamp, ttl=Settings.release_timestamp_ttl)
+release_switch = ReleaseSwitch(on_switch=_notify_release)
+
+
+async def get_latest_release_timestamp() -> str:
+    return await with_fallback("release_timestamp", _latest_release.get)
+
+
+async def get_release_timestamp() -> str:
+    """
+    Returns the timestamp of the release to be served - which, for a
+    little while after a new release, is the previous one. See
+    ``ReleaseSwitch``.
+    """
+    return release_switch.resolve(await get_latest_release_timestamp())
@@ -23,6 +23,76 @@ class Settings:
     server_location = getenv('SERVER_LOCATION', "N/A")
     log_level = getenv("LOG_LEVEL", "INFO")
     healthcheck_path = "healthcheck"
+    metrics_path = "metrics"
+    metrics_dir = getenv("METRICS_MULTIPROC_DIR", "/dev/shm/easyread-metrics")
+    loop_monitor_interval = float(getenv("LOOP_MONITOR_INTERVAL", "0.25"))  # seconds - 0 to disable
+    loop_block_threshold = float(getenv("LOOP_BLOCK_THRESHOLD", "0.5"))  # seconds
+    admin_token = getenv("ADMIN_TOKEN")
+    diagnostics_dir = getenv("DIAGNOSTICS_DIR", "/dev/shm/easyread-diagnostics")
+    profiler_interval = float(getenv("PROFILER_INTERVAL", "0.005"))  # seconds
+    profiler_max_profiles = int(getenv("PROFILER_MAX_PROFILES", "50"))
+    memory_report_interval = float(getenv("MEMORY_REPORT_INTERVAL", "30"))  # seconds - 0 to disable
+    memory_report_modules = int(getenv("MEMORY_REPORT_MODULES", "25"))
+    admission_control = getenv("ADMISSION_CONTROL", "1") == "1"
+    html_max_concurrency = int(getenv("HTML_MAX_CONCURRENCY", "64"))  # per worker
+    html_latency_target = float(getenv("HTML_LATENCY_TARGET", "1"))  # seconds
+    pdf_max_concurrency = int(getenv("PDF_MAX_CONCURRENCY", "2"))  # per worker
+    pdf_latency_target = float(getenv("PDF_LATENCY_TARGET", "20"))  # seconds
+    healthcheck_latency_target = float(getenv("HEALTHCHECK_LATENCY_TARGET", "1"))  # seconds
+    request_timeout = float(getenv("REQUEST_TIMEOUT", "15"))  # seconds
+    pdf_request_timeout = float(getenv("PDF_REQUEST_TIMEOUT", "60"))  # seconds
+    postgres_timeout = float(getenv("POSTGRES_TIMEOUT", "10"))  # seconds - per operation
+    postgres_pool_min_size = int(getenv("POSTGRES_POOL_MIN_SIZE", "1"))  # per worker
+    postgres_pool_max_size = int(getenv("POSTGRES_POOL_MAX_SIZE", "10"))  # per worker
+    postgres_pool_max_idle = float(getenv("POSTGRES_POOL_MAX_IDLE", "300"))  # seconds
+    postgres_primary_reads = getenv("POSTGRES_PRIMARY_READS", "1") == "1"  # with replicas: "0" for failover only
+    postgres_statement_mode = getenv("POSTGRES_STATEMENT_MODE", "prepared")  # or "unprepared"
+    postgres_prepared_statements = int(getenv("POSTGRES_PREPARED_STATEMENTS", "16"))  # per connection
+    storage_timeout = float(getenv("STORAGE_TIMEOUT", "30"))  # seconds - per operation
+    breaker_failure_threshold = int(getenv("BREAKER_FAILURE_THRESHOLD", "5"))  # consecutive failures
+    breaker_reset_timeout = float(getenv("BREAKER_RESET_TIMEOUT", "10"))  # seconds
+    breaker_max_reset_timeout = float(getenv("BREAKER_MAX_RESET_TIMEOUT", "120"))  # seconds
+    lkg_max_datasets = int(getenv("LKG_MAX_DATASETS", "512"))
+    lkg_max_pages = int(getenv("LKG_MAX_PAGES", "512"))
+    healthcheck_interval = float(getenv("HEALTHCHECK_INTERVAL", "15"))  # seconds
+    healthcheck_timeout = float(getenv("HEALTHCHECK_TIMEOUT", "5"))  # seconds - per dependency
+    healthcheck_max_age = float(getenv("HEALTHCHECK_MAX_AGE", "60"))  # seconds
+    warmup_timeout = float(getenv("WARMUP_TIMEOUT", "20"))  # seconds - 0 to disable
+    warmup_postcodes = [item.strip() for item in getenv("WARMUP_POSTCODES", "").split(",") if item.strip()]
+    shared_cache_dir = getenv("SHARED_CACHE_DIR", "/dev/shm/easyread-cache")
+    shared_cache_slots = int(getenv("SHARED_CACHE_SLOTS", "128"))  # per node - 0 to disable
+    shared_cache_slot_size = int(getenv("SHARED_CACHE_SLOT_SIZE", str(256 * 1024)))  # bytes
+    shared_cache_ways = int(getenv("SHARED_CACHE_WAYS", "8"))  # slots per set
+    l2_cache_container = getenv("L2_CACHE_CONTAINER", "")  # empty to disable
+    l2_cache_timeout = float(getenv("L2_CACHE_TIMEOUT", "1"))  # seconds - per read
+    l2_cache_max_uploads = int(getenv("L2_CACHE_MAX_UPLOADS", "16"))  # in flight, per worker
+    release_timestamp_ttl = float(getenv("RELEASE_TIMESTAMP_TTL", "30"))  # seconds - 0 to disable
+    early_refresh_beta = float(getenv("EARLY_REFRESH_BETA", "1"))  # > 1 refreshes earlier
+    release_stagger = float(getenv("RELEASE_STAGGER", "60"))  # seconds
+    release_switch_timeout = float(getenv("RELEASE_SWITCH_TIMEOUT", "300"))  # seconds - 0 to switch at once
+    popularity_dir = getenv("POPULARITY_DIR", "/dev/shm/easyread-popularity")
+    popularity_top_k = int(getenv("POPULARITY_TOP_K", "200"))
+    popularity_sketch_width = int(getenv("POPULARITY_SKETCH_WIDTH", "2048"))
+    popularity_sketch_depth = int(getenv("POPULARITY_SKETCH_DEPTH", "4"))
+    popularity_flush_interval = float(getenv("POPULARITY_FLUSH_INTERVAL", "60"))  # seconds - 0 to disable
+    popularity_decay = float(getenv("POPULARITY_DECAY", "0.5"))  # per release
+    warmup_top_areas = int(getenv("WARMUP_TOP_AREAS", "20"))
+    postcode_filter = getenv("POSTCODE_FILTER", "1") == "1"
+    postcode_filter_error_rate = float(getenv("POSTCODE_FILTER_ERROR_RATE", "0.001"))
+    postcode_filter_timeout = float(getenv("POSTCODE_FILTER_TIMEOUT", "300"))  # seconds - to build
+    negative_cache_size = int(getenv("NEGATIVE_CACHE_SIZE", "4096"))  # per worker
+    negative_cache_ttl = float(getenv("NEGATIVE_CACHE_TTL", "300"))  # seconds
+    area_hierarchy_ttl = float(getenv("AREA_HIERARCHY_TTL", "86400"))  # seconds
+    area_hierarchy_timeout = float(getenv("AREA_HIERARCHY_TIMEOUT", "120"))  # seconds - to load
+    batch_max_items = int(getenv("BATCH_MAX_ITEMS", "50"))  # postcodes and areas, per request
+    batch_concurrency = int(getenv("BATCH_CONCURRENCY", "4"))  # queries, per request
+    batch_max_queries = int(getenv("BATCH_MAX_QUERIES", "8"))  # per worker
+    batch_max_concurrency = int(getenv("BATCH_MAX_CONCURRENCY", "8"))  # requests, per worker
+    batch_latency_target = float(getenv("BATCH_LATENCY_TARGET", "5"))  # seconds
+    trends_days = int(getenv("TRENDS_DAYS", "90"))  # shown in sparklines
+    trends_revision_days = int(getenv("TRENDS_REVISION_DAYS", "14"))  # fetched again with each release
+    speculative_pdf = getenv("SPECULATIVE_PDF", "0") == "1"
+    speculative_pdf_rate = float(getenv("SPECULATIVE_PDF_RATE", "6"))  # builds per minute, per node
     cloud_role_name = getenv("WEBSITE_SITE_NAME", "easyread-page")
     cloud_instance_id = getenv("WEBSITE_INSTANCE_ID", "local")
     website_timestamp = {
@@ -17,6 +17,7 @@ Contributors:  Pouria Hadjibagheri
 
 # Internal: 
 from .connection import *
+from .columnar import *
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Header
@@ -0,0 +1,106 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from typing import Any, Dict, List, Sequence, TYPE_CHECKING
+
+# 3rd party:
+
+# Imported on first use; see `records_to_frame`.
+if TYPE_CHECKING:
+    from numpy import ndarray
+    from pandas import DataFrame
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'records_to_columns',
+    'records_to_frame'
+]
+
+
+DATE_FORMAT = "{:%-d %B %Y}"
+
+# Columns of the page queries, and their types.
+COLUMN_TYPES = {
+    "value": "float64",
+    "rank": "int64"
+}
+
+
+def records_to_columns(records: Sequence[Sequence[Any]], columns: List[str]) -> Dict[str, 'ndarray']:
+    """
+    Transposes the rows of a result set - e.g. asyncpg records - into one
+    array of objects per column, in a single pass.
+    """
+    from numpy import fromiter
+
+    size = len(records)
+    values = zip(*records) if size else (tuple() for _ in columns)
+
+    # Unlike `numpy.array`, `fromiter` does not inspect every object -
+    # e.g. dates and decimals - for a way to turn it into an array.
+    return {
+        name: fromiter(column, dtype=object, count=size)
+        for name, column in zip(columns, values)
+    }
+
+
+def _parse(values: 'ndarray', dtype: str) -> 'ndarray':
+    from numpy import dtype as get_dtype, fromiter, isnan
+
+    try:
+        parsed = values.astype(dtype)
+    except TypeError:
+        # Nulls in an integer column: the other values are parsed one by one.
+        parse = get_dtype(dtype).type
+
+        return fromiter(
+            (item if item is None else parse(item) for item in values),
+            dtype=object,
+            count=len(values)
+        )
+
+    if parsed.dtype.kind == "f":
+        # Nulls become NaN; they are kept as `None`, as they were.
+        nulls = isnan(parsed)
+
+        if nulls.any():
+            parsed = parsed.astype(object)
+            parsed[nulls] = None
+
+    return parsed
+
+
+def _format_dates(dates: 'ndarray') -> 'ndarray':
+    from numpy import fromiter
+
+    # A result set spans a handful of dates: each is formatted once.
+    formatted = {value: DATE_FORMAT.format(value) for value in set(dates)}
+
+    return fromiter(map(formatted.__getitem__, dates), dtype=object, count=len(dates))
+
+
+def records_to_frame(records: Sequence[Sequence[Any]], columns: List[str],
+                     types: Dict[str, str] = COLUMN_TYPES) -> 'DataFrame':
+    """
+    Data frame of the result set, decoded by column rather than by row:
+    the columns in ``types`` are parsed at once - NUMERIC values arrive
+    as decimals - and the ``date`` column is accompanied by
+    ``formatted_date``, as used in the pages.
+    """
+    from pandas import DataFrame
+
+    data = records_to_columns(records, columns)
+
+    for name, dtype in types.items():
+        if name in data:
+            data[name] = _parse(data[name], dtype)
+
+    if "date" in data:
+        data["formatted_date"] = _format_dates(data["date"])
+
+    return DataFrame(data, copy=False)
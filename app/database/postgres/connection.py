@@ -3,55 +3,334 @@
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
-from typing import Any
+from asyncio import Lock
+from hashlib import blake2b
+from random import random
+from typing import Any, Dict, List, NamedTuple, Union
 from logging import getLogger
 from os import getenv
 
 # 3rd party:
-from asyncpg import connect, Connection as PGConnection
+from asyncpg import create_pool, Connection as PGConnection, Pool
+from asyncpg.exceptions import DuplicatePreparedStatementError, InvalidSQLStatementNameError
+from cachetools import LRUCache
 from orjson import loads, dumps
 
 # Internal:
+from app.config import Settings
 from app.middleware.tracers.utils import trace_async_method_operation
+from app.resilience.breaker import (
+    CircuitBreaker, CircuitOpen, postgres_breaker, is_postgres_failure, OPEN
+)
+from app.metrics.registry import Counter
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 __all__ = [
-    "Connection"
+    "Connection",
+    "Endpoint",
+    "get_endpoints",
+    "get_pool_usage",
+    "close_pools",
+    "PRIMARY",
+    "REPLICA",
+    "READ"
 ]
 
 
 CONN_STR = getenv("POSTGRES_CONNECTION_STRING")
+# Separated by white space.
+REPLICA_CONN_STRS = getenv("POSTGRES_REPLICA_CONNECTION_STRINGS", "").split()
 DB_NAME = "database"
 
+PRIMARY = "primary"
+REPLICA = "replica"
+# Any endpoint that may serve reads - everything this service does.
+READ = "read"
+
 logger = getLogger("asyncpg")
 
 
+class PoolUsage(NamedTuple):
+    in_use: int
+    waiting: int
+    max_size: int
+
+    @property
+    def is_saturated(self) -> bool:
+        return self.in_use >= self.max_size and self.waiting > 0
+
+
+PREPARED = "prepared"
+
+endpoint_failovers = Counter(
+    "easyread_database_failovers",
+    "Number of connections that were moved on to another database endpoint, by the endpoint that failed.",
+    labelnames=("endpoint",)
+)
+
+prepared_statements = Counter(
+    "easyread_prepared_statements",
+    "Number of queries run through prepared statements, by outcome.",
+    labelnames=("outcome",)
+)
+
+# Turned off for the worker should the pooler lose track of statements.
+_preparing = Settings.postgres_statement_mode == PREPARED
+
+
+class PreparingConnection(PGConnection):
+    """
+    Keeps the statements prepared by ``Connection.fetch_prepared`` for as
+    long as the connection is open - up to ``POSTGRES_PREPARED_STATEMENTS``,
+    the least recently used of which are closed first.
+    """
+    __slots__ = ("prepared",)
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared = LRUCache(maxsize=Settings.postgres_prepared_statements)
+
+
+def get_statement_name(query: str) -> str:
+    """
+    Name of the prepared statement of the query, derived from its text -
+    which includes the name of the partition. A pooler that hands the
+    statement of another client over under the same name hands over the
+    same query.
+    """
+    return f"easyread_{blake2b(query.encode(), digest_size=12).hexdigest()}"
+
+
+def _stop_preparing(err: Exception):
+    global _preparing
+
+    if _preparing:
+        logger.warning(
+            f"Prepared statements are not supported by the connection - "
+            f"possibly a pooler in transaction mode - and have been turned off: {err!r}"
+        )
+
+    _preparing = False
+
+
+async def _init_connection(conn: PGConnection):
+    await conn.set_type_codec(
+        'jsonb',
+        encoder=dumps,
+        decoder=loads,
+        schema='pg_catalog'
+    )
+    # conn.add_log_listener(logger)
+
+
+class Endpoint:
+    """
+    Database server - the primary or a replica - with its own pool of
+    connections, per worker, and its own circuit breaker.
+    """
+
+    def __init__(self, name: str, conn_str: str, role: str, breaker: CircuitBreaker):
+        self.name = name
+        self.conn_str = conn_str
+        self.role = role
+        self.breaker = breaker
+        self.pool: Union[Pool, None] = None
+        self.in_use = 0
+        self.waiting = 0
+        self._lock: Union[Lock, None] = None
+
+    @property
+    def load(self) -> float:
+        return (self.in_use + self.waiting) / Settings.postgres_pool_max_size
+
+    @property
+    def is_available(self) -> bool:
+        # An open breaker that is due a probe counts as available, or
+        # the endpoint would never be tried again.
+        return self.breaker.state != OPEN or self.breaker.retry_after <= 0
+
+    async def get_pool(self) -> Pool:
+        if self.pool is not None:
+            return self.pool
+
+        if self._lock is None:
+            # Created on first use so that it binds to the running loop.
+            self._lock = Lock()
+
+        async with self._lock:
+            if self.pool is None:
+                self.pool = await self.breaker.call(
+                    create_pool(
+                        self.conn_str,
+                        min_size=Settings.postgres_pool_min_size,
+                        max_size=Settings.postgres_pool_max_size,
+                        max_inactive_connection_lifetime=Settings.postgres_pool_max_idle,
+                        # Statements are only prepared on demand; see
+                        # `Connection.fetch_prepared`.
+                        statement_cache_size=0,
+                        connection_class=PreparingConnection,
+                        init=_init_connection
+                    ),
+                    Settings.postgres_timeout
+                )
+
+        return self.pool
+
+
+def _create_endpoints() -> List[Endpoint]:
+    endpoints = [Endpoint(PRIMARY, CONN_STR, PRIMARY, postgres_breaker)]
+
+    for index, conn_str in enumerate(REPLICA_CONN_STRS, start=1):
+        name = f"{REPLICA}-{index}"
+        breaker = CircuitBreaker(f"postgresql-{name}", is_failure=is_postgres_failure)
+        endpoints.append(Endpoint(name, conn_str, REPLICA, breaker))
+
+    return endpoints
+
+
+_endpoints = _create_endpoints()
+
+# Endpoints created for connection strings given to `Connection`.
+_other_endpoints: Dict[str, Endpoint] = dict()
+
+
+def get_endpoints() -> List[Endpoint]:
+    return [*_endpoints, *_other_endpoints.values()]
+
+
+def _get_candidates(role: str) -> List[Endpoint]:
+    """
+    Endpoints to try for the role, in order: the available ones from the
+    least loaded - replicas first and at random among equals - followed
+    by the others, which fail fast.
+    """
+    primary, replicas = _endpoints[0], _endpoints[1:]
+
+    if role == PRIMARY:
+        return [primary]
+
+    if not replicas or Settings.postgres_primary_reads:
+        endpoints = _endpoints
+    else:
+        endpoints = replicas
+
+    candidates = sorted(
+        endpoints,
+        key=lambda item: (not item.is_available, item.load, item.role == PRIMARY, random())
+    )
+
+    if primary not in candidates:
+        # The primary only serves reads once no replica can.
+        candidates.append(primary)
+
+    return candidates
+
+
+def get_pool_usage() -> PoolUsage:
+    endpoints = [item for item in get_endpoints() if item.pool is not None]
+
+    return PoolUsage(
+        in_use=sum(item.in_use for item in endpoints),
+        waiting=sum(item.waiting for item in endpoints),
+        max_size=Settings.postgres_pool_max_size * max(len(endpoints), 1)
+    )
+
+
+async def close_pools():
+    for endpoint in get_endpoints():
+        pool, endpoint.pool = endpoint.pool, None
+
+        if pool is not None:
+            await pool.close()
+
+
 class Connection:
+    """
+    Connection from the pool of the least loaded endpoint that may serve
+    the role - any endpoint for ``READ``, which is all this service does.
+
+    Should an endpoint fail to provide a connection, the next one is
+    tried; queries that fail thereafter count against the endpoint, and
+    steer the following connections away from it.
+    """
     conn: Any
     _name = "postgresql"
 
-    def __init__(self, conn_str=CONN_STR):
+    def __init__(self, conn_str=None, role: str = READ):
         self.conn_str = conn_str
-        self._connection = connect(self.conn_str, statement_cache_size=0)
+        self.role = role
         self._account_name = DB_NAME
+        self._endpoint: Union[Endpoint, None] = None
+        self._conn = None
 
-    def __await__(self):
-        yield from self._connection.__await__()
+    def _get_candidates(self) -> List[Endpoint]:
+        if self.conn_str is None or self.conn_str == CONN_STR:
+            return _get_candidates(self.role)
+
+        if self.conn_str not in _other_endpoints:
+            _other_endpoints[self.conn_str] = Endpoint(
+                name=f"other-{len(_other_endpoints) + 1}",
+                conn_str=self.conn_str,
+                role=self.role,
+                breaker=postgres_breaker
+            )
+
+        return [_other_endpoints[self.conn_str]]
+
+    async def _acquire(self, endpoint: Endpoint):
+        pool = await endpoint.get_pool()
+
+        # Waiting for a connection held by this worker says nothing about
+        # the health of the database; failing to open one does.
+        saturated = pool.get_idle_size() == 0 and pool.get_size() >= pool.get_max_size()
+
+        endpoint.waiting += 1
+        try:
+            self._conn = await endpoint.breaker.call(
+                pool.acquire(),
+                Settings.postgres_timeout,
+                count_timeouts=not saturated
+            )
+        finally:
+            endpoint.waiting -= 1
+
+        endpoint.in_use += 1
+        self._endpoint = endpoint
 
     async def __aenter__(self) -> PGConnection:
-        self._conn = await self._connection
-        await self._conn.set_type_codec(
-            'jsonb',
-            encoder=dumps,
-            decoder=loads,
-            schema='pg_catalog'
-        )
-        # self._conn.add_log_listener(logger)
+        candidates = self._get_candidates()
+
+        for index, endpoint in enumerate(candidates):
+            try:
+                await self._acquire(endpoint)
+                break
+            except Exception as err:
+                failed_over = isinstance(err, CircuitOpen) or is_postgres_failure(err)
+                if not failed_over or index == len(candidates) - 1:
+                    raise
+
+                endpoint_failovers.inc(endpoint=endpoint.name)
+                logger.warning(f"Failed to connect to the '{endpoint.name}' database endpoint: {err!r}")
+
+        if self._endpoint.role != PRIMARY:
+            self._account_name = f"{DB_NAME}-{self._endpoint.name}"
+
         return self
 
+    @property
+    def is_primary(self) -> bool:
+        """
+        Whether the connection is to the primary - i.e. whether its
+        answers are up to date, where replicas may lag behind.
+        """
+        return self._endpoint.role == PRIMARY
+
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        return await self._conn.close()
+        endpoint = self._endpoint
+        endpoint.in_use -= 1
+
+        return await endpoint.pool.release(self._conn)
 
     @trace_async_method_operation(
         name="_account_name",
@@ -59,15 +338,21 @@ class Connection:
         action="connection_fetchval"
     )
     async def fetchval(self, query, *args, **kwargs):
-        return await self._conn.fetchval(query, *args, **kwargs)
+        return await self._endpoint.breaker.call(
+            self._conn.fetchval(query, *args, **kwargs),
+            Settings.postgres_timeout
+        )
 
     @trace_async_method_operation(
         name="_account_name",
         dep_type="_name",
         action="connection_fetch"
     )
-    async def fetch(self, query, *args, **kwargs):
-        return await self._conn.fetch(query, *args, **kwargs)
+    async def fetch(self, query, *args, timeout: Union[float, None] = None, **kwargs):
+        return await self._endpoint.breaker.call(
+            self._conn.fetch(query, *args, **kwargs),
+            timeout or Settings.postgres_timeout
+        )
 
     @trace_async_method_operation(
         name="_account_name",
@@ -75,4 +360,67 @@ class Connection:
         action="connection_fetchrow"
     )
     async def fetchrow(self, query, *args, **kwargs):
-        return await self._conn.fetchrow(query, *args, **kwargs)
+        return await self._endpoint.breaker.call(
+            self._conn.fetchrow(query, *args, **kwargs),
+            Settings.postgres_timeout
+        )
+
+    @trace_async_method_operation(
+        name="_account_name",
+        dep_type="_name",
+        action="connection_copy_from_query"
+    )
+    async def copy_from_query(self, query, *args, output, timeout: Union[float, None] = None, **kwargs):
+        """
+        Streams the result of the query into ``output`` - a path or a
+        file-like object - without holding it in memory.
+        """
+        return await self._endpoint.breaker.call(
+            self._conn.copy_from_query(query, *args, output=output, **kwargs),
+            timeout or Settings.postgres_timeout
+        )
+
+    async def _fetch_prepared(self, query, *args):
+        statements = self._conn.prepared
+        name = get_statement_name(query)
+        statement = statements.get(name)
+
+        if statement is None:
+            statement = await self._conn.prepare(query, name=name)
+            statements[name] = statement
+            prepared_statements.inc(outcome="prepared")
+        else:
+            prepared_statements.inc(outcome="reused")
+
+        return await statement.fetch(*args)
+
+    @trace_async_method_operation(
+        name="_account_name",
+        dep_type="_name",
+        action="connection_fetch_prepared"
+    )
+    async def fetch_prepared(self, query, *args, timeout: Union[float, None] = None):
+        """
+        Same as ``fetch``, but the query is prepared once per connection
+        and the statement reused thereafter - so that it is not parsed
+        and planned on every call.
+
+        Queries are run as they are in ``fetch`` if
+        ``POSTGRES_STATEMENT_MODE`` is not "prepared", or once the
+        connection has failed to find - or to create - a statement, as
+        happens behind a pooler in transaction mode.
+        """
+        if not _preparing:
+            return await self.fetch(query, *args, timeout=timeout)
+
+        try:
+            return await self._endpoint.breaker.call(
+                self._fetch_prepared(query, *args),
+                timeout or Settings.postgres_timeout
+            )
+        except (InvalidSQLStatementNameError, DuplicatePreparedStatementError) as err:
+            self._conn.prepared.clear()
+            _stop_preparing(err)
+            prepared_statements.inc(outcome="fallback")
+
+        return await self.fetch(query, *args, timeout=timeout)
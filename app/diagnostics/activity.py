@@ -0,0 +1,59 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from contextvars import ContextVar
+from contextlib import contextmanager
+from time import monotonic
+from typing import NamedTuple, Union
+
+# 3rd party:
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'current_route',
+    'loop_phase',
+    'get_active_phase',
+    'ActivePhase'
+]
+
+
+current_route: ContextVar[Union[str, None]] = ContextVar("current_route", default=None)
+
+
+class ActivePhase(NamedTuple):
+    route: Union[str, None]
+    phase: str
+    started: float
+
+
+# Written on the event loop, read by the watchdog thread. Only
+# synchronous sections are marked, so while the loop is blocked this
+# always describes the code that is blocking it.
+_active_phase: Union[ActivePhase, None] = None
+
+
+@contextmanager
+def loop_phase(name: str):
+    """
+    Marks a synchronous, potentially CPU-bound section of code that runs
+    on the event loop - e.g. template rendering or the LaTeX build - so
+    that a blocked loop can be attributed to a route and phase.
+    """
+    global _active_phase
+
+    previous = _active_phase
+    _active_phase = ActivePhase(current_route.get(), name, monotonic())
+
+    try:
+        yield
+    finally:
+        _active_phase = previous
+
+
+def get_active_phase() -> Union[ActivePhase, None]:
+    return _active_phase
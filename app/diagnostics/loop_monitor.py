@@ -0,0 +1,150 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import sys
+from logging import getLogger
+from threading import Thread, Event, get_ident
+from traceback import format_stack
+from time import monotonic
+from asyncio import get_running_loop, sleep, CancelledError, Task
+from os import getpid
+from typing import Union
+
+# 3rd party:
+
+# Internal:
+from app.config import Settings
+from app.metrics.registry import Counter, Histogram
+from .activity import get_active_phase
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'LoopMonitor',
+    'start_loop_monitor',
+    'stop_loop_monitor'
+]
+
+
+logger = getLogger("app")
+
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+STACK_DEPTH = 30
+
+loop_lag = Histogram(
+    "easyread_event_loop_lag_seconds",
+    "Delay between the scheduled and the actual wake-up of the watchdog task.",
+    buckets=LAG_BUCKETS
+)
+
+loop_blocked = Counter(
+    "easyread_event_loop_blocked",
+    "Number of times the event loop was blocked beyond the threshold.",
+    labelnames=("route", "phase")
+)
+
+
+class LoopMonitor:
+    """
+    Per-worker event loop watchdog.
+
+    A task on the loop wakes up every ``interval`` seconds and records how
+    late it was. A helper thread watches the heartbeat of that task; if it
+    stalls for longer than ``threshold`` seconds, the thread captures the
+    stack of the loop thread - i.e. of the code holding the loop - and
+    reports it once per blocking episode.
+    """
+
+    def __init__(self, interval: float = Settings.loop_monitor_interval,
+                 threshold: float = Settings.loop_block_threshold):
+        self.interval = interval
+        self.threshold = threshold
+        self._heartbeat = monotonic()
+        self._loop_thread_id = None
+        self._task: Union[Task, None] = None
+        self._thread: Union[Thread, None] = None
+        self._stopped = Event()
+
+    async def _measure_lag(self):
+        loop = get_running_loop()
+
+        while True:
+            expected = loop.time() + self.interval
+            await sleep(self.interval)
+            lag = max(loop.time() - expected, 0)
+            self._heartbeat = monotonic()
+            loop_lag.observe(lag)
+
+    def _watch(self):
+        reported_heartbeat = None
+
+        while not self._stopped.wait(self.threshold / 4):
+            heartbeat = self._heartbeat
+            blocked_for = monotonic() - heartbeat - self.interval
+
+            if blocked_for < self.threshold or heartbeat == reported_heartbeat:
+                continue
+
+            reported_heartbeat = heartbeat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(format_stack(frame, limit=STACK_DEPTH)) if frame is not None else None
+            self.report(blocked_for, stack)
+
+    def report(self, blocked_for: float, stack: Union[str, None]):
+        active = get_active_phase()
+        route = getattr(active, "route", None) or "unknown"
+        phase = getattr(active, "phase", None) or "unknown"
+
+        loop_blocked.inc(route=route, phase=phase)
+
+        custom_dims = dict(
+            custom_dimensions=dict(
+                event="event_loop_blocked",
+                route=route,
+                phase=phase,
+                blocked_for=round(blocked_for, 3),
+                threshold=self.threshold,
+                pid=getpid(),
+                stack=stack,
+                server_location=Settings.server_location
+            )
+        )
+
+        logger.warning(
+            f"Event loop blocked for at least {blocked_for:.3f}s in '{phase}' ({route})",
+            extra=custom_dims
+        )
+
+    def start(self):
+        loop = get_running_loop()
+        self._loop_thread_id = get_ident()
+        self._heartbeat = monotonic()
+        self._stopped.clear()
+
+        self._task = loop.create_task(self._measure_lag())
+        self._thread = Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except CancelledError:
+                pass
+
+
+monitor = LoopMonitor()
+
+
+async def start_loop_monitor():
+    if Settings.loop_monitor_interval > 0:
+        monitor.start()
+
+
+async def stop_loop_monitor():
+    await monitor.stop()
@@ -0,0 +1,347 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import sys
+import gc
+import tracemalloc
+from inspect import unwrap
+from os import getpid, makedirs, path, listdir, remove, replace
+from asyncio import sleep, CancelledError, Task, get_running_loop
+from collections import defaultdict
+from logging import getLogger
+from time import time
+from typing import Any, Callable, Dict, List, Union
+
+# 3rd party:
+from orjson import dumps, loads
+from psutil import Process, pid_exists, Error as PsutilError
+
+# Internal:
+from app.config import Settings
+from app.metrics.registry import Gauge
+from .profiler import SharedCounter
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'register_cache',
+    'set_memory_tracing',
+    'get_memory_reports',
+    'get_node_memory',
+    'start_memory_monitor',
+    'stop_memory_monitor'
+]
+
+
+logger = getLogger("app")
+
+APP_PACKAGE = "app"
+UNKNOWN_MODULE = "<unknown>"
+TRACEMALLOC_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+resident_memory = Gauge(
+    "easyread_process_resident_memory_bytes",
+    "Resident set size of the worker.",
+    multiprocess_mode="all"
+)
+
+unique_memory = Gauge(
+    "easyread_process_unique_memory_bytes",
+    "Memory that would be freed if the worker exited (USS).",
+    multiprocess_mode="all"
+)
+
+cache_entries = Gauge(
+    "easyread_cache_entries",
+    "Number of live entries held in in-process caches.",
+    labelnames=("cache",),
+    multiprocess_mode="all"
+)
+
+_caches: Dict[str, Callable[[], int]] = dict()
+_tracing: Union[SharedCounter, None] = None
+_previous_snapshot: Union[tracemalloc.Snapshot, None] = None
+_task: Union[Task, None] = None
+
+
+def _get_memory_dir() -> str:
+    directory = path.join(Settings.diagnostics_dir, "memory")
+    makedirs(directory, exist_ok=True)
+    return directory
+
+
+def _get_tracing_counter() -> SharedCounter:
+    global _tracing
+
+    if _tracing is None:
+        _tracing = SharedCounter(path.join(_get_memory_dir(), "tracing"))
+
+    return _tracing
+
+
+def register_cache(name: str, cache: Any):
+    """
+    Registers an in-process cache to be reported in the memory stats.
+
+    Parameters
+    ----------
+    name: str
+        Name of the cache, used as the ``cache`` label.
+
+    cache: Any
+        Function decorated with ``lru_cache`` - possibly wrapped by other
+        decorators - or any object that implements ``__len__``.
+    """
+    cache = unwrap(cache, stop=lambda func: hasattr(func, "cache_info"))
+
+    if hasattr(cache, "cache_info"):
+        _caches[name] = lambda: cache.cache_info().currsize
+    else:
+        _caches[name] = lambda: len(cache)
+
+
+def set_memory_tracing(frames: int) -> int:
+    """
+    Starts (or stops, with zero frames) allocation tracing in all workers
+    on the node. Workers pick up the change on their next report.
+    """
+    counter = _get_tracing_counter()
+    counter.set(max(frames, 0))
+    return counter.value
+
+
+def _get_module_map() -> Dict[str, str]:
+    modules = dict()
+
+    for name, module in list(sys.modules.items()):
+        filename = getattr(module, "__file__", None)
+        if filename:
+            modules[filename] = name
+
+    return modules
+
+
+def _group_name(module_name: str) -> str:
+    parts = module_name.split(".")
+
+    # Application modules are grouped by sub-package - e.g. `app.postcode`;
+    # everything else by its top-level package.
+    if parts[0] == APP_PACKAGE:
+        return ".".join(parts[:2])
+
+    return parts[0]
+
+
+def _get_owner(traceback: tracemalloc.Traceback, modules: Dict[str, str]) -> str:
+    owner = None
+
+    # Allocations are attributed to the most recent application frame
+    # where there is one; e.g. a DataFrame created in `app.postcode`
+    # is charged to `app.postcode` rather than to `pandas`.
+    for frame in reversed(traceback):
+        module_name = modules.get(frame.filename)
+        if module_name is None:
+            continue
+
+        group = _group_name(module_name)
+        if group.split(".")[0] == APP_PACKAGE:
+            return group
+
+        if owner is None:
+            owner = group
+
+    return owner or UNKNOWN_MODULE
+
+
+def _get_snapshot_diff(frames: int) -> Union[List[Dict[str, Any]], None]:
+    global _previous_snapshot
+
+    if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != frames:
+        tracemalloc.stop()
+        _previous_snapshot = None
+
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+        _previous_snapshot = tracemalloc.take_snapshot().filter_traces(TRACEMALLOC_FILTERS)
+        return None
+
+    snapshot = tracemalloc.take_snapshot().filter_traces(TRACEMALLOC_FILTERS)
+    modules = _get_module_map()
+    groups = defaultdict(lambda: {"size": 0, "size_diff": 0, "count": 0, "count_diff": 0})
+
+    for stat in snapshot.compare_to(_previous_snapshot, "traceback"):
+        group = groups[_get_owner(stat.traceback, modules)]
+        group["size"] += stat.size
+        group["size_diff"] += stat.size_diff
+        group["count"] += stat.count
+        group["count_diff"] += stat.count_diff
+
+    _previous_snapshot = snapshot
+
+    return sorted(
+        ({"module": name, **values} for name, values in groups.items()),
+        key=lambda item: item["size_diff"],
+        reverse=True
+    )[:Settings.memory_report_modules]
+
+
+def _get_cache_sizes() -> Dict[str, int]:
+    sizes = dict()
+
+    for name, get_size in _caches.items():
+        try:
+            sizes[name] = get_size()
+        except Exception as err:
+            logger.warning(f"Failed to measure cache '{name}': {err}")
+            continue
+
+        cache_entries.set(sizes[name], cache=name)
+
+    return sizes
+
+
+def collect_memory_report() -> Dict[str, Any]:
+    global _previous_snapshot
+
+    memory = Process().memory_full_info()
+    resident_memory.set(memory.rss)
+    unique_memory.set(memory.uss)
+
+    report = {
+        "pid": getpid(),
+        "timestamp": time(),
+        "rss": memory.rss,
+        "uss": memory.uss,
+        "pss": getattr(memory, "pss", None),
+        "gc_counts": gc.get_count(),
+        "gc_collections": [item["collections"] for item in gc.get_stats()],
+        "caches": _get_cache_sizes(),
+        "tracing": None
+    }
+
+    frames = _get_tracing_counter().value
+    if frames > 0:
+        current, peak = tracemalloc.get_traced_memory()
+        report["tracing"] = {
+            "frames": frames,
+            "traced": current,
+            "peak": peak,
+            "modules": _get_snapshot_diff(frames)
+        }
+    elif tracemalloc.is_tracing():
+        tracemalloc.stop()
+        _previous_snapshot = None
+
+    return report
+
+
+def _store_report(report: Dict[str, Any]):
+    filename = path.join(_get_memory_dir(), f"{report['pid']}.json")
+
+    # Written to a temporary file first so that readers never see a
+    # partial report.
+    with open(f"{filename}.tmp", "wb") as fp:
+        fp.write(dumps(report))
+
+    replace(f"{filename}.tmp", filename)
+
+
+def get_memory_reports() -> List[Dict[str, Any]]:
+    """
+    Latest memory reports of all live workers on the node. Reports left
+    behind by workers that no longer exist are removed.
+    """
+    directory = _get_memory_dir()
+    reports = list()
+
+    for filename in listdir(directory):
+        if not filename.endswith(".json"):
+            continue
+
+        filepath = path.join(directory, filename)
+
+        if not pid_exists(int(filename[:-5])):
+            try:
+                remove(filepath)
+            except FileNotFoundError:
+                pass
+            continue
+
+        try:
+            with open(filepath, "rb") as fp:
+                reports.append(loads(fp.read()))
+        except (FileNotFoundError, ValueError):
+            continue
+
+    return sorted(reports, key=lambda item: item["pid"])
+
+
+def get_node_memory() -> Dict[str, Any]:
+    """
+    Total memory of the gunicorn master and all of its workers.
+
+    Pages shared copy-on-write - e.g. when the master preloads the
+    application - count in the RSS of every process that maps them;
+    the PSS splits them between those processes, so the total PSS is
+    the actual footprint of the service on the node.
+    """
+    master = Process().parent()
+    processes = [master, *master.children()]
+    totals = {"rss": 0, "pss": 0, "uss": 0}
+
+    for process in processes:
+        try:
+            memory = process.memory_full_info()
+        except PsutilError:
+            continue
+
+        totals["rss"] += memory.rss
+        totals["pss"] += getattr(memory, "pss", 0)
+        totals["uss"] += memory.uss
+
+    return {
+        "master_pid": master.pid,
+        "processes": len(processes),
+        "frozen_objects": gc.get_freeze_count(),
+        **totals
+    }
+
+
+async def _report_periodically():
+    loop = get_running_loop()
+
+    while True:
+        try:
+            # Snapshots may take a while once tracing is enabled, so
+            # they are kept off the loop.
+            report = await loop.run_in_executor(None, collect_memory_report)
+            _store_report(report)
+        except OSError as err:
+            logger.warning(f"Failed to store memory report: {err}")
+
+        await sleep(Settings.memory_report_interval)
+
+
+async def start_memory_monitor():
+    global _task
+
+    if Settings.memory_report_interval > 0:
+        _task = get_running_loop().create_task(_report_periodically())
+
+
+async def stop_memory_monitor():
+    if _task is None:
+        return
+
+    _task.cancel()
+    try:
+        await _task
+    except CancelledError:
+        pass
@@ -0,0 +1,392 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import sys
+import mmap
+import re
+from os import getpid, makedirs, path, listdir, remove
+from fcntl import flock, LOCK_EX, LOCK_UN
+from struct import Struct
+from tempfile import gettempdir
+from threading import Thread, Event, Lock, get_ident
+from collections import Counter as StackCounter
+from time import perf_counter, time, sleep
+from uuid import uuid4
+from logging import getLogger
+from typing import Dict, List, Union
+
+# 3rd party:
+from orjson import dumps, loads
+
+# Internal:
+from app.config import Settings
+from app.common.signing import verify_signed_value
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'ProfilerMiddleware',
+    'arm_profiler',
+    'list_profiles',
+    'read_profile'
+]
+
+
+logger = getLogger("app")
+
+PROFILE_HEADER = "x-profile-request"
+EXCLUDED_PATHS = re.compile(
+    rf"/(admin|{Settings.metrics_path}|{Settings.healthcheck_path})(/|$)"
+)
+PROFILE_ID_PATTERN = re.compile(r"^[a-f0-9]{32}$")
+
+_counter_struct = Struct("q")
+
+
+_profiles_dir: Union[str, None] = None
+
+
+def _get_profiles_dir() -> str:
+    global _profiles_dir
+
+    if _profiles_dir is not None:
+        return _profiles_dir
+
+    directory = path.join(Settings.diagnostics_dir, "profiles")
+    try:
+        makedirs(directory, exist_ok=True)
+    except OSError:
+        fallback = path.join(gettempdir(), "easyread-profiles")
+        makedirs(fallback, exist_ok=True)
+        logger.warning(f"Diagnostics directory is not writable - using '{fallback}' instead.")
+        directory = fallback
+
+    _profiles_dir = directory
+    return directory
+
+
+class SharedCounter:
+    """
+    Signed 64-bit counter in shared memory, visible to all workers on
+    the node. Reads are lock-free; updates are serialised with ``flock``.
+    """
+
+    def __init__(self, filename: str):
+        self._fp = open(filename, "a+b")
+        if self._fp.seek(0, 2) < _counter_struct.size:
+            self._fp.truncate(_counter_struct.size)
+        self._buffer = mmap.mmap(self._fp.fileno(), _counter_struct.size)
+
+    @property
+    def value(self) -> int:
+        return _counter_struct.unpack_from(self._buffer, 0)[0]
+
+    def set(self, value: int):
+        flock(self._fp, LOCK_EX)
+        try:
+            _counter_struct.pack_into(self._buffer, 0, value)
+        finally:
+            flock(self._fp, LOCK_UN)
+
+    def take(self) -> bool:
+        """
+        Decrements the counter if it is positive.
+
+        Returns
+        -------
+        bool
+            Whether a unit was taken.
+        """
+        if self.value <= 0:
+            return False
+
+        flock(self._fp, LOCK_EX)
+        try:
+            current = _counter_struct.unpack_from(self._buffer, 0)[0]
+            if current <= 0:
+                return False
+            _counter_struct.pack_into(self._buffer, 0, current - 1)
+            return True
+        finally:
+            flock(self._fp, LOCK_UN)
+
+
+class _TaggedIterator:
+    """
+    Drives a coroutine on behalf of the awaiting task, marking the
+    sampler as "in request" for as long as each step of the coroutine
+    runs. Samples taken while another request holds the loop are
+    therefore not attributed to the profiled one.
+    """
+
+    def __init__(self, coro, sampler: 'StackSampler', profile: 'Profile'):
+        self._coro = coro
+        self._sampler = sampler
+        self._profile = profile
+
+    def __await__(self):
+        return self
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        return self.send(None)
+
+    def send(self, value):
+        previous = self._sampler.current
+        self._sampler.current = self._profile
+        try:
+            return self._coro.send(value)
+        finally:
+            self._sampler.current = previous
+
+    def throw(self, *args):
+        previous = self._sampler.current
+        self._sampler.current = self._profile
+        try:
+            return self._coro.throw(*args)
+        finally:
+            self._sampler.current = previous
+
+    def close(self):
+        return self._coro.close()
+
+
+class Profile:
+    def __init__(self, scope: dict, reason: str):
+        self.id = uuid4().hex
+        self.path = scope.get("path")
+        self.query_string = scope.get("query_string", bytes()).decode(errors="replace")
+        self.reason = reason
+        self.started = time()
+        self.duration = None
+        self.samples: StackCounter = StackCounter()
+
+    @property
+    def metadata(self) -> dict:
+        return {
+            "id": self.id,
+            "pid": getpid(),
+            "path": self.path,
+            "query_string": self.query_string,
+            "reason": self.reason,
+            "started": self.started,
+            "duration": self.duration,
+            "samples": sum(self.samples.values()),
+            "interval": Settings.profiler_interval
+        }
+
+    def save(self, directory: str):
+        folded = "\n".join(f"{stack} {count}" for stack, count in self.samples.most_common())
+
+        with open(path.join(directory, f"{self.id}.folded"), "w") as fp:
+            fp.write(folded)
+
+        with open(path.join(directory, f"{self.id}.json"), "wb") as fp:
+            fp.write(dumps(self.metadata))
+
+
+class StackSampler:
+    """
+    Statistical sampler for the event loop thread of the worker. The
+    helper thread only runs while at least one profiled request is in
+    flight, and only keeps the samples taken while the profiled request
+    itself holds the loop.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.current: Union[Profile, None] = None
+        self._loop_thread_id = None
+        self._active = 0
+        self._lock = Lock()
+        self._wake = Event()
+        self._thread: Union[Thread, None] = None
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        stack = list()
+        while frame is not None:
+            code = frame.f_code
+            filename = code.co_filename.rsplit("site-packages/", 1)[-1]
+            stack.append(f"{code.co_name} ({filename}:{code.co_firstlineno})")
+            frame = frame.f_back
+
+        return ";".join(reversed(stack))
+
+    def _run(self):
+        while True:
+            # Blocks for as long as no profiled request is in flight.
+            self._wake.wait()
+
+            profile = self.current
+            frame = sys._current_frames().get(self._loop_thread_id)
+
+            if profile is not None and frame is not None:
+                stack = self._collapse(frame)
+                # Discard the sample if the loop moved on to another
+                # task while the stack was being captured.
+                if self.current is profile:
+                    profile.samples[stack] += 1
+
+            # Frames must not be kept alive between samples.
+            frame = None
+            sleep(self.interval)
+
+    def enter(self):
+        with self._lock:
+            self._loop_thread_id = get_ident()
+            self._active += 1
+            self._wake.set()
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = Thread(target=self._run, name="stack-sampler", daemon=True)
+                self._thread.start()
+
+    def exit(self):
+        with self._lock:
+            self._active -= 1
+            if self._active == 0:
+                self._wake.clear()
+
+    async def run(self, coro, profile: Profile):
+        self.enter()
+        start = perf_counter()
+        try:
+            return await _TaggedIterator(coro, self, profile)
+        finally:
+            profile.duration = perf_counter() - start
+            self.exit()
+
+
+sampler = StackSampler(Settings.profiler_interval)
+
+_armed: Union[SharedCounter, None] = None
+_armed_unavailable = False
+
+
+def _get_armed_counter() -> SharedCounter:
+    global _armed
+
+    if _armed is None:
+        _armed = SharedCounter(path.join(_get_profiles_dir(), "armed"))
+
+    return _armed
+
+
+def _take_armed() -> bool:
+    global _armed_unavailable
+
+    if _armed_unavailable:
+        return False
+
+    try:
+        return _get_armed_counter().take()
+    except OSError as err:
+        # Requests must never fail for want of a profiler.
+        _armed_unavailable = True
+        logger.warning(f"Profiler counter is unavailable - not profiling armed requests: {err}")
+        return False
+
+
+def arm_profiler(requests: int) -> int:
+    """
+    Arms the profiler for the next ``requests`` requests handled by any
+    worker on the node. Setting zero disarms it.
+    """
+    counter = _get_armed_counter()
+    counter.set(max(requests, 0))
+    return counter.value
+
+
+def _prune_profiles(directory: str):
+    profiles = sorted(
+        (filename for filename in listdir(directory) if filename.endswith(".json")),
+        key=lambda filename: path.getmtime(path.join(directory, filename))
+    )
+
+    for filename in profiles[:-Settings.profiler_max_profiles]:
+        profile_id = filename[:-5]
+        for extension in ("json", "folded"):
+            try:
+                remove(path.join(directory, f"{profile_id}.{extension}"))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> List[Dict]:
+    directory = _get_profiles_dir()
+    profiles = list()
+
+    for filename in listdir(directory):
+        if not filename.endswith(".json"):
+            continue
+
+        try:
+            with open(path.join(directory, filename), "rb") as fp:
+                profiles.append(loads(fp.read()))
+        except (FileNotFoundError, ValueError):
+            continue
+
+    return sorted(profiles, key=lambda item: item["started"], reverse=True)
+
+
+def read_profile(profile_id: str) -> Union[str, None]:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+
+    try:
+        with open(path.join(_get_profiles_dir(), f"{profile_id}.folded")) as fp:
+            return fp.read()
+    except FileNotFoundError:
+        return None
+
+
+class ProfilerMiddleware:
+    """
+    Profiles requests that carry a valid signed ``X-Profile-Request``
+    header, or that are admitted while the profiler is armed.
+
+    This is a plain ASGI middleware and must be the innermost one: the
+    ``BaseHTTPMiddleware`` classes run the rest of the stack in a new
+    task, so the endpoint must be wrapped from below them to be sampled.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def _get_reason(self, scope) -> Union[str, None]:
+        if EXCLUDED_PATHS.search(scope["path"]):
+            return None
+
+        for key, value in scope.get("headers", list()):
+            if key == PROFILE_HEADER.encode():
+                if verify_signed_value(value.decode(errors="replace")) == "profile":
+                    return "header"
+
+        if _take_armed():
+            return "armed"
+
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        reason = self._get_reason(scope)
+        if reason is None:
+            return await self.app(scope, receive, send)
+
+        profile = Profile(scope, reason)
+        try:
+            return await sampler.run(self.app(scope, receive, send), profile)
+        finally:
+            try:
+                directory = _get_profiles_dir()
+                profile.save(directory)
+                _prune_profiles(directory)
+            except OSError as err:
+                logger.warning(f"Failed to store profile {profile.id}: {err}")
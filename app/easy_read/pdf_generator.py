@@ -4,26 +4,34 @@
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
-from typing import Union
+from typing import Any, Dict, Union
 from http import HTTPStatus
 import re
-from asyncio import sleep
+from asyncio import sleep, get_running_loop
 
 # 3rd party:
-from latex import build_pdf
 from starlette.responses import RedirectResponse
 
 # Internal: 
 from app.storage import AsyncStorageClient
 from app.common.utils import get_release_timestamp
 from app.landing.views import get_home_page
-from app.postcode.views import postcode_page
-from app.template_processor.template import smallest_area_name, render_template
+from app.area.views import area_page
+from app.template_processor.template import (
+    smallest_area_name, smallest_area_type, smallest_area_code, render_template
+)
+from app.metrics import pdf_build_duration, pdf_requests
+from app.diagnostics import loop_phase
+from app.common.deadline import no_deadline
+from app.popularity import record_area_view
+from app.postcode.utils import get_validated_postcode
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 __all__ = [
-    'create_and_redirect'
+    'create_and_redirect',
+    'generate_pdf',
+    'get_pdf_location'
 ]
 
 
@@ -38,7 +46,7 @@ def name2url(name):
     return re.sub(r"['.\s&,]", "-", name)
 
 
-async def generate_pdf(request, data, area_type: str, timestamp: str) -> bytes:
+async def generate_pdf(request, data, area_type: str, timestamp: str, in_thread: bool = False) -> bytes:
     if area_type is None:
         resp = await render_template(
             request,
@@ -62,11 +70,41 @@ async def generate_pdf(request, data, area_type: str, timestamp: str) -> bytes:
             )
         )
 
-    pdf_raw = build_pdf(resp)
+    # Only needed on this path - imported on first use.
+    from latex import build_pdf
+
+    if in_thread:
+        # Off the event loop, so that requests served meanwhile do not
+        # wait for the build.
+        with pdf_build_duration.time():
+            pdf_raw = await get_running_loop().run_in_executor(None, build_pdf, resp)
+    else:
+        with pdf_build_duration.time(), loop_phase("pdf_build"):
+            pdf_raw = build_pdf(resp)
 
     return pdf_raw.data
 
 
+def get_pdf_location(data, area_type: str, timestamp: str) -> Dict[str, Any]:
+    """
+    Returns the storage arguments of the PDF of the data for the given
+    release - including its ``path`` in ``CONTAINER``.
+    """
+    date = timestamp.split("T")[0]
+    area_name = smallest_area_name(data)
+
+    filename = f"ER_{name2url(area_name)}_{date}.pdf"
+
+    return dict(
+        container=CONTAINER,
+        path=f"easy_read/{date}/{area_type}/{filename}",
+        compressed=False,
+        content_type=PDF_TYPE,
+        cache_control=PDF_CACHE,
+        content_disposition=f'inline; filename="ER_{area_name}_{date}.pdf"'
+    )
+
+
 async def create_and_redirect(request):
     area_type = request.path_params.get("area_type", "nation")  # type: str
     area_code = request.path_params.get("area_code", "E92000001")  # type: Union[str, None]
@@ -75,23 +113,16 @@ async def create_and_redirect(request):
 
     get_data = get_home_page
     if area_code is not None and area_code != "E92000001":
-        get_data = postcode_page
+        get_data = area_page
 
     data = await get_data(request, timestamp, render=False)
-    date = timestamp.split("T")[0]
-    area_name = smallest_area_name(data)
 
-    filename = f"ER_{name2url(area_name)}_{date}.pdf"
-    path = f"easy_read/{date}/{area_type}/{filename}"
+    if get_data is area_page and data.size:
+        postcode = get_validated_postcode(request.query_params.get("postcode", ""))
+        record_area_view(smallest_area_type(data), smallest_area_code(data), postcode)
 
-    storage_kws = dict(
-        container=CONTAINER,
-        path=path,
-        compressed=False,
-        content_type=PDF_TYPE,
-        cache_control=PDF_CACHE,
-        content_disposition=f'inline; filename="ER_{area_name}_{date}.pdf"'
-    )
+    storage_kws = get_pdf_location(data, area_type, timestamp)
+    path = storage_kws["path"]
 
     host = request.headers.get("X-Forwarded-Host", "")
     if host:
@@ -111,6 +142,7 @@ async def create_and_redirect(request):
                     pdf = await generate_pdf(request, data, area_type, timestamp)
                     await cli.upload(pdf)
 
+                pdf_requests.inc(outcome="generated")
                 return resp
 
             counter = 0
@@ -120,12 +152,16 @@ async def create_and_redirect(request):
                     counter += 1
                     continue
 
+                pdf_requests.inc(outcome="existing" if not counter else "waited")
                 return resp
 
+            pdf_requests.inc(outcome="lock_timeout")
             raise RuntimeError("Failed to obtained the file - lock was not released.")
         except Exception as err:
-            # Remove the blob on exception - data may be incomplete.
-            if not isinstance(err, RuntimeError) and await cli.exists():
-                await cli.delete()
+            # Remove the blob on exception - data may be incomplete. This
+            # must happen even if the request has run out of time.
+            with no_deadline():
+                if not isinstance(err, RuntimeError) and await cli.exists():
+                    await cli.delete()
             raise err
 
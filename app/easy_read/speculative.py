@@ -0,0 +1,173 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import mmap
+from asyncio import Task, get_running_loop, wait_for
+from fcntl import flock, LOCK_EX, LOCK_UN
+from logging import getLogger
+from os import makedirs, path
+from struct import Struct
+from time import time
+from typing import Set, Union, TYPE_CHECKING
+
+# 3rd party:
+from cachetools import LRUCache
+from starlette.requests import Request
+
+if TYPE_CHECKING:
+    from pandas import DataFrame
+
+# Internal:
+from app.config import Settings
+from app.storage import AsyncStorageClient
+from app.common.deadline import no_deadline
+from app.metrics.registry import Counter
+from app.middleware.admission import has_spare_capacity
+from app.template_processor.template import smallest_area_type
+from .pdf_generator import generate_pdf, get_pdf_location
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'schedule_pdf_build'
+]
+
+
+logger = getLogger("app")
+
+BUCKET_FILENAME = "speculative-pdf.bucket"
+MAX_KNOWN_PDFS = 4096
+
+# Tokens, time of the last refill.
+_bucket_struct = Struct("dd")
+
+speculative_pdf_builds = Counter(
+    "easyread_speculative_pdf_builds",
+    "Number of PDFs considered for a speculative build after a page view, by outcome.",
+    labelnames=("outcome",)
+)
+
+# Builds in flight in the worker - the event loop only keeps weak references.
+_builds: Set[Task] = set()
+
+# Paths of the PDFs known to exist.
+_known: LRUCache = LRUCache(maxsize=MAX_KNOWN_PDFS)
+
+
+class SharedTokenBucket:
+    """
+    Token bucket in shared memory, refilled at ``rate`` tokens per minute
+    up to ``rate``, and shared by all workers on the node.
+    """
+
+    def __init__(self, filename: str, rate: float):
+        self.rate = rate
+        self._fp = open(filename, "a+b")
+        if self._fp.seek(0, 2) < _bucket_struct.size:
+            self._fp.truncate(_bucket_struct.size)
+        self._buffer = mmap.mmap(self._fp.fileno(), _bucket_struct.size)
+
+    def take(self) -> bool:
+        flock(self._fp, LOCK_EX)
+        try:
+            tokens, updated = _bucket_struct.unpack_from(self._buffer, 0)
+            now = time()
+
+            tokens = min(tokens + (now - updated) * self.rate / 60, self.rate)
+            taken = tokens >= 1
+
+            _bucket_struct.pack_into(self._buffer, 0, tokens - taken, now)
+        finally:
+            flock(self._fp, LOCK_UN)
+
+        return taken
+
+
+_bucket: Union[SharedTokenBucket, None] = None
+
+
+def _take_token() -> bool:
+    global _bucket
+
+    if _bucket is None:
+        makedirs(Settings.shared_cache_dir, exist_ok=True)
+        filename = path.join(Settings.shared_cache_dir, BUCKET_FILENAME)
+        _bucket = SharedTokenBucket(filename, Settings.speculative_pdf_rate)
+
+    return _bucket.take()
+
+
+async def _build(request: Request, timestamp: str, data: 'DataFrame', area_type: str):
+    storage_kws = get_pdf_location(data, area_type, timestamp)
+
+    from azure.core.exceptions import ResourceExistsError
+
+    try:
+        async with AsyncStorageClient(**storage_kws) as cli:
+            if await cli.exists():
+                outcome = "existing"
+            else:
+                pdf = await generate_pdf(request, data, area_type, timestamp, in_thread=True)
+
+                try:
+                    # Uploaded in one go, so that the blob is never seen
+                    # incomplete; a download request that got there first
+                    # has priority.
+                    await cli.upload(pdf, overwrite=False)
+                    outcome = "built"
+                except ResourceExistsError:
+                    outcome = "raced"
+    except Exception as err:
+        logger.warning(f"Speculative build of '{storage_kws['path']}' failed: {err!r}")
+        speculative_pdf_builds.inc(outcome="failed")
+        return
+
+    _known[storage_kws["path"]] = True
+    speculative_pdf_builds.inc(outcome=outcome)
+
+
+async def _build_with_timeout(request: Request, timestamp: str, data: 'DataFrame', area_type: str):
+    try:
+        await wait_for(_build(request, timestamp, data, area_type), timeout=Settings.pdf_request_timeout)
+    except Exception as err:
+        logger.warning(f"Speculative PDF build timed out: {err!r}")
+        speculative_pdf_builds.inc(outcome="failed")
+
+
+def schedule_pdf_build(request: Request, timestamp: str, data: 'DataFrame'):
+    """
+    Builds the PDF of the page just served in the background - if
+    ``SPECULATIVE_PDF`` is enabled - so that it is ready by the time the
+    user asks for it.
+
+    The build reuses the data of the page. It is skipped if the PDF is
+    known to exist, if the worker is busy with requests or with another
+    speculative build, or if the node has used up its allowance of
+    ``SPECULATIVE_PDF_RATE`` builds per minute.
+    """
+    if not Settings.speculative_pdf:
+        return
+
+    area_type = smallest_area_type(data)
+    pdf_path = get_pdf_location(data, area_type, timestamp)["path"]
+
+    if pdf_path in _known:
+        outcome = "known"
+    elif _builds or not has_spare_capacity():
+        outcome = "busy"
+    elif not _take_token():
+        outcome = "rate_limited"
+    else:
+        # Not bound by the deadline of the request that triggered it.
+        with no_deadline():
+            task = get_running_loop().create_task(
+                _build_with_timeout(request, timestamp, data, area_type)
+            )
+
+        _builds.add(task)
+        task.add_done_callback(_builds.discard)
+        return
+
+    speculative_pdf_builds.inc(outcome=outcome)
@@ -16,6 +16,7 @@ Contributors:  Pouria Hadjibagheri
 # 3rd party:
 
 # Internal: 
+from .pages import *
 from .views import *
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
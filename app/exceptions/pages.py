@@ -0,0 +1,136 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from datetime import datetime
+from http import HTTPStatus
+from logging import getLogger
+from typing import Dict
+
+# 3rd party:
+from starlette.requests import Request
+from starlette.responses import HTMLResponse
+from starlette.routing import Router
+
+# Internal:
+from app.config import Settings
+from app.template_processor.template import template
+from app.common.utils import get_release_timestamp, on_release_change, get_synthetic_request
+from app.common.deadline import set_deadline, request_deadline
+from app.diagnostics import register_cache
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'error_pages',
+    'prerender_error_pages'
+]
+
+
+logger = getLogger("app")
+
+NOT_FOUND_TEMPLATE = "html/errors/40x.html"
+SERVER_ERROR_TEMPLATE = "html/errors/500.html"
+UNAVAILABLE_TEMPLATE = "html/errors/503.html"
+
+ERROR_CACHE_CONTROL = "no-cache, max-age=0"
+RELEASE_TIMEOUT = 5  # seconds - startup must not wait for an unavailable storage
+
+# Timestamp format expected by the `format_timestamp` filter.
+TIMESTAMP_FORMAT = "%Y-%m-%dT%H:%M:%S.%fZ"
+
+
+def get_error_template(status_code: int) -> str:
+    if status_code == HTTPStatus.SERVICE_UNAVAILABLE:
+        return UNAVAILABLE_TEMPLATE
+
+    if status_code >= 500:
+        return SERVER_ERROR_TEMPLATE
+
+    return NOT_FOUND_TEMPLATE
+
+
+class ErrorPages:
+    """
+    Error pages rendered ahead of time and held in memory, so that error
+    responses involve no I/O - in particular, no call to the storage for
+    the release timestamp while the storage may be what is failing.
+
+    Pages are rendered once per status code for the service domain -
+    whatever the host of the request, so that arbitrary hosts cannot
+    evict them - and are discarded when a new release is seen.
+    """
+
+    def __init__(self):
+        self.timestamp = datetime.utcnow().strftime(TIMESTAMP_FORMAT)
+        self._pages: Dict[int, bytes] = dict()
+
+    def _render(self, router: Router, status_code: int) -> bytes:
+        # Absolute URLs to static assets are those of the service domain.
+        request = get_synthetic_request(router)
+        status = HTTPStatus(status_code)
+        error_template = template.get_template(get_error_template(status_code))
+
+        content = error_template.render(
+            request=request,
+            app_insight_token=Settings.instrumentation_key,
+            DEBUG=Settings.DEBUG,
+            timestamp=self.timestamp,
+            # The base template expects the dataset of the page.
+            data=None,
+            response_code=status.value,
+            response_message=status.phrase
+        )
+
+        return content.encode()
+
+    def get(self, request: Request, status_code: int) -> bytes:
+        page = self._pages.get(status_code)
+
+        if page is None:
+            # The router is only in the scope if the request reached it
+            # - i.e. not for errors raised by the middleware.
+            router = request.scope.get("router") or request.scope["app"].router
+            page = self._pages[status_code] = self._render(router, status_code)
+
+        return page
+
+    def response(self, request: Request, status_code: int) -> HTMLResponse:
+        return HTMLResponse(
+            self.get(request, status_code),
+            status_code=status_code,
+            headers={"Cache-Control": ERROR_CACHE_CONTROL}
+        )
+
+    def set_release(self, timestamp: str):
+        self.timestamp = timestamp
+        self._pages.clear()
+
+
+error_pages = ErrorPages()
+
+
+def prerender_error_pages(router: Router):
+    """
+    Returns a startup handler that renders the error pages for the
+    service domain, using the latest release timestamp if available.
+    """
+    async def prerender():
+        token = set_deadline(RELEASE_TIMEOUT)
+        try:
+            error_pages.set_release(await get_release_timestamp())
+        except Exception as err:
+            logger.warning(f"Error pages rendered without the release timestamp: {err}")
+        finally:
+            request_deadline.reset(token)
+
+        request = get_synthetic_request(router)
+        for status_code in (HTTPStatus.NOT_FOUND, HTTPStatus.INTERNAL_SERVER_ERROR, HTTPStatus.SERVICE_UNAVAILABLE):
+            error_pages.get(request, status_code.value)
+
+    return prerender
+
+
+on_release_change(error_pages.set_release)
+register_cache("error_pages", error_pages._pages)
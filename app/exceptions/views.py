@@ -5,13 +5,17 @@
 # Python:
 from logging import getLogger
 from http import HTTPStatus
+from math import ceil
 from starlette.requests import Request
 
 # 3rd party:
+from starlette.responses import PlainTextResponse, Response
 
 # Internal:
-from app.template_processor import render_template
 from app.config import Settings
+from app.common.deadline import DeadlineExceeded
+from app.resilience import CircuitOpen, get_stale_page
+from .pages import error_pages
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -22,6 +26,8 @@ __all__ = [
 
 logger = getLogger(__name__)
 
+DEADLINE_RETRY_AFTER = 5  # seconds
+
 
 async def handle_404(request: Request, exc, **context):
     status = HTTPStatus.NOT_FOUND
@@ -45,16 +51,7 @@ async def handle_404(request: Request, exc, **context):
 
     logger.warning(exc, extra=custom_dims, exc_info=True)
 
-    return await render_template(
-        request,
-        "html/errors/40x.html",
-        context={
-            "status_code": status_code,
-            "status_detail": status_detail,
-            **context
-        },
-        status_code=status_code
-    )
+    return error_pages.response(request, status_code)
 
 
 async def handle_500(request: Request, exc, **context):
@@ -83,19 +80,66 @@ async def handle_500(request: Request, exc, **context):
 
     logger.error(exc, extra=custom_dims, exc_info=True)
 
-    return await render_template(
-        request,
-        "html/errors/50x.html",
-        context={
-            "status_code": status_code,
-            "status_detail": status_detail,
-            **context
-        },
-        status_code=status_code
+    return error_pages.response(request, status_code)
+
+
+def unavailable_response(request: Request, retry_after: float) -> Response:
+    # Falls back to the last-known-good copy of the page where there is
+    # one. There is no point rendering an error page otherwise; that may
+    # itself involve calls to the storage.
+    stale_page = get_stale_page(request)
+    if stale_page is not None:
+        return stale_page
+
+    status = HTTPStatus.SERVICE_UNAVAILABLE
+
+    return PlainTextResponse(
+        status.phrase,
+        status_code=status.value,
+        headers={
+            "Retry-After": str(ceil(retry_after)),
+            "Cache-Control": "no-store"
+        }
+    )
+
+
+async def handle_deadline_exceeded(request: Request, exc: DeadlineExceeded):
+    custom_dims = dict(
+        custom_dimensions=dict(
+            event="deadline_exceeded",
+            stage=exc.stage,
+            url=str(request.url),
+            path=str(request.url.path),
+            api_environment=Settings.ENVIRONMENT,
+            server_location=Settings.server_location
+        )
     )
 
+    logger.warning(exc, extra=custom_dims)
+
+    return unavailable_response(request, DEADLINE_RETRY_AFTER)
+
+
+async def handle_circuit_open(request: Request, exc: CircuitOpen):
+    custom_dims = dict(
+        custom_dimensions=dict(
+            event="circuit_open",
+            dependency=exc.dependency,
+            url=str(request.url),
+            path=str(request.url.path),
+            api_environment=Settings.ENVIRONMENT,
+            server_location=Settings.server_location
+        )
+    )
+
+    logger.warning(exc, extra=custom_dims)
+
+    return unavailable_response(request, max(exc.retry_after, 1))
+
 
 exception_handlers = {
+    DeadlineExceeded: handle_deadline_exceeded,
+    CircuitOpen: handle_circuit_open,
     404: handle_404,
     500: handle_500,
     502: handle_500,
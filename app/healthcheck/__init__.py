@@ -17,6 +17,7 @@ Contributors:  Pouria Hadjibagheri
 
 # Internal: 
 from .monitor import *
+from .warmup import *
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Header
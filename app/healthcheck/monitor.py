@@ -12,17 +12,26 @@ Contributors:  Pouria Hadjibagheri
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
-from typing import Union
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Union
 from http import HTTPStatus
-from asyncio import get_event_loop, wait
+from asyncio import (
+    gather, get_running_loop, shield, sleep, wait_for, CancelledError, Task
+)
+from logging import getLogger
+from time import perf_counter, time
 
 # 3rd party:
 from starlette.requests import Request
 from starlette.responses import JSONResponse, Response
 
 # Internal: 
-from app.database.postgres import Connection
+from app.config import Settings
+from app.database.postgres import Connection, get_endpoints, get_pool_usage
 from app.storage import AsyncStorageClient
+from app.common.utils import on_release_change
+from app.metrics.registry import Gauge
+from app.resilience.breaker import storage_breaker, OPEN
+from .warmup import is_warm, get_warmup_report
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Header
@@ -33,39 +42,270 @@ __version__ = "0.0.1"
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 __all__ = [
-    'run_healthcheck'
+    'run_healthcheck',
+    'run_liveness_check',
+    'start_healthcheck_monitor',
+    'stop_healthcheck_monitor'
 ]
 
 
-async def test_db():
+logger = getLogger("app")
+
+dependency_healthy = Gauge(
+    "easyread_dependency_healthy",
+    "Outcome of the latest background check of a dependency: 1 healthy, 0 unhealthy.",
+    labelnames=("dependency",),
+    multiprocess_mode="all"
+)
+
+dependency_check_latency = Gauge(
+    "easyread_dependency_check_seconds",
+    "Duration of the latest background check of a dependency.",
+    labelnames=("dependency",),
+    multiprocess_mode="all"
+)
+
+
+class CheckResult(NamedTuple):
+    healthy: bool
+    latency: float
+    checked_at: float
+    detail: str
+
+
+async def test_db() -> str:
     async with Connection() as conn:
         db_active = await conn.fetchval("SELECT NOW() AS timestamp;")
 
-    return {"db": f"healthy - {db_active}"}
+    return str(db_active)
 
 
-async def test_storage():
+async def test_storage() -> str:
     async with AsyncStorageClient("pipeline", "info/seen") as blob_client:
         blob = await blob_client.download()
         blob_data = await blob.readall()
 
-    return {"storage": f"healthy - {blob_data.decode()}"}
+    return blob_data.decode()
 
 
-async def run_healthcheck(request: Request) -> Union[JSONResponse, Response]:
-    loop = get_event_loop()
+DEPENDENCY_CHECKS: Dict[str, Callable[[], Awaitable[str]]] = {
+    "db": test_db,
+    "storage": test_storage
+}
+
+_results: Dict[str, CheckResult] = dict()
+_release: Union[str, None] = None
+_in_flight: Union[Task, None] = None
+_task: Union[Task, None] = None
+
+
+def _set_release(timestamp: str):
+    global _release
+    _release = timestamp
+
+
+async def _run_check(name: str, check: Callable[[], Awaitable[str]]) -> CheckResult:
+    start = perf_counter()
+
+    try:
+        detail = await wait_for(check(), timeout=Settings.healthcheck_timeout)
+        healthy = True
+    except CancelledError:
+        raise
+    except Exception as err:
+        detail = f"{err.__class__.__name__}: {err}".rstrip(": ")
+        healthy = False
+
+    result = _results[name] = CheckResult(
+        healthy=healthy,
+        latency=perf_counter() - start,
+        checked_at=time(),
+        detail=detail
+    )
+
+    dependency_healthy.set(int(healthy), dependency=name)
+    dependency_check_latency.set(result.latency, dependency=name)
+
+    if not healthy:
+        logger.warning(
+            f"Healthcheck failed for '{name}': {detail}",
+            extra=dict(
+                custom_dimensions=dict(
+                    event="healthcheck_failed",
+                    dependency=name,
+                    latency=result.latency,
+                    server_location=Settings.server_location
+                )
+            )
+        )
+
+    return result
+
+
+async def _run_checks() -> Dict[str, CheckResult]:
+    results = await gather(*(
+        _run_check(name, check)
+        for name, check in DEPENDENCY_CHECKS.items()
+    ))
+
+    return dict(zip(DEPENDENCY_CHECKS, results))
+
+
+async def run_checks() -> Dict[str, CheckResult]:
+    """
+    Checks all dependencies now. Concurrent callers share the same
+    round of checks, so deep probes cannot multiply the load.
+    """
+    global _in_flight
+
+    if _in_flight is None or _in_flight.done():
+        _in_flight = get_running_loop().create_task(_run_checks())
+
+    return await shield(_in_flight)
+
+
+def get_readiness_issues() -> List[str]:
+    """
+    Reasons why the worker should not receive traffic, based on the
+    latest checks - or an empty list if it is ready.
+    """
+    issues = list()
+    now = time()
+
+    if not is_warm():
+        issues.append("warm-up in progress")
+
+    if _release is None:
+        issues.append("release timestamp not loaded")
 
-    tasks = [
-        # loop.create_task(test_db()),  # Too frequent - needs to be revised.
-        loop.create_task(test_storage())
-    ]
+    for name in DEPENDENCY_CHECKS:
+        result = _results.get(name)
 
-    response = dict()
-    done, pending = await wait(tasks)
-    for future in done:
-        response.update(future.result())
+        if result is None:
+            issues.append(f"{name}: not checked yet")
+        elif not result.healthy:
+            issues.append(f"{name}: {result.detail}")
+        elif now - result.checked_at > Settings.healthcheck_max_age:
+            issues.append(f"{name}: latest check is out of date")
 
+    # Connections fail over to the other endpoints while any is up.
+    if all(endpoint.breaker.state == OPEN for endpoint in get_endpoints()):
+        issues.append("db: circuit breakers of all endpoints open")
+
+    if storage_breaker.state == OPEN:
+        issues.append(f"{storage_breaker.name}: circuit breaker open")
+
+    if get_pool_usage().is_saturated:
+        issues.append("db: connection pool saturated")
+
+    return issues
+
+
+def get_deep_report(results: Dict[str, CheckResult]) -> Dict[str, Any]:
+    pool_usage = get_pool_usage()
+
+    return {
+        "release": _release,
+        "warm_up": get_warmup_report(),
+        "dependencies": {
+            name: {
+                "healthy": result.healthy,
+                "latency_ms": round(result.latency * 1000, 2),
+                "checked_at": result.checked_at,
+                "detail": result.detail
+            }
+            for name, result in results.items()
+        },
+        "breakers": {
+            breaker.name: breaker.state
+            for breaker in (*(endpoint.breaker for endpoint in get_endpoints()), storage_breaker)
+        },
+        "endpoints": {
+            endpoint.name: {
+                "role": endpoint.role,
+                "in_use": endpoint.in_use,
+                "waiting": endpoint.waiting
+            }
+            for endpoint in get_endpoints()
+        },
+        "pool": {
+            "in_use": pool_usage.in_use,
+            "waiting": pool_usage.waiting,
+            "max_size": pool_usage.max_size
+        }
+    }
+
+
+async def run_liveness_check(request: Request) -> Union[JSONResponse, Response]:
+    """
+    The worker is alive as long as it can respond; dependencies are
+    not considered here.
+    """
     if request.method == 'GET':
-        return JSONResponse(response, status_code=HTTPStatus.OK.real)
+        return JSONResponse({"status": "alive"}, status_code=HTTPStatus.OK.real)
 
     return Response(content=None, status_code=HTTPStatus.NO_CONTENT.real)
+
+
+async def run_healthcheck(request: Request) -> Union[JSONResponse, Response]:
+    """
+    Readiness of the worker, answered from the results of the background
+    checks. With ``?deep=1``, dependencies are checked there and then and
+    the timing of each check is included in the response.
+    """
+    deep = request.query_params.get("deep") == "1"
+
+    results = _results
+    if deep:
+        results = await run_checks()
+
+    issues = get_readiness_issues()
+    status_code = HTTPStatus.SERVICE_UNAVAILABLE if issues else HTTPStatus.OK
+
+    if request.method != 'GET':
+        if not issues:
+            status_code = HTTPStatus.NO_CONTENT
+
+        return Response(content=None, status_code=status_code.real)
+
+    response = {
+        "status": "not ready" if issues else "ready",
+        "issues": issues,
+        **{
+            name: f"{'healthy' if result.healthy else 'unhealthy'} - {result.detail}"
+            for name, result in results.items()
+        }
+    }
+
+    if deep:
+        response.update(get_deep_report(results))
+
+    return JSONResponse(response, status_code=status_code.real)
+
+
+async def _check_periodically():
+    while True:
+        await run_checks()
+        await sleep(Settings.healthcheck_interval)
+
+
+async def start_healthcheck_monitor():
+    global _task
+
+    if Settings.healthcheck_interval > 0:
+        _task = get_running_loop().create_task(_check_periodically())
+
+
+async def stop_healthcheck_monitor():
+    for task in (_task, _in_flight):
+        if task is None:
+            continue
+
+        task.cancel()
+        try:
+            await task
+        except CancelledError:
+            pass
+
+
+on_release_change(_set_release)
@@ -0,0 +1,249 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from asyncio import wait_for
+from functools import partial
+from logging import getLogger
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, Union
+from urllib.parse import urlencode
+
+# 3rd party:
+from starlette.routing import Router
+
+# Internal:
+from app.config import Settings
+from app.database.postgres import Connection
+from app.template_processor.template import compile_templates
+from app.common.utils import get_release_timestamp, get_synthetic_request, release_switch
+from app.common.deadline import set_deadline, request_deadline
+from app.common.preload import import_deferred_modules
+from app.views import get_page, get_page_key
+from app.area import AREA_TYPES, get_area_hierarchy
+from app.common.metric_registry import get_metric_ids
+from app.trends import get_trends
+from app.resilience import store_page
+from app.cache import cache_page
+from app.popularity import get_top_areas, untracked_views, viewed_area
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'warm_up',
+    'is_warm',
+    'get_warmup_report'
+]
+
+
+logger = getLogger("app")
+
+PENDING = "pending"
+COMPLETE = "complete"
+INCOMPLETE = "incomplete"
+
+_state = PENDING
+_steps: Dict[str, Dict[str, Any]] = dict()
+
+
+def is_warm() -> bool:
+    """
+    Whether the warm-up has finished - successfully or not - or is
+    disabled.
+    """
+    return _state != PENDING or Settings.warmup_timeout <= 0
+
+
+def get_warmup_report() -> Dict[str, Any]:
+    return {
+        "state": _state,
+        "steps": _steps
+    }
+
+
+async def _run_step(name: str, step: Callable[[], Awaitable[Any]]) -> Any:
+    start = perf_counter()
+    result = None
+
+    try:
+        result = await step()
+        succeeded = True
+    except Exception as err:
+        logger.warning(f"Warm-up step '{name}' failed: {err}")
+        succeeded = False
+
+    _steps[name] = {
+        "succeeded": succeeded,
+        "duration_ms": round((perf_counter() - start) * 1000, 2)
+    }
+
+    return result
+
+
+async def _open_pool():
+    async with Connection() as conn:
+        await conn.fetchval("SELECT 1;")
+
+
+async def _resolve_metric_ids():
+    await get_metric_ids()
+
+
+async def _import_modules():
+    import_deferred_modules()
+
+
+async def _compile_templates():
+    compile_templates()
+
+
+async def _load_area_hierarchy():
+    await get_area_hierarchy()
+
+
+async def _preload_page(router: Router, timestamp: str, postcode: Union[str, None] = None,
+                        area: Union[Tuple[str, str], None] = None):
+    if area is not None:
+        area_type, area_code = area
+        request = get_synthetic_request(
+            router,
+            path=f"/easy_read/{area_type}/{area_code}",
+            path_params=dict(area_type=area_type, area_code=area_code)
+        )
+    elif postcode is not None:
+        query_string = urlencode({"postcode": postcode})
+        request = get_synthetic_request(router, path="/easy_read", query_string=query_string)
+    else:
+        request = get_synthetic_request(router, path="/easy_read")
+
+    # Renders to warm up are not views; those of the pages served from
+    # the caches thereafter are.
+    viewed_area.set(None)
+    with untracked_views():
+        response = await get_page(request, timestamp)
+
+    # Also makes the pages available as last-known-good copies, and to
+    # the other workers.
+    store_page(request, response)
+    cache_page(get_page_key(request), timestamp, response, request, viewed_area.get())
+
+
+def _get_pages() -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    Postcodes in ``WARMUP_POSTCODES``, followed by one for each of the
+    ``WARMUP_TOP_AREAS`` most viewed areas on the node; and the areas
+    among them only ever viewed by their type and code.
+    """
+    postcodes = list(Settings.warmup_postcodes)
+    direct_areas = list()
+
+    try:
+        areas = get_top_areas(Settings.warmup_top_areas) if Settings.warmup_top_areas > 0 else list()
+    except OSError as err:
+        logger.warning(f"Failed to read the most viewed areas: {err}")
+        areas = list()
+
+    for area in areas:
+        if area.postcode is None:
+            if area.area_type in AREA_TYPES:
+                direct_areas.append((area.area_type, area.area_code))
+        elif area.postcode not in postcodes:
+            postcodes.append(area.postcode)
+
+    return postcodes, direct_areas
+
+
+async def _run_steps(router: Router):
+    await _run_step("imports", _import_modules)
+    await _run_step("templates", _compile_templates)
+    await _run_step("pool", _open_pool)
+    await _run_step("metric_ids", _resolve_metric_ids)
+
+    timestamp = await _run_step("release_timestamp", get_release_timestamp)
+    if timestamp is None:
+        raise RuntimeError("release timestamp unavailable")
+
+    await _run_step("trends", partial(get_trends, timestamp))
+    await _run_step("landing", partial(_preload_page, router, timestamp))
+
+    postcodes, direct_areas = _get_pages()
+
+    for postcode in postcodes:
+        await _run_step(f"postcode:{postcode}", partial(_preload_page, router, timestamp, postcode))
+
+    await _run_step("area_hierarchy", _load_area_hierarchy)
+
+    for area_type, area_code in direct_areas:
+        await _run_step(
+            f"area:{area_type}/{area_code}",
+            partial(_preload_page, router, timestamp, area=(area_type, area_code))
+        )
+
+
+async def _warm_release(router: Router, timestamp: str):
+    # Pages that fail are left to the first requests.
+    postcodes, direct_areas = _get_pages()
+    pages = [
+        *((postcode, None) for postcode in [None, *postcodes]),
+        *((None, area) for area in direct_areas)
+    ]
+
+    for postcode, area in pages:
+        try:
+            await _preload_page(router, timestamp, postcode, area)
+        except Exception as err:
+            name = "/".join(area) if area is not None else postcode or "landing"
+            logger.warning(f"Failed to warm release {timestamp} for '{name}': {err!r}")
+
+
+def warm_up(router: Router):
+    """
+    Returns a startup handler that prepares the worker before it accepts
+    traffic: imports the dependencies deferred to first use, compiles
+    the templates, opens the database pool, loads the release timestamp
+    and renders the landing page and the pages of the postcodes in
+    ``WARMUP_POSTCODES`` and of the most viewed areas - loading the
+    area hierarchy for those viewed by their type and code.
+
+    The warm-up is bound by ``WARMUP_TIMEOUT``; whatever is not done by
+    then is left to the first requests.
+
+    The same pages are rendered for each new release before the worker
+    switches to it - see ``ReleaseSwitch``.
+    """
+    release_switch.set_warmer(partial(_warm_release, router))
+
+    async def run_warm_up():
+        global _state
+
+        if Settings.warmup_timeout <= 0:
+            return
+
+        start = perf_counter()
+        token = set_deadline(Settings.warmup_timeout)
+
+        try:
+            await wait_for(_run_steps(router), timeout=Settings.warmup_timeout)
+            succeeded = all(step["succeeded"] for step in _steps.values())
+            _state = COMPLETE if succeeded else INCOMPLETE
+        except Exception as err:
+            logger.warning(f"Warm-up incomplete: {err}")
+            _state = INCOMPLETE
+        finally:
+            request_deadline.reset(token)
+
+        logger.info(
+            f"Warm-up {_state} in {perf_counter() - start:.2f}s",
+            extra=dict(
+                custom_dimensions=dict(
+                    event="warm_up_finished",
+                    state=_state,
+                    duration=perf_counter() - start,
+                    steps=_steps,
+                    server_location=Settings.server_location
+                )
+            )
+        )
+
+    return run_warm_up
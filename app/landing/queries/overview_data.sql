@@ -26,7 +26,7 @@ FROM (
           area_type = 'nation'
       AND area_name = 'England'
       AND date > ( DATE($1) - INTERVAL '56 days' )
-      AND metric = ANY( $2::VARCHAR[] )
+      AND metric_id = ANY( $2::INT[] )
     GROUP BY area_type, area_code, date, metric
 ) AS result
 WHERE result.rank = 1;
@@ -12,16 +12,23 @@ Contributors:  Pouria Hadjibagheri
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
-from typing import Union
+from typing import List, Union, TYPE_CHECKING
 from datetime import datetime
 from os.path import abspath, split as split_path, join as join_path
 
 # 3rd party:
-from pandas import DataFrame
+# Imported on first use; see `records_to_frame`.
+if TYPE_CHECKING:
+    from pandas import DataFrame
 
 # Internal:
-from ..database.postgres import Connection
+from ..database.postgres import Connection, records_to_frame
 from ..template_processor import render_template
+from ..diagnostics import loop_phase
+from ..resilience import with_fallback
+from ..cache import cached_dataset
+from ..common.metric_registry import get_metric_ids
+from ..trends import get_trends
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -37,73 +44,43 @@ with open(join_path(queries_dir, "overview_data.sql")) as fp:
     overview_data_query = fp.read()
 
 
-metrics = [
-    'newAdmissions',
-    'newAdmissionsChange',
-    'newAdmissionsChangePercentage',
-    'newAdmissionsRollingSum',
-    'newAdmissionsDirection',
-
-    'cumPeopleVaccinatedSpring23ByVaccinationDate75plus',
-
-    'newDailyNsoDeathsByDeathDateChange',
-    'newDailyNsoDeathsByDeathDateRollingSum',
-    'newDailyNsoDeathsByDeathDateChangePercentage',
-    'newDailyNsoDeathsByDeathDateDirection',
-    'newDailyNsoDeathsByDeathDate',
-
-    'newCasesBySpecimenDate',
-    'newCasesBySpecimenDateChange',
-    'newCasesBySpecimenDateChangePercentage',
-    'newCasesBySpecimenDateRollingSum',
-    'newCasesBySpecimenDateDirection',
-    'newCasesBySpecimenDateRollingRate',
-
-    'newVirusTestsByPublishDate',
-    'newVirusTestsByPublishDateChange',
-    'newVirusTestsByPublishDateChangePercentage',
-    'newVirusTestsByPublishDateRollingSum',
-    'newVirusTestsByPublishDateDirection',
-
-    'newVirusTestsBySpecimenDate',
-    'newVirusTestsBySpecimenDateChange',
-    'newVirusTestsBySpecimenDateChangePercentage',
-    'newVirusTestsBySpecimenDateRollingSum',
-    'newVirusTestsBySpecimenDateDirection',
-
-    'transmissionRateMin',
-    'transmissionRateMax',
-    'transmissionRateGrowthRateMin',
-    'transmissionRateGrowthRateMax',
-
-    'hospitalCases',
-    'covidOccupiedMVBeds'
-]
-
 
-async def get_landing_data(conn, timestamp):
+async def get_landing_data(conn, timestamp, metric_ids: List[int]):
     ts = datetime.fromisoformat(timestamp.replace("5Z", ""))
     query = overview_data_query.format(partition=f"{ts:%Y_%-m_%-d}_other")
 
-    values = conn.fetch(query, ts, metrics)
+    values = conn.fetch_prepared(query, ts, metric_ids)
 
-    df = DataFrame(
-        await values,
-        columns=["areaCode", "areaType", "areaName", "date", "metric", "value", "rank"]
-    )
+    records = await values
 
-    df = df.assign(formatted_date=df.date.map(lambda x: f"{x:%-d %B %Y}"))
+    with loop_phase("dataframe:landing"):
+        df = records_to_frame(
+            records,
+            columns=["areaCode", "areaType", "areaName", "date", "metric", "value", "rank"]
+        )
 
     return df
 
 
-async def get_home_page(request, timestamp: str, invalid_postcode=None, render=True) -> Union[render_template, DataFrame]:
-    async with Connection() as conn:
-        data = await get_landing_data(conn, timestamp)
+async def get_home_page(request, timestamp: str, invalid_postcode=None, render=True) -> Union[render_template, 'DataFrame']:
+    async def fetch_from_db():
+        # Resolved before a connection is taken from the pool.
+        metric_ids = await get_metric_ids()
+
+        async with Connection() as conn:
+            return await get_landing_data(conn, timestamp, metric_ids)
+
+    async def fetch_data():
+        return await cached_dataset(timestamp, "landing", fetch_from_db)
+
+    data = await with_fallback("landing", fetch_data)
 
     if not render:
         return data
 
+    # For England, as the rest of the page.
+    trends = await get_trends(timestamp)
+
     return await render_template(
         request,
         "html/easy_read.html",
@@ -111,5 +88,6 @@ async def get_home_page(request, timestamp: str, invalid_postcode=None, render=T
             "timestamp": timestamp,
             "data": data,
             "invalid_postcode": invalid_postcode,
+            "trends": trends,
         }
     )
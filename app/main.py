@@ -5,6 +5,7 @@
 # Python:
 import logging
 from datetime import datetime, timedelta
+from http import HTTPStatus
 
 # 3rd party:
 from starlette.requests import Request
@@ -21,10 +22,24 @@ from opencensus.trace.samplers import AlwaysOnSampler
 from app.easy_read import create_and_redirect as get_pdf
 from app.config import Settings
 from app.views import base_router
-from app.healthcheck import run_healthcheck
-from app.exceptions import exception_handlers
+from app.batch import get_batch_data
+from app.healthcheck import (
+    run_healthcheck, run_liveness_check, start_healthcheck_monitor, stop_healthcheck_monitor,
+    warm_up
+)
+from app.database.postgres import close_pools
+from app.metrics import get_metrics, MetricsMiddleware
+from app.diagnostics import (
+    start_loop_monitor, stop_loop_monitor, start_memory_monitor,
+    stop_memory_monitor, ProfilerMiddleware
+)
+from app.admin import admin_routes, admin_token_required
+from app.popularity import start_popularity_tracker, stop_popularity_tracker
+from app.exceptions import exception_handlers, prerender_error_pages
 from app.common.utils import add_cloud_role_name, add_instance_role_id
 from app.middleware.tracers.starlette import TraceRequestMiddleware
+from app.middleware.admission import AdmissionControlMiddleware
+from app.middleware.deadline import DeadlineMiddleware
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -45,12 +60,21 @@ LATEST_PUBLISHED_TIMESTAMP = {
 HTTP_DATE_FORMAT = "%a, %d %b %Y %H:%M:%S GMT"
 
 routes = [
+    # Must precede the '/easy_read/{area_type}/{area_code}' pattern.
+    *admin_routes,
+    Route(f'/{Settings.healthcheck_path}', endpoint=run_healthcheck, methods=["GET", "HEAD"]),
+    Route(f'/{Settings.healthcheck_path}/ready', endpoint=run_healthcheck, methods=["GET", "HEAD"]),
+    Route(f'/{Settings.healthcheck_path}/live', endpoint=run_liveness_check, methods=["GET", "HEAD"]),
+    Route(f'/easy_read/{Settings.healthcheck_path}', endpoint=run_healthcheck, methods=["GET", "HEAD"]),
+    Route(f'/easy_read/{Settings.healthcheck_path}/ready', endpoint=run_healthcheck, methods=["GET", "HEAD"]),
+    Route(f'/easy_read/{Settings.healthcheck_path}/live', endpoint=run_liveness_check, methods=["GET", "HEAD"]),
     Route('/easy_read', endpoint=base_router, methods=["GET", "HEAD"]),
     Route('/easy_read/download', endpoint=get_pdf, methods=["GET", "HEAD"]),
+    Route('/easy_read/batch', endpoint=get_batch_data, methods=["GET", "HEAD"]),
     Route('/easy_read/{area_type:str}/{area_code:str}', endpoint=base_router, methods=["GET", "HEAD"]),
     Route('/easy_read/download/{area_type:str}/{area_code:str}', endpoint=get_pdf, methods=["GET", "HEAD"]),
-    Route(f'/{Settings.healthcheck_path}', endpoint=run_healthcheck, methods=["GET", "HEAD"]),
-    Route(f'/easy_read/{Settings.healthcheck_path}', endpoint=run_healthcheck, methods=["GET", "HEAD"]),
+    Route(f'/{Settings.metrics_path}', endpoint=admin_token_required(get_metrics), methods=["GET"]),
+    Route(f'/easy_read/{Settings.metrics_path}', endpoint=admin_token_required(get_metrics), methods=["GET"]),
     Mount('/public/assets/summary', StaticFiles(directory="static"), name="static")
 ]
 
@@ -67,6 +91,8 @@ logging_instances = [
 ]
 
 middleware = [
+    # Must remain the outermost middleware.
+    Middleware(DeadlineMiddleware),
     Middleware(ProxyHeadersMiddleware, trusted_hosts=Settings.service_domain),
     Middleware(
         TraceRequestMiddleware,
@@ -79,7 +105,11 @@ middleware = [
             server_location=Settings.server_location
         ),
         logging_instances=logging_instances
-    )
+    ),
+    Middleware(MetricsMiddleware),
+    Middleware(AdmissionControlMiddleware),
+    # Must remain the innermost middleware.
+    Middleware(ProfilerMiddleware)
 ]
 
 
@@ -88,19 +118,39 @@ app = Starlette(
     routes=routes,
     middleware=middleware,
     exception_handlers=exception_handlers,
+    on_startup=[
+        start_loop_monitor, start_memory_monitor, start_healthcheck_monitor,
+        start_popularity_tracker
+    ],
+    on_shutdown=[
+        stop_loop_monitor, stop_memory_monitor, stop_healthcheck_monitor,
+        stop_popularity_tracker, close_pools
+    ]
 )
 
+app.add_event_handler("startup", prerender_error_pages(app.router))
+# Must remain the last startup handler.
+app.add_event_handler("startup", warm_up(app.router))
+
 
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
     response = await call_next(request)
 
-    last_modified = datetime.now()
-    expires = last_modified + timedelta(minutes=1, seconds=30)
+    if response.status_code == HTTPStatus.SERVICE_UNAVAILABLE:
+        # Unavailability - shed requests, exceeded deadlines, open
+        # circuits - must never be cached downstream.
+        response.headers['cache-control'] = 'no-store'
+    elif 'cache-control' not in response.headers:
+        # Responses that set their own caching - e.g. stale pages and
+        # errors - keep it.
+        last_modified = datetime.now()
+        expires = last_modified + timedelta(minutes=1, seconds=30)
+
+        response.headers['last-modified'] = last_modified.strftime(HTTP_DATE_FORMAT)
+        response.headers['expires'] = expires.strftime(HTTP_DATE_FORMAT)
+        response.headers['cache-control'] = 'public, must-revalidate, max-age=30, s-maxage=90'
 
-    response.headers['last-modified'] = last_modified.strftime(HTTP_DATE_FORMAT)
-    response.headers['expires'] = expires.strftime(HTTP_DATE_FORMAT)
-    response.headers['cache-control'] = 'public, must-revalidate, max-age=30, s-maxage=90'
     response.headers['UKHSA-Server-Loc'] = Settings.server_location
 
     return response
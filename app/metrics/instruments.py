@@ -0,0 +1,73 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+
+# 3rd party:
+
+# Internal:
+from .registry import Counter, Histogram
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'http_requests',
+    'http_request_duration',
+    'dependency_duration',
+    'cache_requests',
+    'record_cache',
+    'pdf_requests',
+    'pdf_build_duration',
+    'deadline_exceeded'
+]
+
+
+PDF_BUCKETS = (0.5, 1, 2, 3, 5, 7.5, 10, 15, 20, 30, 60, 120)
+
+
+http_requests = Counter(
+    "easyread_http_requests",
+    "Number of HTTP requests handled, by route template.",
+    labelnames=("route", "method", "status")
+)
+
+http_request_duration = Histogram(
+    "easyread_http_request_duration_seconds",
+    "Time taken to produce the response, by route template.",
+    labelnames=("route", "method")
+)
+
+dependency_duration = Histogram(
+    "easyread_dependency_duration_seconds",
+    "Latency of calls to external dependencies (Postgres, Blob Storage).",
+    labelnames=("dependency", "action", "success")
+)
+
+cache_requests = Counter(
+    "easyread_cache_requests",
+    "Number of cache lookups, by cache name and result (hit or miss).",
+    labelnames=("cache", "result")
+)
+
+pdf_requests = Counter(
+    "easyread_pdf_requests",
+    "Number of PDF download requests, by outcome.",
+    labelnames=("outcome",)
+)
+
+pdf_build_duration = Histogram(
+    "easyread_pdf_build_duration_seconds",
+    "Time taken to render and compile the LaTeX document.",
+    buckets=PDF_BUCKETS
+)
+
+deadline_exceeded = Counter(
+    "easyread_deadline_exceeded",
+    "Number of requests that ran out of time, by the stage reached.",
+    labelnames=("stage",)
+)
+
+
+def record_cache(cache: str, hit: bool):
+    cache_requests.inc(cache=cache, result="hit" if hit else "miss")
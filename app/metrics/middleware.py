@@ -0,0 +1,55 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from time import perf_counter
+
+# 3rd party:
+from starlette.requests import Request
+from starlette.routing import Match
+from starlette.middleware.base import BaseHTTPMiddleware
+
+# Internal:
+from app.diagnostics.activity import current_route
+from .instruments import http_requests, http_request_duration
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'MetricsMiddleware',
+    'get_route_name'
+]
+
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def get_route_name(request: Request) -> str:
+    """
+    Returns the template of the route matching the request - e.g.
+    ``/easy_read/{area_type:str}/{area_code:str}`` - to keep the
+    cardinality of the labels bounded.
+    """
+    for route in request.app.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+
+    return UNMATCHED_ROUTE
+
+
+class MetricsMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request: Request, call_next):
+        route = get_route_name(request)
+        current_route.set(route)
+        start = perf_counter()
+        status_code = 500
+
+        try:
+            response = await call_next(request)
+            status_code = response.status_code
+            return response
+        finally:
+            http_request_duration.observe(perf_counter() - start, route=route, method=request.method)
+            http_requests.inc(route=route, method=request.method, status=status_code)
@@ -0,0 +1,449 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import mmap
+import logging
+from os import getpid, makedirs, path, listdir, remove
+from struct import Struct
+from threading import Lock
+from time import perf_counter
+from tempfile import gettempdir
+from contextlib import contextmanager
+from typing import Dict, Iterable, Tuple, Union
+
+# 3rd party:
+from orjson import dumps, loads
+
+# Internal:
+from app.config import Settings
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'Counter',
+    'Gauge',
+    'Histogram',
+    'registry',
+    'generate_latest',
+    'DEFAULT_BUCKETS'
+]
+
+
+logger = logging.getLogger("app")
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5,
+    0.75, 1.0, 2.5, 5.0, 7.5, 10.0, 30.0, 60.0, float("inf")
+)
+
+INITIAL_FILE_SIZE = 2 ** 16  # 64 KiB - doubled on demand.
+
+_used_struct = Struct("i")
+_key_len_struct = Struct("i")
+_value_struct = Struct("d")
+
+LabelsType = Tuple[Tuple[str, str], ...]
+
+
+def _get_metrics_dir() -> str:
+    try:
+        makedirs(Settings.metrics_dir, exist_ok=True)
+        return Settings.metrics_dir
+    except OSError:
+        fallback = path.join(gettempdir(), "easyread-metrics")
+        makedirs(fallback, exist_ok=True)
+        logger.warning(f"Metrics directory is not writable - using '{fallback}' instead.")
+        return fallback
+
+
+class MmapValues:
+    """
+    Append-only mapping of keys to float values, backed by a memory-mapped
+    file. Each process owns one file per metric type so that writes never
+    need a cross-process lock. Readers (the ``/metrics`` endpoint in any
+    worker) only ever read files in the directory and merge them.
+
+    Layout
+    ------
+    - 4 bytes: number of bytes in use (including this header), padded to 8.
+    - Entries: 4-byte key length, UTF-8 key padded to an 8-byte boundary,
+      and an 8-byte double value.
+    """
+
+    def __init__(self, filename: str, read_only: bool = False):
+        self._filename = filename
+        self._positions: Dict[bytes, int] = dict()
+        self._lock = Lock()
+
+        if read_only:
+            with open(filename, "rb") as fp:
+                self._buffer = fp.read()
+            self._used = _used_struct.unpack_from(self._buffer, 0)[0] if self._buffer else 0
+            return
+
+        self._fp = open(filename, "a+b")
+        if self._fp.seek(0, 2) == 0:
+            self._fp.truncate(INITIAL_FILE_SIZE)
+        self._capacity = self._fp.seek(0, 2)
+        self._buffer = mmap.mmap(self._fp.fileno(), self._capacity)
+
+        self._used = _used_struct.unpack_from(self._buffer, 0)[0]
+        if self._used == 0:
+            self._used = 8
+            _used_struct.pack_into(self._buffer, 0, self._used)
+
+        for key, _, offset in self._read_entries():
+            self._positions[key] = offset
+
+    def _read_entries(self) -> Iterable[Tuple[bytes, float, int]]:
+        position = 8
+        while position < self._used:
+            key_len = _key_len_struct.unpack_from(self._buffer, position)[0]
+            key_end = position + 4 + key_len
+            key = bytes(self._buffer[position + 4: key_end])
+            value_offset = key_end + (-(4 + key_len) % 8)
+            value = _value_struct.unpack_from(self._buffer, value_offset)[0]
+            yield key, value, value_offset
+            position = value_offset + 8
+
+    def _init_value(self, key: bytes) -> int:
+        padded_len = 4 + len(key) + (-(4 + len(key)) % 8)
+        entry_size = padded_len + 8
+
+        while self._used + entry_size > self._capacity:
+            self._capacity *= 2
+            self._fp.truncate(self._capacity)
+            self._buffer.close()
+            self._buffer = mmap.mmap(self._fp.fileno(), self._capacity)
+
+        # The entry is written in full before the ``used`` marker is moved,
+        # so concurrent readers never see a partial record.
+        _key_len_struct.pack_into(self._buffer, self._used, len(key))
+        self._buffer[self._used + 4: self._used + 4 + len(key)] = key
+        value_offset = self._used + padded_len
+        _value_struct.pack_into(self._buffer, value_offset, 0.0)
+
+        self._used += entry_size
+        _used_struct.pack_into(self._buffer, 0, self._used)
+        self._positions[key] = value_offset
+
+        return value_offset
+
+    def add(self, key: bytes, amount: float):
+        with self._lock:
+            offset = self._positions.get(key) or self._init_value(key)
+            current = _value_struct.unpack_from(self._buffer, offset)[0]
+            _value_struct.pack_into(self._buffer, offset, current + amount)
+
+    def set(self, key: bytes, value: float):
+        with self._lock:
+            offset = self._positions.get(key) or self._init_value(key)
+            _value_struct.pack_into(self._buffer, offset, value)
+
+    def items(self) -> Iterable[Tuple[bytes, float]]:
+        for key, value, _ in self._read_entries():
+            yield key, value
+
+    def close(self):
+        if isinstance(self._buffer, mmap.mmap):
+            self._buffer.close()
+            self._fp.close()
+
+
+class Registry:
+    """
+    Keeps the definition of all metrics declared in the process, and the
+    per-process value files to which they write.
+    """
+
+    def __init__(self):
+        self.metrics: Dict[str, 'Metric'] = dict()
+        self._files: Dict[str, MmapValues] = dict()
+        self._inherited: Dict[str, Iterable[Tuple[bytes, float]]] = dict()
+        self._pid = None
+        self._lock = Lock()
+        self._directory = None
+
+    @property
+    def directory(self) -> str:
+        if self._directory is None:
+            self._directory = _get_metrics_dir()
+        return self._directory
+
+    def register(self, metric: 'Metric'):
+        if metric.name in self.metrics:
+            raise ValueError(f"Duplicate metric name: '{metric.name}'")
+        self.metrics[metric.name] = metric
+
+    def get_file(self, file_prefix: str) -> MmapValues:
+        pid = getpid()
+
+        # Forked processes must not write into the parent's files.
+        if self._pid != pid:
+            with self._lock:
+                if self._pid != pid:
+                    # Gauges describe the state of the process, which is
+                    # inherited by the fork - e.g. set at import time in a
+                    # preloading master.
+                    self._inherited = {
+                        prefix: list(values.items())
+                        for prefix, values in self._files.items()
+                        if prefix.startswith("gauge_")
+                    }
+                    self._files = dict()
+                    self._pid = pid
+
+        values = self._files.get(file_prefix)
+        if values is None:
+            with self._lock:
+                if (values := self._files.get(file_prefix)) is None:
+                    filename = path.join(self.directory, f"{file_prefix}_{pid}.db")
+                    values = self._files[file_prefix] = MmapValues(filename)
+
+                    for key, value in self._inherited.pop(file_prefix, tuple()):
+                        values.set(key, value)
+
+        return values
+
+    def discard_files(self):
+        """
+        Removes the files of the current process from the directory, so
+        that its values are no longer exposed. The values remain in
+        memory, to be inherited by forked processes.
+        """
+        with self._lock:
+            for file_prefix in self._files:
+                try:
+                    remove(path.join(self.directory, f"{file_prefix}_{self._pid}.db"))
+                except FileNotFoundError:
+                    pass
+
+    def collect(self) -> Dict[str, Dict[Tuple[str, LabelsType], float]]:
+        """
+        Merges the values stored by all processes on the node.
+        """
+        merged = dict()
+
+        for filename in listdir(self.directory):
+            if not filename.endswith(".db"):
+                continue
+
+            file_prefix, pid = filename[:-3].rsplit("_", 1)
+            metric_type = file_prefix.split("_")[0]
+
+            try:
+                values = MmapValues(path.join(self.directory, filename), read_only=True)
+            except FileNotFoundError:
+                # Removed by the master after the worker exited.
+                continue
+
+            for raw_key, value in values.items():
+                metric_name, sample_name, labels = loads(raw_key)
+                labels = tuple(map(tuple, labels))
+
+                if metric_type == "gauge" and file_prefix.endswith("_all"):
+                    labels = (*labels, ("pid", pid))
+
+                samples = merged.setdefault(metric_name, dict())
+                sample_key = (sample_name, labels)
+
+                if file_prefix.endswith("_max"):
+                    samples[sample_key] = max(value, samples.get(sample_key, value))
+                else:
+                    samples[sample_key] = samples.get(sample_key, 0.0) + value
+
+        return merged
+
+
+registry = Registry()
+
+
+class Metric:
+    kind: str = None
+    file_prefix: str = None
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = tuple(),
+                 registry: Registry = registry):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._registry = registry
+        self._keys: Dict[Tuple[str, LabelsType], bytes] = dict()
+
+        registry.register(self)
+
+    def _labels(self, labels: Dict[str, str]) -> LabelsType:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(
+                f"Metric '{self.name}' expects labels {self.labelnames}, got {tuple(labels)}."
+            )
+
+        return tuple((name, str(labels[name])) for name in self.labelnames)
+
+    def _key(self, sample_name: str, labels: LabelsType) -> bytes:
+        key = self._keys.get((sample_name, labels))
+
+        if key is None:
+            key = self._keys[(sample_name, labels)] = dumps([self.name, sample_name, labels])
+
+        return key
+
+    def _values(self) -> MmapValues:
+        return self._registry.get_file(self.file_prefix)
+
+
+class Counter(Metric):
+    kind = "counter"
+    file_prefix = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        if amount < 0:
+            raise ValueError("Counters can only be incremented by non-negative amounts.")
+
+        key = self._key(f"{self.name}_total", self._labels(labels))
+        self._values().add(key, amount)
+
+
+class Gauge(Metric):
+    """
+    Gauge aggregated across processes.
+
+    Parameters
+    ----------
+    multiprocess_mode: str
+        - ``livesum``: sum of the values reported by live processes [Default].
+        - ``max``: maximum value reported by live processes.
+        - ``all``: one series per process, labelled by ``pid``.
+    """
+    kind = "gauge"
+
+    def __init__(self, *args, multiprocess_mode: str = "livesum", **kwargs):
+        if multiprocess_mode not in ("livesum", "max", "all"):
+            raise ValueError(f"Invalid multiprocess mode: '{multiprocess_mode}'")
+
+        self.file_prefix = f"gauge_{multiprocess_mode}"
+        super().__init__(*args, **kwargs)
+
+    def set(self, value: float, **labels):
+        self._values().set(self._key(self.name, self._labels(labels)), value)
+
+    def inc(self, amount: float = 1, **labels):
+        self._values().add(self._key(self.name, self._labels(labels)), amount)
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+    file_prefix = "histogram"
+
+    def __init__(self, *args, buckets: Iterable[float] = DEFAULT_BUCKETS, **kwargs):
+        buckets = sorted(float(bucket) for bucket in buckets)
+        if buckets[-1] != float("inf"):
+            buckets.append(float("inf"))
+
+        self.buckets = tuple(buckets)
+        super().__init__(*args, **kwargs)
+
+    def observe(self, value: float, **labels):
+        labels = self._labels(labels)
+        values = self._values()
+
+        values.add(self._key(f"{self.name}_sum", labels), value)
+        values.add(self._key(f"{self.name}_count", labels), 1)
+
+        for bound in self.buckets:
+            if value <= bound:
+                # Stored per bucket; made cumulative when exposed.
+                values.add(self._key(f"{self.name}_bucket", (*labels, ("le", _format_value(bound)))), 1)
+                break
+
+    @contextmanager
+    def time(self, **labels):
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if value == float("-inf"):
+        return "-Inf"
+    if value.is_integer():
+        return f"{value:.1f}"
+    return repr(value)
+
+
+def _format_labels(labels: LabelsType) -> str:
+    if not labels:
+        return str()
+
+    formatted = ",".join(
+        '{}="{}"'.format(
+            name,
+            value.replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+        )
+        for name, value in labels
+    )
+
+    return f"{{{formatted}}}"
+
+
+def _histogram_lines(metric: Histogram, samples: Dict[Tuple[str, LabelsType], float]) -> Iterable[str]:
+    series = dict()
+    for (sample_name, labels), value in samples.items():
+        if sample_name.endswith("_bucket"):
+            base_labels = tuple(label for label in labels if label[0] != "le")
+            bound = dict(labels)["le"]
+            series.setdefault(base_labels, dict()).setdefault("buckets", dict())[bound] = value
+        else:
+            series.setdefault(labels, dict())[sample_name] = value
+
+    for labels, data in sorted(series.items()):
+        cumulative = 0.0
+        buckets = data.get("buckets", dict())
+        for bound in metric.buckets:
+            formatted_bound = _format_value(bound)
+            cumulative += buckets.get(formatted_bound, 0.0)
+            bucket_labels = _format_labels((*labels, ("le", formatted_bound)))
+            yield f"{metric.name}_bucket{bucket_labels} {_format_value(cumulative)}"
+
+        yield f"{metric.name}_count{_format_labels(labels)} {_format_value(data.get(f'{metric.name}_count', 0.0))}"
+        yield f"{metric.name}_sum{_format_labels(labels)} {_format_value(data.get(f'{metric.name}_sum', 0.0))}"
+
+
+def generate_latest(target: Registry = registry) -> bytes:
+    """
+    Renders the merged metrics of all processes in the Prometheus text
+    exposition format (version 0.0.4).
+    """
+    collected = target.collect()
+    output = list()
+
+    for metric_name in sorted(collected):
+        samples = collected[metric_name]
+        metric: Union[Metric, None] = target.metrics.get(metric_name)
+
+        if metric is None:
+            output.append(f"# TYPE {metric_name} untyped")
+        else:
+            output.append(f"# HELP {metric_name} {metric.documentation}")
+            output.append(f"# TYPE {metric_name} {metric.kind}")
+
+        if isinstance(metric, Histogram):
+            output.extend(_histogram_lines(metric, samples))
+            continue
+
+        for (sample_name, labels), value in sorted(samples.items()):
+            output.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+
+    output.append(str())
+
+    return "\n".join(output).encode()
+
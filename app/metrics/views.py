@@ -0,0 +1,30 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from http import HTTPStatus
+
+# 3rd party:
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Internal:
+from .registry import generate_latest
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'get_metrics'
+]
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+async def get_metrics(request: Request) -> Response:
+    return Response(
+        content=generate_latest(),
+        status_code=HTTPStatus.OK.real,
+        media_type=CONTENT_TYPE
+    )
@@ -0,0 +1,189 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from asyncio import Future, get_running_loop, wait_for, TimeoutError as AsyncTimeoutError
+from collections import deque
+from time import monotonic
+from typing import Deque, Iterable, Union
+
+# 3rd party:
+
+# Internal:
+from app.metrics.registry import Counter, Gauge, Histogram
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'AdaptiveLimiter',
+    'Rejected'
+]
+
+
+QUEUE_WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+admission_in_flight = Gauge(
+    "easyread_admission_in_flight",
+    "Number of requests admitted and in progress, by priority class.",
+    labelnames=("priority_class",)
+)
+
+admission_limit = Gauge(
+    "easyread_admission_limit",
+    "Current adaptive concurrency limit of the worker, by priority class.",
+    labelnames=("priority_class",),
+    multiprocess_mode="all"
+)
+
+admission_rejected = Counter(
+    "easyread_admission_rejected",
+    "Number of requests shed by the admission control, by priority class and reason.",
+    labelnames=("priority_class", "reason")
+)
+
+admission_queue_wait = Histogram(
+    "easyread_admission_queue_wait_seconds",
+    "Time spent by admitted requests waiting for a slot, by priority class.",
+    labelnames=("priority_class",),
+    buckets=QUEUE_WAIT_BUCKETS
+)
+
+
+class Rejected(Exception):
+    def __init__(self, reason: str):
+        self.reason = reason
+        super().__init__(reason)
+
+
+class AdaptiveLimiter:
+    """
+    Concurrency limit for one priority class, adjusted with AIMD:
+
+    - every response within the latency target while the limit is in
+      use raises the limit by ``1 / limit`` (i.e. by ~1 per window);
+    - a response slower than the target, or a failed dependency call,
+      cuts the limit by ``backoff`` - at most once per ``latency_target``
+      seconds so that a single slow batch does not collapse it.
+
+    Requests above the limit wait in a bounded FIFO queue, or are
+    rejected outright when the class has no queue.
+    """
+
+    def __init__(self, name: str, priority: int, initial_limit: float, min_limit: float,
+                 max_limit: float, latency_target: float, max_queue: int = 0,
+                 queue_timeout: float = 0, retry_after: int = 1, backoff: float = 0.8):
+        self.name = name
+        self.priority = priority
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.latency_target = latency_target
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.backoff = backoff
+        self.in_flight = 0
+        self._waiters: Deque[Future] = deque()
+        self._last_decrease = 0.0
+
+        admission_limit.set(self.limit, priority_class=self.name)
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    @property
+    def is_saturated(self) -> bool:
+        return self.waiting > 0 or self.in_flight >= int(self.limit)
+
+    def _admit(self):
+        self.in_flight += 1
+        admission_in_flight.inc(priority_class=self.name)
+
+    async def acquire(self, higher_priority: Iterable['AdaptiveLimiter'] = tuple(),
+                      timeout: Union[float, None] = None):
+        """
+        Admits the request or raises ``Rejected``.
+
+        Parameters
+        ----------
+        higher_priority: Iterable[AdaptiveLimiter]
+            Limiters of the classes that take precedence. The request is
+            shed early - without queueing - while any of them is saturated.
+
+        timeout: Union[float, None]
+            Time left to the request; caps the time spent in the queue.
+        """
+        if any(limiter.is_saturated for limiter in higher_priority):
+            admission_rejected.inc(priority_class=self.name, reason="priority")
+            raise Rejected("priority")
+
+        if not self._waiters and self.in_flight < int(self.limit):
+            self._admit()
+            return
+
+        if len(self._waiters) >= self.max_queue:
+            admission_rejected.inc(priority_class=self.name, reason="limit")
+            raise Rejected("limit")
+
+        queue_timeout = self.queue_timeout
+        if timeout is not None:
+            queue_timeout = min(queue_timeout, timeout)
+
+        waiter = get_running_loop().create_future()
+        self._waiters.append(waiter)
+        start = monotonic()
+
+        try:
+            # The slot is handed over by `release`, which also accounts
+            # for it in `in_flight`.
+            await wait_for(waiter, timeout=queue_timeout)
+        except AsyncTimeoutError:
+            admission_rejected.inc(priority_class=self.name, reason="queue_timeout")
+            raise Rejected("queue_timeout")
+        except BaseException:
+            # Cancelled (e.g. client disconnected) after the slot was
+            # handed over: give it back without affecting the limit.
+            if waiter.done() and not waiter.cancelled():
+                self.in_flight -= 1
+                admission_in_flight.dec(priority_class=self.name)
+                self._wake_waiters()
+            raise
+        finally:
+            if waiter in self._waiters:
+                self._waiters.remove(waiter)
+
+        admission_queue_wait.observe(monotonic() - start, priority_class=self.name)
+
+    def release(self, latency: float, success: bool = True):
+        self.in_flight -= 1
+        admission_in_flight.dec(priority_class=self.name)
+
+        if not success or latency > self.latency_target:
+            self.decrease()
+        elif self.in_flight + 1 >= int(self.limit):
+            # Only grow while the limit is actually what holds requests
+            # back; an idle worker would otherwise drift to the maximum.
+            self.limit = min(self.limit + 1 / self.limit, self.max_limit)
+            admission_limit.set(self.limit, priority_class=self.name)
+
+        self._wake_waiters()
+
+    def decrease(self):
+        now = monotonic()
+        if now - self._last_decrease < self.latency_target:
+            return
+
+        self._last_decrease = now
+        self.limit = max(self.limit * self.backoff, self.min_limit)
+        admission_limit.set(self.limit, priority_class=self.name)
+
+    def _wake_waiters(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if waiter.done():
+                continue
+
+            self._admit()
+            waiter.set_result(None)
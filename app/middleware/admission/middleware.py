@@ -0,0 +1,204 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import re
+from contextvars import ContextVar
+from http import HTTPStatus
+from time import perf_counter
+from typing import Dict, Tuple, Union
+
+# 3rd party:
+from starlette.responses import PlainTextResponse
+
+# Internal:
+from app.config import Settings
+from app.common.deadline import get_remaining
+from .limiter import AdaptiveLimiter, Rejected
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'AdmissionControlMiddleware',
+    'record_dependency',
+    'current_priority_class',
+    'has_spare_capacity'
+]
+
+
+HTML_CLASS = "html"
+BATCH_CLASS = "batch"
+PDF_CLASS = "pdf"
+HEALTHCHECK_CLASS = "healthcheck"
+
+PDF_PATH = re.compile(r"^/easy_read/download(/[^/]+/[^/]+)?/?$")
+HEALTHCHECK_PATH = re.compile(rf"^(/easy_read)?/{Settings.healthcheck_path}(/live|/ready)?/?$")
+HTML_PATH = re.compile(r"^/easy_read(/[^/]+/[^/]+)?/?$")
+BATCH_PATH = re.compile(r"^/easy_read/batch/?$")
+EXCLUDED_PATH = re.compile(r"^/easy_read/admin/")
+
+current_priority_class: ContextVar[Union[str, None]] = ContextVar("current_priority_class", default=None)
+
+limiters: Dict[str, AdaptiveLimiter] = {
+    HEALTHCHECK_CLASS: AdaptiveLimiter(
+        name=HEALTHCHECK_CLASS,
+        priority=0,
+        initial_limit=8,
+        min_limit=8,
+        max_limit=8,
+        latency_target=Settings.healthcheck_latency_target,
+        max_queue=16,
+        queue_timeout=1,
+        retry_after=1
+    ),
+    HTML_CLASS: AdaptiveLimiter(
+        name=HTML_CLASS,
+        priority=1,
+        initial_limit=Settings.html_max_concurrency // 2,
+        min_limit=4,
+        max_limit=Settings.html_max_concurrency,
+        latency_target=Settings.html_latency_target,
+        max_queue=Settings.html_max_concurrency,
+        queue_timeout=Settings.html_latency_target,
+        retry_after=1
+    ),
+    BATCH_CLASS: AdaptiveLimiter(
+        name=BATCH_CLASS,
+        priority=2,
+        initial_limit=Settings.batch_max_concurrency,
+        min_limit=1,
+        max_limit=Settings.batch_max_concurrency,
+        latency_target=Settings.batch_latency_target,
+        max_queue=Settings.batch_max_concurrency,
+        queue_timeout=1,
+        retry_after=5
+    ),
+    PDF_CLASS: AdaptiveLimiter(
+        name=PDF_CLASS,
+        priority=3,
+        initial_limit=Settings.pdf_max_concurrency,
+        min_limit=1,
+        max_limit=Settings.pdf_max_concurrency,
+        latency_target=Settings.pdf_latency_target,
+        retry_after=30
+    )
+}
+
+
+def has_spare_capacity() -> bool:
+    """
+    Whether the worker has no PDF in flight and room for more pages -
+    i.e. whether background work would not compete with requests.
+    """
+    return (
+        limiters[PDF_CLASS].in_flight == 0 and
+        not limiters[HTML_CLASS].is_saturated
+    )
+
+
+def get_priority_class(path: str) -> Union[str, None]:
+    """
+    Maps the request onto a priority class. Requests that are not
+    classified - static assets, metrics, admin, etc. - are not
+    subject to admission control.
+    """
+    if EXCLUDED_PATH.match(path):
+        return None
+
+    if HEALTHCHECK_PATH.match(path):
+        return HEALTHCHECK_CLASS
+
+    if PDF_PATH.match(path):
+        return PDF_CLASS
+
+    if BATCH_PATH.match(path):
+        return BATCH_CLASS
+
+    if HTML_PATH.match(path):
+        return HTML_CLASS
+
+    return None
+
+
+def get_higher_priority(limiter: AdaptiveLimiter) -> Tuple[AdaptiveLimiter, ...]:
+    # The healthcheck is never shed in favour of other classes. Pages
+    # are only held back by their own limit.
+    if limiter.priority <= limiters[HTML_CLASS].priority:
+        return tuple()
+
+    return tuple(item for item in limiters.values() if item.priority < limiter.priority)
+
+
+def record_dependency(success: bool):
+    """
+    Feeds the outcome of a dependency call back into the limiter of the
+    class that made it; failures - timeouts, exhausted connections, etc.
+    - are treated as a sign of saturation.
+    """
+    priority_class = current_priority_class.get()
+
+    if priority_class is None or success:
+        return
+
+    limiters[priority_class].decrease()
+
+
+class AdmissionControlMiddleware:
+    """
+    Bounds the work in progress in the worker per priority class, and
+    sheds the excess with a ``503`` and a ``Retry-After`` header before
+    any work is done. Batches and PDF requests are shed early whenever
+    classes of higher priority are queueing, so that neither bulk lookups
+    nor LaTeX builds can crowd out pages or the healthcheck.
+
+    Shed responses are marked ``no-store`` - as are all ``503`` responses
+    on their way out of the application - so that the CDN does not keep
+    serving them once the worker recovers.
+    """
+
+    def __init__(self, app, enabled: bool = Settings.admission_control):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            return await self.app(scope, receive, send)
+
+        priority_class = get_priority_class(scope["path"])
+        if priority_class is None:
+            return await self.app(scope, receive, send)
+
+        limiter = limiters[priority_class]
+
+        try:
+            await limiter.acquire(get_higher_priority(limiter), timeout=get_remaining())
+        except Rejected:
+            response = PlainTextResponse(
+                HTTPStatus.SERVICE_UNAVAILABLE.phrase,
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE.real,
+                headers={
+                    "Retry-After": str(limiter.retry_after),
+                    "Cache-Control": "no-store"
+                }
+            )
+            return await response(scope, receive, send)
+
+        token = current_priority_class.set(priority_class)
+        status_code = HTTPStatus.INTERNAL_SERVER_ERROR.real
+        start = perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            current_priority_class.reset(token)
+            limiter.release(
+                latency=perf_counter() - start,
+                success=status_code < HTTPStatus.INTERNAL_SERVER_ERROR.real
+            )
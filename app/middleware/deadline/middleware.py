@@ -0,0 +1,48 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+
+# 3rd party:
+
+# Internal:
+from app.config import Settings
+from app.common.deadline import request_deadline, set_deadline
+from app.middleware.admission.middleware import get_priority_class, PDF_CLASS
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'DeadlineMiddleware'
+]
+
+
+class DeadlineMiddleware:
+    """
+    Gives every request a time budget - longer for PDF downloads - from
+    the moment it enters the application. Requests that run out of time
+    fail with ``DeadlineExceeded``, which is turned into a ``503`` by the
+    exception handlers.
+
+    Must be the outermost middleware so that the budget also covers the
+    time spent in the other middleware, e.g. waiting for admission.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        budget = Settings.request_timeout
+        if get_priority_class(scope["path"]) == PDF_CLASS:
+            budget = Settings.pdf_request_timeout
+
+        token = set_deadline(budget)
+
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            request_deadline.reset(token)
@@ -6,12 +6,15 @@
 from logging import getLogger
 from functools import wraps
 from inspect import signature
+from time import perf_counter
 
 # 3rd party:
 from opencensus.trace.execution_context import get_opencensus_tracer
 from opencensus.trace.span import SpanKind
 
 # Internal:
+from app.metrics.instruments import dependency_duration
+from app.middleware.admission import record_dependency
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -23,6 +26,16 @@ __all__ = [
 logger = getLogger("app")
 
 
+def observe_dependency(klass, dep_type: str, action: str, start: float, success: bool):
+    dependency_duration.observe(
+        perf_counter() - start,
+        dependency=getattr(klass, dep_type, None),
+        action=action,
+        success=success
+    )
+    record_dependency(success)
+
+
 def trace_async_method_operation(*cls_attrs, dep_type="name", name="name", **attrs):
     def wrapper(func):
         sig = signature(func)
@@ -35,9 +48,18 @@ def trace_async_method_operation(*cls_attrs, dep_type="name", name="name", **att
             bound_inputs = sig.bind(klass, *args, **kwargs)
 
             tracer = get_opencensus_tracer()
+            action = attrs.get("action", func.__name__)
+            start = perf_counter()
 
             if tracer is None:
-                return await func(*bound_inputs.args, **bound_inputs.kwargs)
+                success = True
+                try:
+                    return await func(*bound_inputs.args, **bound_inputs.kwargs)
+                except Exception:
+                    success = False
+                    raise
+                finally:
+                    observe_dependency(klass, dep_type, action, start, success)
 
             span = tracer.start_span()
             span.span_kind = SpanKind.UNSPECIFIED
@@ -73,6 +95,7 @@ def trace_async_method_operation(*cls_attrs, dep_type="name", name="name", **att
             finally:
                 span.add_attribute(f'{dependency_type}.success', success)
                 tracer.end_span()
+                observe_dependency(klass, dep_type, action, start, success)
 
         return process
 
@@ -91,9 +114,18 @@ def trace_method_operation(*cls_attrs, dep_type="name", name="name", **attrs):
             bound_inputs = sig.bind(klass, *args, **kwargs)
 
             tracer = get_opencensus_tracer()
+            action = attrs.get("action", func.__name__)
+            start = perf_counter()
 
             if tracer is None:
-                return func(*bound_inputs.args, **bound_inputs.kwargs)
+                success = True
+                try:
+                    return func(*bound_inputs.args, **bound_inputs.kwargs)
+                except Exception:
+                    success = False
+                    raise
+                finally:
+                    observe_dependency(klass, dep_type, action, start, success)
 
             span = tracer.start_span()
             span.span_kind = SpanKind.UNSPECIFIED
@@ -129,6 +161,7 @@ def trace_method_operation(*cls_attrs, dep_type="name", name="name", **attrs):
             finally:
                 span.add_attribute(f'{dependency_type}.success', success)
                 tracer.end_span()
+                observe_dependency(klass, dep_type, action, start, success)
 
         return process
 
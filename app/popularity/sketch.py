@@ -0,0 +1,164 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from array import array
+from hashlib import blake2b
+from typing import Any, Dict, List, Tuple, Union
+
+# 3rd party:
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'CountMinSketch',
+    'HeavyHitters'
+]
+
+
+MAX_DEPTH = 16  # 4 bytes of the hash per row
+
+
+class CountMinSketch:
+    """
+    Approximate counts of an unbounded set of keys in a fixed amount of
+    memory: ``depth`` rows of ``width`` counters, each row indexed by a
+    different hash of the key.
+
+    Estimates never undercount; they overcount by at most ``e / width``
+    of the total count with probability ``1 - exp(-depth)``. Sketches of
+    the same dimensions are merged by adding up their counters.
+    """
+
+    def __init__(self, width: int = 2048, depth: int = 4, counts: Union[List[int], None] = None):
+        if not 0 < depth <= MAX_DEPTH:
+            raise ValueError(f"Depth must be between 1 and {MAX_DEPTH}")
+
+        self.width = width
+        self.depth = depth
+        self.counts = array("Q", counts if counts is not None else bytes(8 * width * depth))
+
+    def _get_indices(self, key: str) -> List[int]:
+        digest = blake2b(key.encode(), digest_size=4 * self.depth).digest()
+
+        return [
+            row * self.width + int.from_bytes(digest[4 * row: 4 * row + 4], "little") % self.width
+            for row in range(self.depth)
+        ]
+
+    def add(self, key: str, count: int = 1) -> int:
+        """
+        Adds ``count`` to the key, and returns its new estimate.
+        """
+        counts = self.counts
+        estimate = None
+
+        for index in self._get_indices(key):
+            counts[index] += count
+            if estimate is None or counts[index] < estimate:
+                estimate = counts[index]
+
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(self.counts[index] for index in self._get_indices(key))
+
+    def merge(self, other: 'CountMinSketch'):
+        if (other.width, other.depth) != (self.width, self.depth):
+            raise ValueError("Cannot merge sketches of different dimensions")
+
+        counts = self.counts
+        for index, count in enumerate(other.counts):
+            counts[index] += count
+
+    def decay(self, factor: float):
+        self.counts = array("Q", (int(count * factor) for count in self.counts))
+
+
+class HeavyHitters:
+    """
+    The ``k`` most frequent keys, with counts estimated by a count-min
+    sketch.
+
+    Each key may carry an example - e.g. a postcode in the area - kept
+    for as long as the key is among the top ``k``.
+    """
+
+    def __init__(self, k: int = 200, width: int = 2048, depth: int = 4):
+        self.k = k
+        self.sketch = CountMinSketch(width, depth)
+        self.top: Dict[str, int] = dict()
+        self.examples: Dict[str, str] = dict()
+
+    def add(self, key: str, count: int = 1, example: Union[str, None] = None):
+        estimate = self.sketch.add(key, count)
+
+        if key not in self.top and len(self.top) >= self.k:
+            smallest = min(self.top, key=self.top.get)
+            if self.top[smallest] >= estimate:
+                return
+
+            del self.top[smallest]
+            self.examples.pop(smallest, None)
+
+        self.top[key] = estimate
+        if example is not None:
+            self.examples[key] = example
+
+    def get_top(self, n: Union[int, None] = None) -> List[Tuple[str, int, Union[str, None]]]:
+        """
+        Returns up to ``n`` keys - or all ``k`` - as tuples of key,
+        estimated count and example, from the most frequent.
+        """
+        items = sorted(self.top.items(), key=lambda item: item[1], reverse=True)
+
+        return [
+            (key, count, self.examples.get(key))
+            for key, count in items[:n]
+        ]
+
+    def merge(self, other: 'HeavyHitters'):
+        self.sketch.merge(other.sketch)
+
+        # Counts are re-estimated from the merged sketch: a key may be
+        # among the top in neither alone, but in both together.
+        candidates = {**self.examples, **other.examples}
+        estimates = {
+            key: self.sketch.estimate(key)
+            for key in {*self.top, *other.top}
+        }
+
+        top = sorted(estimates, key=estimates.get, reverse=True)[:self.k]
+        self.top = {key: estimates[key] for key in top}
+        self.examples = {key: candidates[key] for key in top if key in candidates}
+
+    def decay(self, factor: float):
+        """
+        Scales all counts down - so that past popularity fades.
+        """
+        self.sketch.decay(factor)
+        self.top = {key: self.sketch.estimate(key) for key in self.top}
+
+    def __bool__(self) -> bool:
+        return bool(self.top)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "width": self.sketch.width,
+            "depth": self.sketch.depth,
+            "counts": self.sketch.counts.tolist(),
+            "top": self.top,
+            "examples": self.examples
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'HeavyHitters':
+        hitters = cls(data["k"], data["width"], data["depth"])
+        hitters.sketch = CountMinSketch(data["width"], data["depth"], data["counts"])
+        hitters.top = data["top"]
+        hitters.examples = data["examples"]
+        return hitters
@@ -0,0 +1,228 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from asyncio import sleep, CancelledError, Task, get_running_loop
+from contextlib import contextmanager
+from contextvars import ContextVar
+from fcntl import lockf, LOCK_EX
+from logging import getLogger
+from os import makedirs, path, replace
+from typing import Any, Dict, List, NamedTuple, Union
+
+# 3rd party:
+from orjson import dumps, loads
+
+# Internal:
+from app.config import Settings
+from app.common.utils import on_release_change
+from .sketch import HeavyHitters
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'PopularArea',
+    'record_area_view',
+    'record_cached_view',
+    'viewed_area',
+    'untracked_views',
+    'get_top_areas',
+    'flush_popularity',
+    'start_popularity_tracker',
+    'stop_popularity_tracker'
+]
+
+
+logger = getLogger("app")
+
+STATE_FILENAME = "popularity.json"
+LOCK_FILENAME = "popularity.lock"
+
+
+class PopularArea(NamedTuple):
+    area_type: str
+    area_code: str
+    postcode: Union[str, None]
+    views: int
+
+
+def _new_tracker() -> HeavyHitters:
+    return HeavyHitters(
+        k=Settings.popularity_top_k,
+        width=Settings.popularity_sketch_width,
+        depth=Settings.popularity_sketch_depth
+    )
+
+
+# Views recorded by the worker since its last flush.
+_tracker = _new_tracker()
+_release: Union[str, None] = None
+_flushed_release: Union[str, None] = None
+_task: Union[Task, None] = None
+
+# Whether views are counted - not so for the pages rendered to warm up.
+_tracking: ContextVar[bool] = ContextVar("tracking_views", default=True)
+
+# Last view recorded in the context - as "<area type>/<area code>[/<postcode>]" -
+# stored with the page so that it is counted again when served from a cache.
+viewed_area: ContextVar[Union[str, None]] = ContextVar("viewed_area", default=None)
+
+
+def record_area_view(area_type: str, area_code: str, postcode: Union[str, None] = None):
+    """
+    Records a view of the page - or of the PDF - of an area. The postcode
+    is kept as an example, so that the page of the area may be rendered.
+    """
+    view = f"{area_type}/{area_code}"
+    viewed_area.set(view if postcode is None else f"{view}/{postcode}")
+
+    if _tracking.get():
+        _tracker.add(view, example=postcode)
+
+
+def record_cached_view(view: str):
+    """
+    Records a view of a page served from a cache, as given by
+    ``viewed_area`` when the page was rendered.
+    """
+    area_type, area_code, *postcode = view.split("/", 2)
+    record_area_view(area_type, area_code, *postcode)
+
+
+@contextmanager
+def untracked_views():
+    """
+    Leaves the views recorded in the enclosed block out of the counts -
+    e.g. for the pages rendered to warm up the caches.
+    """
+    token = _tracking.set(False)
+    try:
+        yield
+    finally:
+        _tracking.reset(token)
+
+
+def _get_state_path() -> str:
+    makedirs(Settings.popularity_dir, exist_ok=True)
+    return path.join(Settings.popularity_dir, STATE_FILENAME)
+
+
+def _read_state() -> Union[Dict[str, Any], None]:
+    try:
+        with open(_get_state_path(), "rb") as fp:
+            return loads(fp.read())
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _load_node_tracker(state: Union[Dict[str, Any], None]) -> HeavyHitters:
+    if state is None:
+        return _new_tracker()
+
+    tracker = HeavyHitters.from_dict(state["tracker"])
+
+    # Sketches of different dimensions cannot be merged; the state is
+    # discarded should the settings change.
+    if (tracker.sketch.width, tracker.sketch.depth) != (_tracker.sketch.width, _tracker.sketch.depth):
+        return _new_tracker()
+
+    tracker.k = Settings.popularity_top_k
+    return tracker
+
+
+def flush_popularity():
+    """
+    Merges the views recorded by the worker into the state of the node,
+    which outlives the workers - and, as long as ``POPULARITY_DIR`` does,
+    releases and restarts.
+
+    The counts of the node are decayed once per release, so that past
+    popularity fades.
+    """
+    global _tracker, _flushed_release
+
+    if not _tracker and _release == _flushed_release:
+        return
+
+    state_path = _get_state_path()
+
+    with open(path.join(Settings.popularity_dir, LOCK_FILENAME), "a+b") as lock_file:
+        lockf(lock_file, LOCK_EX)
+
+        state = _read_state()
+        tracker = _load_node_tracker(state)
+        release = state.get("release") if state is not None else None
+
+        if _release is not None and release != _release:
+            if release is not None:
+                tracker.decay(Settings.popularity_decay)
+            release = _release
+
+        tracker.merge(_tracker)
+
+        # Written to a temporary file first so that readers never see a
+        # partial state.
+        with open(f"{state_path}.tmp", "wb") as fp:
+            fp.write(dumps({"release": release, "tracker": tracker.to_dict()}))
+
+        replace(f"{state_path}.tmp", state_path)
+
+    _tracker = _new_tracker()
+    _flushed_release = _release
+
+
+def get_top_areas(n: int) -> List[PopularArea]:
+    """
+    Returns the ``n`` most viewed areas on the node, as of the last flush
+    of each worker.
+    """
+    tracker = _load_node_tracker(_read_state())
+    areas = list()
+
+    for key, views, postcode in tracker.get_top(n):
+        area_type, area_code = key.split("/", 1)
+        areas.append(PopularArea(area_type, area_code, postcode, views))
+
+    return areas
+
+
+def _set_release(timestamp: str):
+    global _release
+    _release = timestamp
+
+
+async def _flush_periodically():
+    while True:
+        await sleep(Settings.popularity_flush_interval)
+
+        try:
+            flush_popularity()
+        except OSError as err:
+            logger.warning(f"Failed to store popularity: {err}")
+
+
+async def start_popularity_tracker():
+    global _task
+
+    if Settings.popularity_flush_interval > 0:
+        _task = get_running_loop().create_task(_flush_periodically())
+
+
+async def stop_popularity_tracker():
+    if _task is None:
+        return
+
+    _task.cancel()
+    try:
+        await _task
+    except CancelledError:
+        pass
+
+    try:
+        flush_popularity()
+    except OSError as err:
+        logger.warning(f"Failed to store popularity: {err}")
+
+
+on_release_change(_set_release)
@@ -0,0 +1,251 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import mmap
+from asyncio import Task, get_running_loop, sleep, wait_for
+from fcntl import lockf, LOCK_EX, LOCK_NB
+from hashlib import blake2b
+from logging import getLogger
+from math import ceil, log
+from os import listdir, makedirs, path, remove, replace
+from os.path import abspath, split as split_path, join as join_path
+from struct import Struct
+from typing import Tuple, Union
+
+# 3rd party:
+from cachetools import TTLCache
+
+# Internal:
+from app.config import Settings
+from app.database.postgres import Connection, PRIMARY
+from app.common.deadline import no_deadline
+from app.common.utils import on_release_change
+from app.metrics.registry import Counter
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'BloomFilter',
+    'build_bloom_filter',
+    'is_unknown_postcode',
+    'mark_unknown_postcode'
+]
+
+
+logger = getLogger("app")
+
+curr_dir, _ = split_path(abspath(__file__))
+queries_dir = join_path(curr_dir, "queries")
+
+with open(join_path(queries_dir, "postcodes.sql")) as fp:
+    postcodes_query = fp.read()
+
+# Number of bits, number of hashes.
+_header_struct = Struct("<QI")
+
+MASK_64 = 2 ** 64 - 1
+POLL_INTERVAL = 5  # seconds
+
+unknown_postcodes = Counter(
+    "easyread_unknown_postcodes",
+    "Number of postcodes answered as unknown without querying the database, by reason.",
+    labelnames=("reason",)
+)
+
+
+def _hash(item: bytes) -> Tuple[int, int]:
+    digest = blake2b(item, digest_size=16).digest()
+    # The second hash must be odd to reach every bit.
+    return int.from_bytes(digest[:8], "little"), int.from_bytes(digest[8:], "little") | 1
+
+
+class BloomFilter:
+    """
+    Read-only Bloom filter, memory-mapped from a file written by
+    ``build_bloom_filter`` - so that the workers on the node share one
+    copy of it.
+
+    Membership may be a false positive - at the rate the filter was
+    built for - but never a false negative.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+
+        with open(filename, "rb") as fp:
+            self._buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.size, self.hashes = _header_struct.unpack_from(self._buffer, 0)
+
+    def __contains__(self, item: str) -> bool:
+        first, second = _hash(item.encode())
+        buffer = self._buffer
+        offset = _header_struct.size
+
+        for index in range(self.hashes):
+            position = ((first + index * second) & MASK_64) % self.size
+            if not buffer[offset + (position >> 3)] >> (position & 7) & 1:
+                return False
+
+        return True
+
+
+def build_bloom_filter(source: str, target: str, error_rate: float) -> int:
+    """
+    Writes a Bloom filter of the lines of ``source`` into ``target``,
+    sized for the given false positive rate.
+
+    Returns
+    -------
+    int
+        Number of items in the filter.
+    """
+    # Only needed here - imported on first use.
+    import numpy as np
+
+    with open(source, "rb") as fp:
+        items = [item for item in fp.read().split(b"\n") if item]
+
+    # An empty filter would reject every postcode.
+    if not items:
+        raise ValueError(f"No items in '{source}'")
+
+    count = len(items)
+    size = ceil(-count * log(error_rate) / log(2) ** 2 / 8) * 8
+    hashes = max(round(size / count * log(2)), 1)
+
+    digests = b"".join(blake2b(item, digest_size=16).digest() for item in items)
+    values = np.frombuffer(digests, dtype="<u8").reshape(-1, 2)
+    first, second = values[:, 0], values[:, 1] | np.uint64(1)
+
+    bits = np.zeros(size, dtype=bool)
+    for index in range(hashes):
+        # Wraps around at 64 bits, as does `BloomFilter.__contains__`.
+        bits[(first + np.uint64(index) * second) % np.uint64(size)] = True
+
+    with open(f"{target}.tmp", "wb") as fp:
+        fp.write(_header_struct.pack(size, hashes))
+        fp.write(np.packbits(bits, bitorder="little").tobytes())
+
+    replace(f"{target}.tmp", target)
+
+    return len(items)
+
+
+class PostcodeFilter:
+    """
+    Bloom filter of the normalised postcodes in ``postcode_lookup``,
+    built once per release by one worker on the node and loaded by all.
+
+    Until the filter is available, all postcodes are let through.
+    """
+
+    def __init__(self):
+        self.filter: Union[BloomFilter, None] = None
+        self._task: Union[Task, None] = None
+
+    def _get_filename(self, timestamp: str) -> str:
+        return path.join(Settings.shared_cache_dir, f"postcodes-{timestamp.split('T')[0]}.bloom")
+
+    async def _build(self, filename: str):
+        source = f"{filename}.txt"
+
+        try:
+            # Postcodes missing from the filter are answered as unknown without
+            # querying the database: a lagging replica would leave out new ones.
+            async with Connection(role=PRIMARY) as conn:
+                await conn.copy_from_query(
+                    postcodes_query,
+                    output=source,
+                    timeout=Settings.postcode_filter_timeout
+                )
+
+            # Hashing millions of postcodes takes a few seconds.
+            count = await get_running_loop().run_in_executor(
+                None, build_bloom_filter, source, filename, Settings.postcode_filter_error_rate
+            )
+        finally:
+            if path.exists(source):
+                remove(source)
+
+        logger.info(f"Built a filter of {count} postcodes: {filename}")
+
+        # Workers still using a previous filter keep their mapping of it.
+        for name in listdir(Settings.shared_cache_dir):
+            previous = path.join(Settings.shared_cache_dir, name)
+            if name.startswith("postcodes-") and name.endswith(".bloom") and previous != filename:
+                remove(previous)
+
+    async def _load(self, timestamp: str):
+        makedirs(Settings.shared_cache_dir, exist_ok=True)
+        filename = self._get_filename(timestamp)
+
+        with open(path.join(Settings.shared_cache_dir, "postcodes.lock"), "a+b") as lock_file:
+            while not path.exists(filename):
+                try:
+                    lockf(lock_file, LOCK_EX | LOCK_NB)
+                except OSError:
+                    # Being built by another worker.
+                    await sleep(POLL_INTERVAL)
+                    continue
+
+                # The lock is released as the file is closed.
+                if not path.exists(filename):
+                    await self._build(filename)
+
+        self.filter = BloomFilter(filename)
+
+    async def _refresh(self, timestamp: str):
+        try:
+            await wait_for(self._load(timestamp), timeout=Settings.postcode_filter_timeout)
+        except Exception as err:
+            logger.warning(f"Failed to load the postcode filter: {err!r}")
+
+    def set_release(self, timestamp: str):
+        if not Settings.postcode_filter:
+            return
+
+        if self.filter is not None and self.filter.filename == self._get_filename(timestamp):
+            return
+
+        if self._task is not None and not self._task.done():
+            return
+
+        # Not bound by the deadline of the request that saw the release.
+        with no_deadline():
+            self._task = get_running_loop().create_task(self._refresh(timestamp))
+
+    def __contains__(self, postcode: str) -> bool:
+        return self.filter is None or postcode in self.filter
+
+
+postcode_filter = PostcodeFilter()
+
+# Postcodes for which the database returned nothing.
+_unknown: TTLCache = TTLCache(maxsize=Settings.negative_cache_size, ttl=Settings.negative_cache_ttl)
+
+
+def is_unknown_postcode(postcode: str) -> bool:
+    """
+    Whether the postcode is known not to exist, without querying the
+    database. Postcodes for which this returns ``False`` may still not
+    exist.
+    """
+    if postcode in _unknown:
+        unknown_postcodes.inc(reason="negative_cache")
+        return True
+
+    if postcode not in postcode_filter:
+        unknown_postcodes.inc(reason="filter")
+        return True
+
+    return False
+
+
+def mark_unknown_postcode(postcode: str):
+    _unknown[postcode] = True
+
+
+on_release_change(postcode_filter.set_release)
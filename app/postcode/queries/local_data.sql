@@ -9,7 +9,7 @@ WITH
      metrics AS (
         SELECT id, metric
         FROM covid19.metric_reference
-        WHERE metric ILIKE ANY($1::VARCHAR[])
+        WHERE id = ANY( $1::INT[] )
     ),
     data AS (
         -- Subquery necessary to push jobs to worker nodes.
@@ -28,6 +28,7 @@ WITH
                   JOIN metrics ON metrics.id = metric_id
                   JOIN location ON location.id = ts.area_id
               WHERE released IS TRUE
+                AND ts.metric_id = ANY( $1::INT[] )
               UNION ALL
               (
                   SELECT hash,
@@ -44,6 +45,7 @@ WITH
                       JOIN metrics ON metrics.id = metric_id
                       JOIN location ON location.id = ts.area_id
                   WHERE released IS TRUE
+                    AND ts.metric_id = ANY( $1::INT[] )
               )
               UNION ALL
               (
@@ -61,6 +63,7 @@ WITH
                       JOIN metrics ON metrics.id = metric_id
                       JOIN location ON location.id = ts.area_id
                   WHERE released IS TRUE
+                    AND ts.metric_id = ANY( $1::INT[] )
               )
               UNION ALL
               (
@@ -78,6 +81,7 @@ WITH
                       JOIN metrics ON metrics.id = metric_id
                       JOIN location ON location.id = ts.area_id
                   WHERE released IS TRUE
+                    AND ts.metric_id = ANY( $1::INT[] )
               )
         ) AS main_metrics
     ),
@@ -88,6 +92,7 @@ WITH
              JOIN metrics ON metrics.id = ts.metric_id
              JOIN location AS ref ON ref.id = ts.area_id
          WHERE released IS TRUE
+           AND ts.metric_id = ANY( $1::INT[] )
          OFFSET 0  -- offset necessary to push jobs down to worker nodes.
     )
 SELECT "areaCode", postcode, "areaType", "areaName", date, metric, value, priority
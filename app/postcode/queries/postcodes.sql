@@ -0,0 +1,3 @@
+SELECT DISTINCT UPPER(REPLACE(postcode, ' ', ''))
+FROM covid19.postcode_lookup
+WHERE postcode IS NOT NULL
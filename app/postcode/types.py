@@ -21,7 +21,6 @@ class LocalDataType(TypedDict):
     column_names: List[str]
     msoa_metric: str
     getter_metrics: List[str]
-    metrics: List[str]
 
 
 class QueryDataType(TypedDict):
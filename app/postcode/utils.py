@@ -11,6 +11,7 @@ from functools import lru_cache
 # 3rd party:
 
 # Internal:
+from app.diagnostics import register_cache
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -27,3 +28,6 @@ def get_validated_postcode(postcode: str) -> Union[str, None]:
         return extract
 
     return None
+
+
+register_cache("validated_postcodes", get_validated_postcode)
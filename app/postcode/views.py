@@ -7,17 +7,25 @@ from datetime import datetime
 from os.path import abspath, split as split_path, join as join_path
 from operator import itemgetter
 from json import load
-from typing import Union, Any
+from typing import Union, Any, List, TYPE_CHECKING
 
 # 3rd party:
 
-from pandas import DataFrame
+# Imported on first use; see `records_to_frame`.
+if TYPE_CHECKING:
+    from pandas import DataFrame
 
 # Internal:
 from .types import QueryDataType
 from .utils import get_validated_postcode
-from ..database.postgres import Connection
-from ..template_processor import render_template
+from .bloom import is_unknown_postcode, mark_unknown_postcode
+from ..database.postgres import Connection, PRIMARY, records_to_frame
+from ..template_processor import render_template, smallest_area_type, smallest_area_code
+from ..diagnostics import loop_phase
+from ..resilience import with_fallback
+from ..cache import cached_dataset
+from ..popularity import record_area_view
+from ..common.metric_registry import get_metric_ids
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -40,7 +48,7 @@ with open(join_path(assets_dir, "query_params.json")) as fp:
     query_data: QueryDataType = load(fp)
 
 
-async def get_postcode_data(conn: Any, timestamp: str, postcode: str) -> DataFrame:
+async def get_postcode_data(conn: Any, timestamp: str, postcode: str, metric_ids: List[int]) -> 'DataFrame':
     ts = datetime.fromisoformat(timestamp.replace("5Z", ""))
     partition_ts = f"{ts:%Y_%-m_%-d}"
     msoa_partition = f"{partition_ts}_msoa"
@@ -52,20 +60,21 @@ async def get_postcode_data(conn: Any, timestamp: str, postcode: str) -> DataFra
     )
 
     substitutes = (
-        query_data["local_data"]["metrics"],
+        metric_ids,
         postcode,
         f"{msoa_metric}%",
         ["%Percentage%", "%Rate%"]
     )
 
-    values = conn.fetch(query, *substitutes)
+    values = conn.fetch_prepared(query, *substitutes)
 
-    df = DataFrame(
-        await values,
-        columns=query_data["local_data"]["column_names"]
-    )
+    records = await values
 
-    df = df.assign(formatted_date=df.date.map(lambda x: f"{x:%-d %B %Y}"))
+    with loop_phase("dataframe:postcode"):
+        df = records_to_frame(
+            records,
+            columns=query_data["local_data"]["column_names"]
+        )
 
     return df
 
@@ -80,19 +89,48 @@ async def invalid_postcode_response(request, timestamp, raw_postcode):
     )
 
 
-async def postcode_page(request, timestamp: str, render=True) -> Union[render_template, DataFrame]:
+async def postcode_page(request, timestamp: str, render=True) -> Union[render_template, 'DataFrame']:
     postcode_raw = request.query_params["postcode"]
     postcode = get_validated_postcode(postcode_raw)
 
-    async with Connection() as conn:
-        data = await get_postcode_data(conn, timestamp, postcode)
+    # Spares the database queries for postcodes that cannot exist.
+    if postcode is None or is_unknown_postcode(postcode):
+        return await invalid_postcode_response(request, timestamp, postcode_raw)
+
+    async def fetch_from_db():
+        # Resolved before a connection is taken from the pool.
+        metric_ids = await get_metric_ids()
+
+        async with Connection() as conn:
+            data = await get_postcode_data(conn, timestamp, postcode, metric_ids)
+            from_primary = conn.is_primary
+
+        if data.size or from_primary:
+            return data
+
+        # Replicas may lag behind the release: a postcode is only taken
+        # to be unknown - and cached as such - once the primary agrees.
+        async with Connection(role=PRIMARY) as conn:
+            return await get_postcode_data(conn, timestamp, postcode, metric_ids)
+
+    async def fetch_data():
+        return await cached_dataset(timestamp, f"postcode:{postcode}", fetch_from_db)
+
+    data = await with_fallback(("postcode", postcode), fetch_data)
 
     if not data.size:
+        mark_unknown_postcode(postcode)
         return await invalid_postcode_response(request, timestamp, postcode_raw)
 
     if not render:
         return data
 
+    record_area_view(smallest_area_type(data), smallest_area_code(data), postcode)
+
+    # Imported here: `app.easy_read` depends on this module.
+    from app.easy_read.speculative import schedule_pdf_build
+    schedule_pdf_build(request, timestamp, data)
+
     return await render_template(
         request,
         "html/easy_read.html",
@@ -0,0 +1,239 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from asyncio import iscoroutine, TimeoutError as AsyncTimeoutError
+from logging import getLogger
+from time import monotonic
+from typing import Awaitable, Callable, TypeVar
+
+# 3rd party:
+from asyncpg import PostgresConnectionError, InterfaceError, TooManyConnectionsError
+from azure.core.exceptions import ServiceRequestError, ServiceResponseError, HttpResponseError
+
+# Internal:
+from app.config import Settings
+from app.common.deadline import DeadlineExceeded, get_timeout, with_deadline
+from app.metrics.registry import Counter, Gauge
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'CircuitBreaker',
+    'CircuitOpen',
+    'postgres_breaker',
+    'storage_breaker',
+    'is_dependency_failure'
+]
+
+
+T = TypeVar("T")
+
+logger = getLogger("app")
+
+CLOSED = "closed"
+HALF_OPEN = "half_open"
+OPEN = "open"
+
+STATE_VALUES = {
+    CLOSED: 0,
+    HALF_OPEN: 1,
+    OPEN: 2
+}
+
+breaker_state = Gauge(
+    "easyread_circuit_breaker_state",
+    "State of the circuit breaker of the worker: 0 closed, 1 half-open, 2 open.",
+    labelnames=("dependency",),
+    multiprocess_mode="all"
+)
+
+breaker_transitions = Counter(
+    "easyread_circuit_breaker_transitions",
+    "Number of state changes of the circuit breakers, by the state entered.",
+    labelnames=("dependency", "state")
+)
+
+breaker_rejected = Counter(
+    "easyread_circuit_breaker_rejected",
+    "Number of calls failed fast by an open circuit breaker.",
+    labelnames=("dependency",)
+)
+
+
+class CircuitOpen(ConnectionError):
+    def __init__(self, dependency: str, retry_after: float):
+        self.dependency = dependency
+        self.retry_after = retry_after
+        super().__init__(f"Circuit breaker for '{dependency}' is open.")
+
+
+def is_postgres_failure(err: Exception) -> bool:
+    return isinstance(err, (
+        PostgresConnectionError, InterfaceError, TooManyConnectionsError,
+        OSError, TimeoutError, AsyncTimeoutError
+    ))
+
+
+def is_storage_failure(err: Exception) -> bool:
+    # 4xx responses (e.g. a missing blob) are answers, not failures.
+    if isinstance(err, HttpResponseError):
+        return (err.status_code or 500) >= 500
+
+    return isinstance(err, (
+        ServiceRequestError, ServiceResponseError,
+        OSError, TimeoutError, AsyncTimeoutError
+    ))
+
+
+class CircuitBreaker:
+    """
+    Per-worker circuit breaker for a dependency.
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    calls fail immediately with ``CircuitOpen``. Once ``reset_timeout``
+    seconds have passed, it lets a limited number of probe calls through
+    (half-open): a successful probe closes the breaker, a failed one opens
+    it again for twice as long - up to ``max_reset_timeout``.
+    """
+
+    def __init__(self, name: str, is_failure: Callable[[Exception], bool],
+                 failure_threshold: int = Settings.breaker_failure_threshold,
+                 reset_timeout: float = Settings.breaker_reset_timeout,
+                 max_reset_timeout: float = Settings.breaker_max_reset_timeout,
+                 half_open_max_calls: int = 1):
+        self.name = name
+        self.is_failure = is_failure
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._current_reset_timeout = reset_timeout
+        self._probes = 0
+
+        breaker_state.set(STATE_VALUES[CLOSED], dependency=self.name)
+
+    @property
+    def retry_after(self) -> float:
+        return max(self._opened_at + self._current_reset_timeout - monotonic(), 0)
+
+    def _set_state(self, state: str):
+        if state == self.state:
+            return
+
+        self.state = state
+        breaker_state.set(STATE_VALUES[state], dependency=self.name)
+        breaker_transitions.inc(dependency=self.name, state=state)
+
+        if state == OPEN:
+            logger.warning(
+                f"Circuit breaker for '{self.name}' opened for {self._current_reset_timeout}s",
+                extra=dict(
+                    custom_dimensions=dict(
+                        event="circuit_breaker_opened",
+                        dependency=self.name,
+                        reset_timeout=self._current_reset_timeout,
+                        server_location=Settings.server_location
+                    )
+                )
+            )
+
+    def before_call(self):
+        """
+        Raises
+        ------
+        CircuitOpen
+            If the call is not allowed through.
+        """
+        if self.state == OPEN and self.retry_after <= 0:
+            self._set_state(HALF_OPEN)
+            self._probes = 0
+
+        if self.state == CLOSED:
+            return
+
+        if self.state == HALF_OPEN and self._probes < self.half_open_max_calls:
+            self._probes += 1
+            return
+
+        breaker_rejected.inc(dependency=self.name)
+        raise CircuitOpen(self.name, self.retry_after)
+
+    def record_success(self):
+        self._failures = 0
+
+        if self.state != CLOSED:
+            self._current_reset_timeout = self.reset_timeout
+            self._set_state(CLOSED)
+
+    def record_failure(self):
+        self._failures += 1
+
+        if self.state == HALF_OPEN:
+            self._current_reset_timeout = min(self._current_reset_timeout * 2, self.max_reset_timeout)
+        elif self._failures < self.failure_threshold:
+            return
+
+        self._opened_at = monotonic()
+        self._set_state(OPEN)
+
+    def _release_probe(self):
+        # The outcome of a probe is unknown: another may be let through.
+        if self.state == HALF_OPEN:
+            self._probes = max(self._probes - 1, 0)
+
+    async def call(self, awaitable: Awaitable[T], default_timeout: float,
+                   count_timeouts: bool = True) -> T:
+        """
+        Awaits ``awaitable`` through the breaker, bounded by the deadline
+        of the request (see ``with_deadline``).
+
+        Requests that run out of time say nothing about the health of the
+        dependency, and are not counted. Neither are timeouts without
+        ``count_timeouts`` - e.g. waits for resources of the worker.
+        """
+        try:
+            get_timeout(self.name, default_timeout)
+            self.before_call()
+        except (DeadlineExceeded, CircuitOpen):
+            if iscoroutine(awaitable):
+                awaitable.close()
+            raise
+
+        try:
+            result = await with_deadline(awaitable, self.name, default_timeout)
+        except Exception as err:
+            uncounted = isinstance(err, DeadlineExceeded) or (
+                not count_timeouts and isinstance(err, (TimeoutError, AsyncTimeoutError))
+            )
+
+            if uncounted:
+                self._release_probe()
+            elif self.is_failure(err):
+                self.record_failure()
+            else:
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelled.
+            self._release_probe()
+            raise
+
+        self.record_success()
+        return result
+
+
+def is_dependency_failure(err: Exception) -> bool:
+    """
+    Whether the error means that a dependency is unavailable, as opposed
+    to e.g. an invalid input.
+    """
+    return isinstance(err, CircuitOpen) or is_postgres_failure(err) or is_storage_failure(err)
+
+
+postgres_breaker = CircuitBreaker("postgresql", is_failure=is_postgres_failure)
+storage_breaker = CircuitBreaker("storage", is_failure=is_storage_failure)
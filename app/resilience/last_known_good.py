@@ -0,0 +1,132 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from contextvars import ContextVar
+from email.utils import formatdate
+from time import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, NamedTuple, TypeVar, Union
+
+# 3rd party:
+from cachetools import LRUCache
+from starlette.requests import Request
+from starlette.responses import Response
+
+# Internal:
+from app.config import Settings
+from app.diagnostics import register_cache
+from app.metrics.registry import Counter
+from .breaker import is_dependency_failure
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'with_fallback',
+    'store_page',
+    'get_stale_page',
+    'add_stale_headers',
+    'stale_since'
+]
+
+
+T = TypeVar("T")
+
+STALE_WARNING = '110 - "Response is Stale"'
+STALE_CACHE_CONTROL = "no-cache, max-age=0"
+
+lkg_served = Counter(
+    "easyread_last_known_good_served",
+    "Number of times a last-known-good result was used in place of a failed dependency.",
+    labelnames=("kind",)
+)
+
+
+class Entry(NamedTuple):
+    value: Any
+    stored: float
+
+
+# Time at which the oldest last-known-good item used in the current
+# request was stored, or `None` if the response is fresh.
+stale_since: ContextVar[Union[float, None]] = ContextVar("stale_since", default=None)
+
+_datasets: Dict[Hashable, Entry] = LRUCache(maxsize=Settings.lkg_max_datasets)
+_pages: Dict[str, Entry] = LRUCache(maxsize=Settings.lkg_max_pages)
+
+
+def _mark_stale(stored: float):
+    current = stale_since.get()
+    if current is None or stored < current:
+        stale_since.set(stored)
+
+
+async def with_fallback(key: Hashable, fetch: Callable[[], Awaitable[T]]) -> T:
+    """
+    Returns the result of ``fetch()`` and keeps it as the last-known-good
+    value for ``key``. If ``fetch`` fails because a dependency is down,
+    the last-known-good value is returned instead - and the request is
+    marked as stale - where there is one.
+    """
+    try:
+        result = await fetch()
+    except Exception as err:
+        entry = _datasets.get(key)
+        if entry is None or not is_dependency_failure(err):
+            raise
+
+        lkg_served.inc(kind="dataset")
+        _mark_stale(entry.stored)
+        return entry.value
+
+    _datasets[key] = Entry(result, time())
+    return result
+
+
+def _page_key(request: Request) -> str:
+    return f"{request.url.path}?{request.url.query}"
+
+
+def store_page(request: Request, response: Response):
+    # Pages rendered from stale data must not replace a fresh copy.
+    if response.status_code != 200 or stale_since.get() is not None:
+        return
+
+    # Keys do not include the host, on which the links in the pages
+    # depend: only pages rendered for the service domain are replayed.
+    if not Settings.service_domain or request.url.hostname != Settings.service_domain:
+        return
+
+    _pages[_page_key(request)] = Entry(
+        (response.body, response.media_type),
+        time()
+    )
+
+
+def add_stale_headers(response: Response, stored: float) -> Response:
+    response.headers["Warning"] = STALE_WARNING
+    response.headers["Age"] = str(max(int(time() - stored), 0))
+    response.headers["Last-Modified"] = formatdate(stored, usegmt=True)
+    response.headers["Cache-Control"] = STALE_CACHE_CONTROL
+    return response
+
+
+def get_stale_page(request: Request) -> Union[Response, None]:
+    """
+    Last-known-good copy of the page requested, with the staleness
+    headers set, or ``None`` if there is none.
+    """
+    entry = _pages.get(_page_key(request))
+
+    if entry is None:
+        return None
+
+    lkg_served.inc(kind="page")
+    body, media_type = entry.value
+    response = Response(body, media_type=media_type)
+
+    return add_stale_headers(response, entry.stored)
+
+
+register_cache("last_known_good:datasets", _datasets)
+register_cache("last_known_good:pages", _pages)
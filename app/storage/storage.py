@@ -5,36 +5,38 @@
 # Python:
 import logging
 from os import getenv
-from typing import Union, NoReturn
+from typing import Union, NoReturn, TYPE_CHECKING
 from gzip import compress
 from uuid import uuid4
 from urllib.parse import quote
 
 # 3rd party:
-from azure.storage.blob import (
-    BlobClient, BlobType, ContentSettings,
-    StorageStreamDownloader, StandardBlobTier,
-    BlobServiceClient, ContainerClient
-)
-
-from azure.storage.blob.aio import (
-    BlobClient as AsyncBlobClient,
-    StorageStreamDownloader as AsyncStorageStreamDownloader,
-    BlobServiceClient as AsyncBlobServiceClient,
-    ContainerClient as AsyncContainerClient,
-    BlobLeaseClient as AsyncBlobLeaseClient
-)
+# The Azure SDK takes a significant part of the start-up time of
+# a worker, so it is only imported once a client is created.
+if TYPE_CHECKING:
+    from azure.storage.blob import (
+        BlobClient, ContentSettings, StorageStreamDownloader, ContainerClient
+    )
+
+    from azure.storage.blob.aio import (
+        BlobClient as AsyncBlobClient,
+        StorageStreamDownloader as AsyncStorageStreamDownloader,
+        ContainerClient as AsyncContainerClient
+    )
 
 # Internal:
 from app.middleware.tracers.utils import trace_async_method_operation
+from app.config import Settings
+from app.diagnostics import loop_phase
+from app.common.deadline import no_deadline
+from app.resilience.breaker import storage_breaker
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 
 __all__ = [
     "StorageClient",
-    "AsyncStorageClient",
-    "BlobType"
+    "AsyncStorageClient"
 ]
 
 STORAGE_CONNECTION_STRING = getenv("DeploymentBlobStorage")
@@ -42,10 +44,20 @@ STORAGE_CONNECTION_STRING = getenv("DeploymentBlobStorage")
 DEFAULT_CONTENT_TYPE = "application/json; charset=utf-8"
 DEFAULT_CACHE_CONTROL = "no-cache, max-age=0, stale-while-revalidate=300"
 CONTENT_LANGUAGE = 'en-GB'
+BLOCK_BLOB = "BlockBlob"
+
+
+def __getattr__(name):
+    # Kept for backwards compatibility, without an eager import.
+    if name == "BlobType":
+        from azure.storage.blob import BlobType
+        return BlobType
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 class LockBlob:
-    def __init__(self, client: BlobClient, duration: int):
+    def __init__(self, client: 'BlobClient', duration: int):
         self.client = client
         self.lock = self.client.acquire_lease(duration)
 
@@ -109,6 +121,8 @@ class StorageClient:
                  content_disposition: Union[str, None] = None,
                  content_language: Union[str, None] = CONTENT_LANGUAGE,
                  tier: str = 'Hot', **kwargs):
+        from azure.storage.blob import ContentSettings, StandardBlobTier
+
         self._path = path
         self.compressed = compressed
         self._connection_string = connection_string
@@ -122,7 +136,7 @@ class StorageClient:
                 "Got <%r> instead." % tier
             )
 
-        self._content_settings: ContentSettings = ContentSettings(
+        self._content_settings: 'ContentSettings' = ContentSettings(
             content_type=content_type,
             cache_control=cache_control,
             content_encoding="gzip" if self.compressed else None,
@@ -134,7 +148,9 @@ class StorageClient:
         self._initialise()
 
     def _initialise(self):
-        self.client: BlobClient = BlobClient.from_connection_string(
+        from azure.storage.blob import BlobClient
+
+        self.client: 'BlobClient' = BlobClient.from_connection_string(
             conn_str=self._connection_string,
             container_name=self._container_name,
             blob_name=self._path,
@@ -186,7 +202,7 @@ class StorageClient:
 
         self.client.upload_blob(
             data=prepped_data,
-            blob_type=BlobType.BlockBlob,
+            blob_type=BLOCK_BLOB,
             content_settings=self._content_settings,
             overwrite=overwrite,
             standard_blob_tier=self._tier,
@@ -195,7 +211,7 @@ class StorageClient:
         )
         logging.info(f"Uploaded blob '{self._container_name}/{self.path}'")
 
-    def download(self) -> StorageStreamDownloader:
+    def download(self) -> 'StorageStreamDownloader':
         data = self.client.download_blob()
         logging.info(f"Downloaded blob '{self._container_name}/{self.path}'")
         return data
@@ -205,8 +221,10 @@ class StorageClient:
         logging.info(f"Deleted blob '{self._container_name}/{self.path}'")
 
     def list_blobs(self):
+        from azure.storage.blob import BlobServiceClient
+
         with BlobServiceClient.from_connection_string(self._connection_string) as client:
-            container: ContainerClient = client.get_container_client(self._container_name)
+            container: 'ContainerClient' = client.get_container_client(self._container_name)
             for blob in container.list_blobs(name_starts_with=self.path):
                 yield blob
 
@@ -215,6 +233,8 @@ class StorageClient:
         self.delete()
 
     def copy_blob(self, target_container: str, target_path: str):
+        from azure.storage.blob import BlobServiceClient
+
         with BlobServiceClient.from_connection_string(self._connection_string) as client:
             target_blob = client.get_blob_client(target_container, target_path)
             target_blob.start_copy_from_url(self.client.url)
@@ -242,7 +262,9 @@ class StorageClient:
 class AsyncLockBlob:
     _name = "Azure Blob"
 
-    def __init__(self, client: AsyncBlobClient, duration: int):
+    def __init__(self, client: 'AsyncBlobClient', duration: int):
+        from azure.storage.blob.aio import BlobLeaseClient as AsyncBlobLeaseClient
+
         self._client = client
         self._duration = duration
         self.id = str(uuid4())
@@ -262,7 +284,9 @@ class AsyncLockBlob:
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        await self.release()
+        # The lease must be released even if the request ran out of time.
+        with no_deadline():
+            await self.release()
 
     @trace_async_method_operation(
         "container", "path", "target",
@@ -272,7 +296,10 @@ class AsyncLockBlob:
         operation="PUT"
     )
     def release(self):
-        return self._lock.release()
+        return storage_breaker.call(
+            self._lock.release(),
+            Settings.storage_timeout
+        )
 
     @trace_async_method_operation(
         "container", "path", "target",
@@ -282,7 +309,10 @@ class AsyncLockBlob:
         operation="PUT"
     )
     def acquire(self):
-        return self._lock.acquire(self._duration)
+        return storage_breaker.call(
+            self._lock.acquire(self._duration),
+            Settings.storage_timeout
+        )
 
     @trace_async_method_operation(
         "container", "path", "target",
@@ -292,7 +322,10 @@ class AsyncLockBlob:
         operation="PUT"
     )
     def renew(self):
-        return self._lock.renew()
+        return storage_breaker.call(
+            self._lock.renew(),
+            Settings.storage_timeout
+        )
 
 
 class AsyncStorageClient:
@@ -305,6 +338,9 @@ class AsyncStorageClient:
                  content_disposition: Union[str, None] = None,
                  content_language: Union[str, None] = CONTENT_LANGUAGE,
                  tier: str = 'Hot', **kwargs):
+        from azure.storage.blob import ContentSettings, StandardBlobTier
+        from azure.storage.blob.aio import BlobClient as AsyncBlobClient
+
         self.path = path
         self.compressed = compressed
         self._connection_string = connection_string
@@ -318,7 +354,7 @@ class AsyncStorageClient:
                 "Got <%r> instead." % tier
             )
 
-        self._content_settings: ContentSettings = ContentSettings(
+        self._content_settings: 'ContentSettings' = ContentSettings(
             content_type=content_type,
             cache_control=cache_control,
             content_encoding="gzip" if self.compressed else None,
@@ -327,7 +363,7 @@ class AsyncStorageClient:
             **kwargs
         )
 
-        self.client: AsyncBlobClient = AsyncBlobClient.from_connection_string(
+        self.client: 'AsyncBlobClient' = AsyncBlobClient.from_connection_string(
             conn_str=connection_string,
             container_name=container,
             blob_name=path,
@@ -363,7 +399,10 @@ class AsyncStorageClient:
         operation="PUT"
     )
     async def set_tier(self, tier: str):
-        await self.client.set_standard_blob_tier(tier)
+        await storage_breaker.call(
+            self.client.set_standard_blob_tier(tier),
+            Settings.storage_timeout
+        )
 
     @trace_async_method_operation(
         "container", "path", "target", "url",
@@ -373,7 +412,10 @@ class AsyncStorageClient:
         operation="HEAD"
     )
     async def exists(self):
-        return await self.client.exists()
+        return await storage_breaker.call(
+            self.client.exists(),
+            Settings.storage_timeout
+        )
 
     @trace_async_method_operation(
         "container", "path", "target", "url",
@@ -383,7 +425,10 @@ class AsyncStorageClient:
         operation="DELETE"
     )
     async def delete(self):
-        response = await self.client.delete_blob()
+        response = await storage_breaker.call(
+            self.client.delete_blob(),
+            Settings.storage_timeout
+        )
         return response
 
     def lock_file(self, duration):
@@ -398,7 +443,10 @@ class AsyncStorageClient:
         operation="GET"
     )
     async def is_locked(self):
-        props = await self.client.get_blob_properties()
+        props = await storage_breaker.call(
+            self.client.get_blob_properties(),
+            Settings.storage_timeout
+        )
         return props.lease.status == "locked"
 
     @trace_async_method_operation(
@@ -409,7 +457,7 @@ class AsyncStorageClient:
         operation="PUT"
     )
     async def upload(self, data: Union[str, bytes], overwrite: bool = True,
-                     blob_type: BlobType = BlobType.BlockBlob) -> NoReturn:
+                     blob_type: str = BLOCK_BLOB) -> NoReturn:
         """
         Uploads blob data to the storage.
 
@@ -421,19 +469,21 @@ class AsyncStorageClient:
         overwrite: bool
             Whether to overwrite the file if it already exists. [Default: ``True``]
 
-        blob_type: BlobType
+        blob_type: str
+            One of the values of ``azure.storage.blob.BlobType``. [Default: ``BlockBlob``]
 
         Returns
         -------
         NoReturn
         """
         if self.compressed:
-            prepped_data = compress(data.encode() if isinstance(data, str) else data)
+            with loop_phase("gzip"):
+                prepped_data = compress(data.encode() if isinstance(data, str) else data)
         else:
             prepped_data = data
 
         kwargs = dict()
-        if blob_type == BlobType.BlockBlob:
+        if blob_type == BLOCK_BLOB:
             kwargs['standard_blob_tier'] = self._tier
 
         if self._lock:
@@ -450,7 +500,10 @@ class AsyncStorageClient:
             **kwargs
         )
 
-        return await upload
+        return await storage_breaker.call(
+            upload,
+            Settings.storage_timeout
+        )
 
     @trace_async_method_operation(
         "container", "path", "target", "url",
@@ -461,7 +514,10 @@ class AsyncStorageClient:
     )
     async def create_append_blob(self):
         process = self.client.create_append_blob(content_settings=self._content_settings)
-        return await process
+        return await storage_breaker.call(
+            process,
+            Settings.storage_timeout
+        )
 
     @trace_async_method_operation(
         "container", "path", "target", "url",
@@ -472,7 +528,10 @@ class AsyncStorageClient:
     )
     async def seal_append_blob(self):
         sealant = self.client.seal_append_blob(lease=self._lock)
-        return await sealant
+        return await storage_breaker.call(
+            sealant,
+            Settings.storage_timeout
+        )
 
     @trace_async_method_operation(
         "container", "path", "target", "url",
@@ -483,7 +542,8 @@ class AsyncStorageClient:
     )
     async def append_blob(self, data: Union[str, bytes]):
         if self.compressed:
-            prepped_data = compress(data.encode() if isinstance(data, str) else data)
+            with loop_phase("gzip"):
+                prepped_data = compress(data.encode() if isinstance(data, str) else data)
         else:
             prepped_data = data
 
@@ -496,7 +556,10 @@ class AsyncStorageClient:
             timeout=15
         )
 
-        return await upload
+        return await storage_breaker.call(
+            upload,
+            Settings.storage_timeout
+        )
 
     @trace_async_method_operation(
         "container", "path", "target", "url",
@@ -505,8 +568,11 @@ class AsyncStorageClient:
         action="download",
         operation="GET"
     )
-    async def download(self) -> AsyncStorageStreamDownloader:
-        data = await self.client.download_blob()
+    async def download(self) -> 'AsyncStorageStreamDownloader':
+        data = await storage_breaker.call(
+            self.client.download_blob(),
+            Settings.storage_timeout
+        )
         logging.info(f"Downloaded blob '{self.container}/{self.path}'")
         return data
 
@@ -518,8 +584,10 @@ class AsyncStorageClient:
         operation="GET"
     )
     async def list_blobs(self):
+        from azure.storage.blob.aio import BlobServiceClient as AsyncBlobServiceClient
+
         async with AsyncBlobServiceClient.from_connection_string(self._connection_string) as client:
-            container: AsyncContainerClient = client.get_container_client(self.container)
+            container: 'AsyncContainerClient' = client.get_container_client(self.container)
             async for blob in container.list_blobs(name_starts_with=self.path):
                 yield blob
 
@@ -531,7 +599,10 @@ class AsyncStorageClient:
         operation="GET"
     )
     async def download_chunks(self):
-        props = await self.client.get_blob_properties()
+        props = await storage_breaker.call(
+            self.client.get_blob_properties(),
+            Settings.storage_timeout
+        )
         blob_size = int(props['size'])
 
         chunk_size = 2 ** 22  # 4MB
@@ -550,7 +621,10 @@ class AsyncStorageClient:
                 break
 
             # aiohttp.client_exceptions.ClientPayloadError: 400, message='Can not decode content-encoding: gzip'
-            yield await data.readall()
+            yield await storage_breaker.call(
+                data.readall(),
+                Settings.storage_timeout
+            )
 
     @trace_async_method_operation(
         "container", "path", "target", "url",
@@ -561,7 +635,10 @@ class AsyncStorageClient:
     )
     async def download_into(self, fp):
         download_obj = await self.download()
-        await download_obj.readinto(fp)
+        await storage_breaker.call(
+            download_obj.readinto(fp),
+            Settings.storage_timeout
+        )
         fp.seek(0)
         return True
 
@@ -573,4 +650,7 @@ class AsyncStorageClient:
         operation="PUT"
     )
     async def set_tags(self, tags: dict[str, str]):
-        return await self.client.set_blob_tags(tags)
+        return await storage_breaker.call(
+            self.client.set_blob_tags(tags),
+            Settings.storage_timeout
+        )
@@ -5,13 +5,14 @@
 # Python:
 from functools import wraps, lru_cache
 from datetime import datetime, timedelta
-from typing import Union, Dict, Any, Optional
+from typing import Union, Dict, Any, Optional, TYPE_CHECKING
 import re
 
 # 3rd party:
 from starlette.templating import Jinja2Templates
 
-from pandas import DataFrame
+if TYPE_CHECKING:
+    from pandas import DataFrame
 
 from pytz import timezone
 
@@ -19,6 +20,7 @@ from pytz import timezone
 from ..config import Settings
 from .types import DataItem
 from ..common.utils import get_release_timestamp
+from ..diagnostics import loop_phase, register_cache
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
@@ -26,6 +28,7 @@ __all__ = [
     'template',
     'as_template_filter',
     'render_template',
+    'compile_templates',
     'smallest_area_name',
     'smallest_area_code',
     'smallest_area_type'
@@ -95,15 +98,33 @@ async def render_template(request, template_name: str, context: Optional[Dict[st
         **context
     )
 
-    if not render:
-        template_obj = template.get_template(template_name)
-        return template_obj.render(context)
+    with loop_phase(f"render:{template_name}"):
+        if not render:
+            template_obj = template.get_template(template_name)
+            return template_obj.render(context)
 
-    return template.TemplateResponse(
-        template_name,
-        status_code=status_code,
-        context=template_context
-    )
+        return template.TemplateResponse(
+            template_name,
+            status_code=status_code,
+            context=template_context
+        )
+
+
+def compile_templates(prefixes=("html/", "latex/")) -> int:
+    """
+    Loads and compiles all templates under ``prefixes`` ahead of use.
+
+    Returns
+    -------
+    int
+        Number of templates compiled.
+    """
+    names = template.env.list_templates(filter_func=lambda name: name.startswith(prefixes))
+
+    for name in names:
+        template.get_template(name)
+
+    return len(names)
 
 
 def process_msoa(value: float, metric: str) -> str:
@@ -134,7 +155,7 @@ def format_number(value: Union[int, float, str]) -> str:
 
 
 @as_template_filter
-def get_data(metric: str, data: DataFrame) -> DataItem:
+def get_data(metric: str, data: 'DataFrame') -> DataItem:
     float_metrics = ["Rate", "Percent"]
 
     try:
@@ -257,7 +278,7 @@ def comparison_verb(number, greater, smaller, same):
 
 
 @as_template_filter
-def smallest_area_name(df: DataFrame) -> str:
+def smallest_area_name(df: 'DataFrame') -> str:
     try:
         small_areas = (
             df
@@ -272,14 +293,21 @@ def smallest_area_name(df: DataFrame) -> str:
 
 
 @as_template_filter
-def smallest_area_type(df: DataFrame) -> str:
+def smallest_area_type(df: 'DataFrame') -> str:
     small_areas = df.sort_values("rank").iloc[0]
 
     return small_areas.areaType
 
 
 @as_template_filter
-def smallest_area_code(df: DataFrame) -> str:
+def smallest_area_code(df: 'DataFrame') -> str:
     small_areas = df.sort_values("rank").iloc[0]
 
     return small_areas.areaCode
+
+
+register_cache("jinja_templates", template.env.cache)
+register_cache("template_filter:trim_area_name", trim_area_name)
+register_cache("template_filter:format_timestamp", format_timestamp)
+register_cache("template_filter:format_date", format_date)
+register_cache("template_filter:as_date", as_date)
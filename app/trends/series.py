@@ -0,0 +1,294 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from array import array
+from asyncio import Lock
+from datetime import date, datetime, timedelta
+from logging import getLogger
+from math import isnan, nan
+from os.path import abspath, split as split_path, join as join_path
+from struct import Struct, error as StructError
+from typing import Dict, Iterable, List, Tuple, Union
+
+# 3rd party:
+
+# Internal:
+from app.config import Settings
+from app.database.postgres import Connection
+from app.cache import render_cache
+from app.common.metric_registry import MetricRegistry
+from app.common.utils import on_release_change
+from app.diagnostics import register_cache
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'TREND_METRICS',
+    'Series',
+    'TimeSeriesCache',
+    'get_trends'
+]
+
+
+logger = getLogger("app")
+
+curr_dir, _ = split_path(abspath(__file__))
+
+with open(join_path(curr_dir, "queries", "time_series.sql")) as fp:
+    time_series_query = fp.read()
+
+# Metrics shown as trends on the landing page, for England.
+TREND_METRICS = [
+    "newCasesBySpecimenDateRollingSum",
+    "newAdmissionsRollingSum",
+    "newDailyNsoDeathsByDeathDateRollingSum"
+]
+
+# Start of the histories.
+HISTORY_START = date(2020, 4, 1)
+
+SHARED_KEY = "trends:series"
+
+# Release timestamp length, number of series; then per series: name
+# length, first day (ordinal), number of days - followed by the values.
+_header_struct = Struct("<HH")
+_series_struct = Struct("<HII")
+
+
+class Series:
+    """
+    Daily values of a metric from ``start`` - a date ordinal - in a
+    compact array of doubles. Days without a value hold NaN.
+    """
+    __slots__ = ("start", "values")
+
+    def __init__(self, start: int, values: array):
+        self.start = start
+        self.values = values
+
+    @property
+    def first_date(self) -> date:
+        return date.fromordinal(self.start)
+
+    @property
+    def last_date(self) -> date:
+        return date.fromordinal(self.start + len(self.values) - 1)
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def tail(self, days: int) -> List[Tuple[date, float]]:
+        """
+        Dates and values of the last ``days`` days, gaps included.
+        """
+        offset = max(len(self.values) - days, 0)
+
+        return [
+            (date.fromordinal(self.start + offset + index), value)
+            for index, value in enumerate(self.values[offset:])
+        ]
+
+    def latest(self) -> Union[Tuple[date, float], None]:
+        for index in range(len(self.values) - 1, -1, -1):
+            if not isnan(self.values[index]):
+                return date.fromordinal(self.start + index), self.values[index]
+
+        return None
+
+    def merge(self, points: Iterable[Tuple[date, float]]) -> 'Series':
+        """
+        New series holding the values of this one, updated with - and
+        extended to - the given points.
+        """
+        points = [(day.toordinal(), nan if value is None else value) for day, value in points]
+
+        if not points:
+            return self
+
+        start = min(self.start, min(day for day, _ in points))
+        end = max(self.start + len(self.values) - 1, max(day for day, _ in points))
+
+        values = array("d", [nan]) * (end - start + 1)
+        offset = self.start - start
+        values[offset: offset + len(self.values)] = self.values
+
+        for day, value in points:
+            values[day - start] = value
+
+        return Series(start, values)
+
+    @classmethod
+    def from_points(cls, points: Iterable[Tuple[date, float]]) -> 'Series':
+        points = list(points)
+
+        if not points:
+            return cls(0, array("d"))
+
+        return cls(min(day for day, _ in points).toordinal(), array("d")).merge(points)
+
+
+def encode_series(release: str, series: Dict[str, 'Series']) -> bytes:
+    raw_release = release.encode()
+    parts = [_header_struct.pack(len(raw_release), len(series)), raw_release]
+
+    for name, item in series.items():
+        raw_name = name.encode()
+        parts.append(_series_struct.pack(len(raw_name), item.start, len(item.values)))
+        parts.append(raw_name)
+        parts.append(item.values.tobytes())
+
+    return b"".join(parts)
+
+
+def decode_series(data: bytes) -> Tuple[str, Dict[str, 'Series']]:
+    release_len, count = _header_struct.unpack_from(data)
+    offset = _header_struct.size
+    release = data[offset: offset + release_len].decode()
+    offset += release_len
+
+    series = dict()
+    for _ in range(count):
+        name_len, start, size = _series_struct.unpack_from(data, offset)
+        offset += _series_struct.size
+        name = data[offset: offset + name_len].decode()
+        offset += name_len
+
+        values = array("d")
+        values.frombytes(data[offset: offset + size * values.itemsize])
+        offset += size * values.itemsize
+
+        series[name] = Series(start, values)
+
+    return release, series
+
+
+class TimeSeriesCache:
+    """
+    Histories of the given metrics for England, kept per worker and
+    shared by all workers on the node through the render cache.
+
+    With each release, only the days from ``TRENDS_REVISION_DAYS``
+    before the latest day held are fetched - from the partition of the
+    release - and merged into the histories; the days before are taken
+    to be final. The full histories are only fetched by the first worker
+    to start on a node without them.
+
+    Where a release cannot be fetched, the histories of the previous
+    release are served.
+    """
+
+    def __init__(self, names: Iterable[str]):
+        self.registry = MetricRegistry(names)
+        self.release: Union[str, None] = None
+        self.series: Dict[str, Series] = dict()
+        self._lock: Union[Lock, None] = None
+
+    def __len__(self) -> int:
+        return len(self.series)
+
+    def _load_shared(self):
+        if Settings.shared_cache_slots <= 0:
+            return
+
+        value = render_cache.get(SHARED_KEY)
+        if value is None:
+            return
+
+        try:
+            release, series = decode_series(value)
+        except (StructError, UnicodeDecodeError) as err:
+            logger.warning(f"Discarded invalid time series from the shared cache: {err!r}")
+            return
+
+        if self.release is None or release > self.release:
+            self.release, self.series = release, series
+
+    def _get_since(self) -> date:
+        held = [self.series.get(name) for name in self.registry.names]
+
+        # Metrics added since, or without values so far, need their history.
+        if self.release is None or not all(held):
+            return HISTORY_START
+
+        return min(item.last_date for item in held) - timedelta(days=Settings.trends_revision_days)
+
+    async def _fetch(self, timestamp: str, since: date) -> Dict[str, List[Tuple[date, float]]]:
+        ts = datetime.fromisoformat(timestamp.replace("5Z", ""))
+        query = time_series_query.format(partition=f"{ts:%Y_%-m_%-d}_other")
+
+        # Resolved before a connection is taken from the pool.
+        metric_ids = await self.registry.get_ids()
+
+        async with Connection() as conn:
+            records = await conn.fetch(query, since, metric_ids)
+
+        # Names are resolved case-insensitively.
+        names = {name.lower(): name for name in self.registry.names}
+        points = {name: list() for name in self.registry.names}
+
+        for metric, day, value in records:
+            points[names[metric.lower()]].append((day, value))
+
+        return points
+
+    async def _update(self, timestamp: str):
+        since = self._get_since()
+        points = await self._fetch(timestamp, since)
+
+        if since == HISTORY_START:
+            series = {name: Series.from_points(items) for name, items in points.items()}
+        else:
+            series = {name: self.series[name].merge(items) for name, items in points.items()}
+
+        self.release, self.series = timestamp, series
+        logger.info(f"Time series updated for release {timestamp} from {since}")
+
+        if Settings.shared_cache_slots > 0:
+            render_cache.set(SHARED_KEY, encode_series(timestamp, series))
+
+    async def get(self, timestamp: str) -> Dict[str, Series]:
+        """
+        Returns the histories as of the release, updated first where
+        necessary.
+        """
+        if self.release is not None and timestamp <= self.release:
+            return self.series
+
+        if self._lock is None:
+            # Created on first use so that it binds to the running loop.
+            self._lock = Lock()
+
+        async with self._lock:
+            if self.release is None or timestamp > self.release:
+                self._load_shared()
+
+            if self.release is None or timestamp > self.release:
+                await self._update(timestamp)
+
+        return self.series
+
+    def refresh(self, timestamp: Union[str, None] = None):
+        # Metrics may be added with a release.
+        self.registry.refresh(timestamp)
+
+
+trends = TimeSeriesCache(TREND_METRICS)
+
+on_release_change(trends.refresh)
+
+register_cache("time_series", trends)
+
+
+async def get_trends(timestamp: str) -> Dict[str, Series]:
+    """
+    Returns the histories of ``TREND_METRICS`` as of the release - or
+    none, should they be unavailable: trends are not essential to the
+    pages.
+    """
+    try:
+        return await trends.get(timestamp)
+    except Exception as err:
+        logger.warning(f"Failed to update the time series: {err!r}")
+        return trends.series
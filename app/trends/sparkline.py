@@ -0,0 +1,89 @@
+#!/usr/bin python3
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from math import isnan
+from typing import List, Tuple, Union
+
+# 3rd party:
+from markupsafe import Markup
+
+# Internal:
+from app.config import Settings
+from app.template_processor import as_template_filter
+from .series import Series
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+__all__ = [
+    'sparkline'
+]
+
+
+WIDTH = 120
+HEIGHT = 24
+MARGIN = 1  # keeps the line clear of the edges
+
+
+def _get_segments(values: List[float]) -> List[List[Tuple[int, float]]]:
+    # Lines are broken on days without a value.
+    segments, current = list(), list()
+
+    for index, value in enumerate(values):
+        if isnan(value):
+            if current:
+                segments.append(current)
+            current = list()
+            continue
+
+        current.append((index, value))
+
+    if current:
+        segments.append(current)
+
+    return segments
+
+
+@as_template_filter
+def sparkline(series: Union[Series, None], label: str = "Trend",
+              days: Union[int, None] = None) -> Markup:
+    """
+    Renders the last ``days`` days of the series - ``TRENDS_DAYS`` by
+    default - as an inline SVG line, scaled to its own minimum and
+    maximum. Renders nothing for a missing or empty series.
+    """
+    if not series:
+        return Markup()
+
+    days = days or Settings.trends_days
+    points = series.tail(days)
+    values = [value for _, value in points]
+    present = [value for value in values if not isnan(value)]
+
+    if not present:
+        return Markup()
+
+    low, high = min(present), max(present)
+    x_scale = (WIDTH - 2 * MARGIN) / max(len(values) - 1, 1)
+    y_scale = (HEIGHT - 2 * MARGIN) / ((high - low) or 1)
+
+    lines = list()
+    for segment in _get_segments(values):
+        coordinates = " ".join(
+            f"{MARGIN + index * x_scale:.1f},{HEIGHT - MARGIN - (value - low) * y_scale:.1f}"
+            for index, value in segment
+        )
+        lines.append(f'<polyline points="{coordinates}"/>')
+
+    first_date, _ = points[0]
+    last_date, _ = points[-1]
+    description = f"{label} between {first_date:%-d %B %Y} and {last_date:%-d %B %Y}"
+
+    return Markup(
+        f'<svg class="sparkline" role="img" width="{WIDTH}" height="{HEIGHT}" '
+        f'viewBox="0 0 {WIDTH} {HEIGHT}" fill="none" stroke="currentColor" stroke-width="1.5">'
+        f'<title>{Markup.escape(description)}</title>'
+        f'{"".join(lines)}'
+        f'</svg>'
+    )
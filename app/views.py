@@ -3,22 +3,110 @@
 # Imports
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 # Python:
+from typing import Union
 
 # 3rd party:
+from starlette.requests import Request
 
 # Internal:
+from app.config import Settings
 from app.template_processor import render_template
-from app.common.utils import get_release_timestamp
+from app.common.utils import get_release_timestamp, get_synthetic_request
 from app.landing.views import get_home_page
 from app.postcode.views import postcode_page
+from app.area.views import area_page
+from app.resilience import stale_since, store_page, add_stale_headers
+from app.cache import get_cached_page, cache_page
+from app.popularity import record_cached_view, viewed_area
+from app.postcode.utils import get_validated_postcode
+from app.postcode.bloom import is_unknown_postcode
 
 # ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 
 
-async def base_router(request) -> render_template:
-    timestamp = await get_release_timestamp()
+def get_page_key(request) -> Union[str, None]:
+    """
+    Key of the page requested, made of its validated postcode or area
+    alone - so that spellings of the same postcode, and parameters the
+    pages ignore, share one entry in the caches. ``None`` for pages that
+    are not to be cached.
+    """
+    postcode = None
+
+    if "postcode" in request.query_params:
+        postcode = get_validated_postcode(request.query_params["postcode"])
+
+        # Invalid postcodes are echoed back in the page.
+        if postcode is None or is_unknown_postcode(postcode):
+            return None
+
+    if "area_code" in request.path_params:
+        area_type = request.path_params["area_type"]
+        area_code = request.path_params["area_code"].upper()
+        key = f"area:{area_type}:{area_code}"
+
+        # Pages of unknown areas fall back on the postcode.
+        return key if postcode is None else f"{key}:postcode:{postcode}"
+
+    if postcode is not None:
+        return f"postcode:{postcode}"
+
+    return "landing"
+
+
+def get_render_request(request: Request) -> Union[Request, None]:
+    """
+    The same request, made to the service domain. Pages link to their
+    assets by absolute URL, built from the host of the request - which
+    the client may set through ``X-Forwarded-Host``: pages shared through
+    the caches are only ever rendered for the service domain. ``None``
+    where the domain is not set.
+    """
+    if not Settings.service_domain:
+        return None
+
+    return get_synthetic_request(
+        request.scope["router"],
+        path=request.url.path,
+        query_string=request.url.query,
+        path_params=request.path_params
+    )
+
+
+async def get_page(request, timestamp: str) -> render_template:
+    if "area_code" in request.path_params:
+        return await area_page(request, timestamp)
 
     if "postcode" in request.query_params:
         return await postcode_page(request, timestamp)
 
     return await get_home_page(request, timestamp)
+
+
+async def base_router(request) -> render_template:
+    timestamp = await get_release_timestamp()
+    render_request = get_render_request(request)
+
+    # Pages rendered for the host of the request are not shared.
+    page_key = get_page_key(request) if render_request is not None else None
+
+    if page_key is not None:
+        cached = await get_cached_page(page_key, timestamp)
+        if cached is not None:
+            response, view = cached
+            if view is not None:
+                record_cached_view(view)
+            return response
+
+    # Connections may be kept alive across requests.
+    viewed_area.set(None)
+    response = await get_page(render_request or request, timestamp)
+
+    stored = stale_since.get()
+    if stored is not None:
+        return add_stale_headers(response, stored)
+
+    store_page(render_request or request, response)
+    cache_page(page_key, timestamp, response, render_request, viewed_area.get())
+
+    return response
@@ -0,0 +1,98 @@
+#!/usr/bin python3
+
+"""
+Copy queries
+============
+
+Runs the queries the service streams with ``copy_from_query`` - i.e.
+as ``COPY (<query>) TO STDOUT`` - against the database, and reports the
+number of rows and bytes each one returns.
+
+Fails if any of the queries is rejected - e.g. for a trailing semicolon,
+which is not allowed inside ``COPY (...)`` - or returns no rows.
+
+Usage - from the root of the repository, with the environment variables
+of the service set:
+
+    python benchmarks/copy_queries.py
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import sys
+from asyncio import run
+from os import getenv, path
+from time import perf_counter
+from typing import Dict, Tuple
+
+# 3rd party:
+from asyncpg import connect, PostgresError
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+ROOT_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+APP_DIR = path.join(ROOT_DIR, "app")
+
+# Queries passed to ``Connection.copy_from_query``.
+COPY_QUERIES: Dict[str, Tuple[str, ...]] = {
+    "postcodes": ("postcode", "queries", "postcodes.sql"),
+}
+
+
+def read(*parts: str) -> str:
+    with open(path.join(APP_DIR, *parts)) as fp:
+        return fp.read()
+
+
+async def copy(conn, query: str) -> Tuple[int, int, float]:
+    rows = size = 0
+
+    async def count(chunk: bytes):
+        nonlocal rows, size
+        rows += chunk.count(b"\n")
+        size += len(chunk)
+
+    start = perf_counter()
+    await conn.copy_from_query(query, output=count)
+
+    return rows, size, perf_counter() - start
+
+
+async def run_queries() -> bool:
+    conn = await connect(getenv("POSTGRES_CONNECTION_STRING"))
+
+    print(f"{'query':<16} {'rows':>10} {'bytes':>12} {'time (s)':>9}")
+
+    passed = True
+    try:
+        for name, parts in COPY_QUERIES.items():
+            try:
+                rows, size, elapsed = await copy(conn, read(*parts))
+            except PostgresError as err:
+                print(f"{name:<16} failed: {err!r}")
+                passed = False
+                continue
+
+            print(f"{name:<16} {rows:10d} {size:12d} {elapsed:9.2f}")
+            passed &= rows > 0
+    finally:
+        await conn.close()
+
+    return passed
+
+
+def main():
+    if not run(run_queries()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
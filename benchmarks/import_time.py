@@ -0,0 +1,112 @@
+#!/usr/bin python3
+
+"""
+Import-time budget
+==================
+
+Measures the import of ``app.main`` with ``python -X importtime`` in a
+fresh interpreter, lists the most expensive modules, and fails if the
+total exceeds the budget.
+
+Usage - from the root of the repository:
+
+    python benchmarks/import_time.py [--budget 0.5] [--top 20]
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import re
+import sys
+from argparse import ArgumentParser
+from os import environ, path
+from subprocess import run
+from typing import List, NamedTuple
+
+# 3rd party:
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+ROOT_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+APP_DIR = path.join(ROOT_DIR, "app")
+
+DEFAULT_BUDGET = 0.5  # seconds
+DEFAULT_TOP = 20
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)$")
+
+# Modules that are meant to be imported on first use only.
+DEFERRED_MODULES = ("pandas", "latex", "azure.storage.blob")
+
+
+class ImportTime(NamedTuple):
+    module: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+
+
+def measure(module: str = "app.main") -> List[ImportTime]:
+    env = {
+        **environ,
+        "PYTHONPATH": ROOT_DIR,
+        "PYTHONDONTWRITEBYTECODE": "1"
+    }
+
+    result = run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=APP_DIR,
+        env=env,
+        capture_output=True,
+        text=True
+    )
+
+    if result.returncode:
+        raise RuntimeError(f"Failed to import '{module}':\n{result.stderr}")
+
+    times = list()
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match is None:
+            continue
+
+        self_us, cumulative_us, indent, name = match.groups()
+        times.append(ImportTime(name, int(self_us), int(cumulative_us), len(indent) // 2))
+
+    return times
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("Author:")[0])
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds")
+    parser.add_argument("--top", type=int, default=DEFAULT_TOP)
+    args = parser.parse_args()
+
+    times = measure()
+    total = next(item for item in times if item.module == "app.main").cumulative_us / 1e6
+
+    print(f"{'cumulative (ms)':>16} {'self (ms)':>10}  module")
+    for item in sorted(times, key=lambda x: x.cumulative_us, reverse=True)[:args.top]:
+        print(f"{item.cumulative_us / 1000:16.1f} {item.self_us / 1000:10.1f}  {item.module}")
+
+    imported = {item.module for item in times}
+    eager = [name for name in DEFERRED_MODULES if name in imported]
+
+    print(f"\nTotal: {total:.3f}s - budget: {args.budget:.3f}s")
+
+    if eager:
+        print(f"Imported eagerly: {', '.join(eager)}")
+
+    if total > args.budget or eager:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+#!/usr/bin python3
+
+"""
+Prepared statements
+===================
+
+Measures what preparing the queries of the pages saves: each query is
+run ``--runs`` times as the pool runs it without preparing - parsed and
+planned on every call - and as many times through a statement prepared
+once on the connection, as ``Connection.fetch_prepared`` does.
+
+Also reports the planning time of each query, as measured by
+``EXPLAIN (ANALYZE, SUMMARY)``. Note that the server still plans the
+first five executions of a prepared statement for their arguments, and
+only then may settle on a generic plan; use ``--runs`` well above five.
+
+Usage - from the root of the repository, with the environment variables
+of the service set, connected directly or through a pooler in session
+mode:
+
+    python benchmarks/prepared_statements.py --date 2026-10-19 --postcode SW1A1AA [--runs 20]
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from argparse import ArgumentParser
+from asyncio import run
+from datetime import datetime
+from json import load, loads
+from os import getenv, path
+from statistics import median
+from time import perf_counter
+from typing import Any, Awaitable, Callable, List
+
+# 3rd party:
+from asyncpg import connect
+
+# Internal:
+from query_plans import APP_DIR, read, get_queries
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+
+async def measure(call: Callable[[], Awaitable[Any]], runs: int) -> List[float]:
+    timings = list()
+
+    for _ in range(runs):
+        start = perf_counter()
+        await call()
+        timings.append((perf_counter() - start) * 1000)
+
+    return timings
+
+
+async def get_planning_time(conn, query: str, args: List[Any]) -> float:
+    result = await conn.fetchval(f"EXPLAIN (ANALYZE, SUMMARY, FORMAT JSON) {query}", *args)
+    plan = (loads(result) if isinstance(result, str) else result)[0]
+
+    return plan["Planning Time"]
+
+
+async def compare(date: datetime, postcode: str, runs: int):
+    with open(path.join(APP_DIR, "common", "assets", "metrics.json")) as fp:
+        names = load(fp)
+
+    # As configured in the pool.
+    conn = await connect(getenv("POSTGRES_CONNECTION_STRING"), statement_cache_size=0)
+
+    try:
+        records = await conn.fetch(read("common", "queries", "metric_ids.sql"), names)
+        ids = [record["id"] for record in records]
+
+        print(f"{'query':<16} {'mode':<11} {'median (ms)':>12} {'min (ms)':>9}")
+
+        for name, ((query, args), _) in get_queries(date, postcode, names, ids).items():
+            # Warms the caches of the server for both modes alike.
+            await conn.fetch(query, *args)
+
+            unprepared = await measure(lambda: conn.fetch(query, *args), runs)
+
+            statement = await conn.prepare(query, name=f"benchmark_{name}")
+            prepared = await measure(lambda: statement.fetch(*args), runs)
+
+            for mode, timings in (("unprepared", unprepared), ("prepared", prepared)):
+                print(f"{name:<16} {mode:<11} {median(timings):12.2f} {min(timings):9.2f}")
+
+            planning = await get_planning_time(conn, query, args)
+            saved = median(unprepared) - median(prepared)
+            print(f"{name:<16} planning time: {planning:.2f}ms - saved per call: {saved:.2f}ms\n")
+    finally:
+        await conn.close()
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("Author:")[0])
+    parser.add_argument("--date", type=datetime.fromisoformat, required=True, help="date of the release")
+    parser.add_argument("--postcode", default="SW1A1AA", help="normalised - no spaces, upper case")
+    parser.add_argument("--runs", type=int, default=20)
+    args = parser.parse_args()
+
+    run(compare(args.date, args.postcode, args.runs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin python3
+
+"""
+Query plans
+===========
+
+Compares the plans of the queries of the pages as they are - filtering
+the time series by the IDs of the metrics - with the plans of the same
+queries matching the metrics by name, as they used to.
+
+For each query, reports the estimated cost - or, with ``--analyze``,
+the execution time - of both plans, and fails if the plan by ID still
+matches metric names with ``ILIKE`` or costs more than the plan by name.
+
+Usage - from the root of the repository, with the environment variables
+of the service set:
+
+    python benchmarks/query_plans.py --date 2026-10-19 --postcode SW1A1AA [--analyze]
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import re
+import sys
+from argparse import ArgumentParser
+from asyncio import run
+from datetime import datetime
+from json import load, loads
+from os import getenv, path
+from typing import Any, Dict, List, NamedTuple, Tuple
+
+# 3rd party:
+from asyncpg import connect
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+ROOT_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+APP_DIR = path.join(ROOT_DIR, "app")
+
+ILIKE_OPERATOR = "~~*"
+
+# Filters by ID, and the filters by name they replaced.
+METRIC_ID_FILTER = re.compile(r"\n\s*AND ts\.metric_id = ANY\( \$1::INT\[\] \)")
+METRIC_ID_CTE = "WHERE id = ANY( $1::INT[] )"
+METRIC_NAME_CTE = "WHERE metric ILIKE ANY( $1::VARCHAR[] )"
+
+
+class Plan(NamedTuple):
+    cost: float
+    time: float
+    uses_ilike: bool
+
+
+def read(*parts: str) -> str:
+    with open(path.join(APP_DIR, *parts)) as fp:
+        return fp.read()
+
+
+def get_queries(date: datetime, postcode: str, names: List[str],
+                ids: List[int]) -> Dict[str, Tuple[Tuple[str, List[Any]], Tuple[str, List[Any]]]]:
+    """
+    Returns, for each query, the query and its arguments by ID and by
+    name.
+    """
+    local_data = read("postcode", "queries", "local_data.sql").format(
+        msoa_partition=f"{date:%Y_%-m_%-d}_msoa",
+        partition_date=f"{date:%Y_%-m_%-d}"
+    )
+    local_data_by_name = METRIC_ID_FILTER.sub("", local_data).replace(METRIC_ID_CTE, METRIC_NAME_CTE)
+    local_args = [postcode, "newCasesBySpecimenDate%", ["%Percentage%", "%Rate%"]]
+
+    overview_data = read("landing", "queries", "overview_data.sql").format(
+        partition=f"{date:%Y_%-m_%-d}_other"
+    )
+    overview_data_by_name = overview_data.replace(
+        "AND metric_id = ANY( $2::INT[] )",
+        "AND metric = ANY( $2::VARCHAR[] )"
+    )
+
+    return {
+        "local_data": (
+            (local_data, [ids, *local_args]),
+            (local_data_by_name, [names, *local_args])
+        ),
+        "overview_data": (
+            (overview_data, [date, ids]),
+            (overview_data_by_name, [date, names])
+        )
+    }
+
+
+def find_ilike(node: Dict[str, Any]) -> bool:
+    conditions = " ".join(str(value) for key, value in node.items() if key.endswith(("Filter", "Cond")))
+
+    if ILIKE_OPERATOR in conditions:
+        return True
+
+    return any(find_ilike(child) for child in node.get("Plans", list()))
+
+
+async def explain(conn, query: str, args: List[Any], analyze: bool) -> Plan:
+    options = "ANALYZE, BUFFERS, FORMAT JSON" if analyze else "FORMAT JSON"
+    result = await conn.fetchval(f"EXPLAIN ({options}) {query}", *args)
+    plan = (loads(result) if isinstance(result, str) else result)[0]
+
+    return Plan(
+        cost=plan["Plan"]["Total Cost"],
+        time=plan.get("Execution Time", 0.0),
+        uses_ilike=find_ilike(plan["Plan"])
+    )
+
+
+async def compare(date: datetime, postcode: str, analyze: bool) -> bool:
+    with open(path.join(APP_DIR, "common", "assets", "metrics.json")) as fp:
+        names = load(fp)
+
+    conn = await connect(getenv("POSTGRES_CONNECTION_STRING"))
+
+    try:
+        records = await conn.fetch(read("common", "queries", "metric_ids.sql"), names)
+        ids = [record["id"] for record in records]
+
+        print(f"{len(ids)} of {len(names)} metrics resolved to IDs.\n")
+        print(f"{'query':<16} {'filter':<8} {'cost':>14} {'time (ms)':>10}  ILIKE")
+
+        passed = True
+        for name, (by_id, by_name) in get_queries(date, postcode, names, ids).items():
+            plan_by_id = await explain(conn, *by_id, analyze)
+            plan_by_name = await explain(conn, *by_name, analyze)
+
+            for label, plan in (("name", plan_by_name), ("id", plan_by_id)):
+                print(f"{name:<16} {label:<8} {plan.cost:14.2f} {plan.time:10.2f}  {'yes' if plan.uses_ilike else 'no'}")
+
+            passed &= not plan_by_id.uses_ilike and plan_by_id.cost <= plan_by_name.cost
+    finally:
+        await conn.close()
+
+    return passed
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("Author:")[0])
+    parser.add_argument("--date", type=datetime.fromisoformat, required=True, help="date of the release")
+    parser.add_argument("--postcode", default="SW1A1AA", help="normalised - no spaces, upper case")
+    parser.add_argument("--analyze", action="store_true", help="runs the queries")
+    args = parser.parse_args()
+
+    if not run(compare(args.date, args.postcode, args.analyze)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
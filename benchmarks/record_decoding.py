@@ -0,0 +1,151 @@
+#!/usr/bin python3
+
+"""
+Record decoding
+===============
+
+Compares the ways of turning the result sets of the page queries into
+data frames:
+
+- by row - as the pages used to - passing the asyncpg records to the
+  ``DataFrame`` as they are and formatting the date of each row;
+- by column, as ``records_to_frame`` does: the records are transposed
+  in one pass, the values parsed at once, and each distinct date
+  formatted once.
+
+The result sets are made up of asyncpg records shaped as those of the
+pages - 30 to 300 rows across a handful of areas and dates - so no
+database is needed.
+
+Usage - from the root of the repository:
+
+    python benchmarks/record_decoding.py [--rows 30 100 300] [--runs 500]
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+from argparse import ArgumentParser
+from datetime import date, timedelta
+from decimal import Decimal
+from importlib.util import module_from_spec, spec_from_file_location
+from json import load
+from os import path
+from random import Random
+from statistics import median
+from time import perf_counter
+from typing import Any, Callable, List
+
+# 3rd party:
+from asyncpg.protocol.protocol import _create_record
+from pandas import DataFrame
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+ROOT_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+APP_DIR = path.join(ROOT_DIR, "app")
+
+COLUMNS = ["areaCode", "postcode", "areaType", "areaName", "date", "metric", "value", "rank"]
+AREAS = [
+    ("E02000977", "msoa", "Westminster"),
+    ("E09000033", "ltla", "Westminster"),
+    ("E12000007", "region", "London"),
+    ("E92000001", "nation", "England")
+]
+DATES = 5
+
+
+def load_columnar():
+    # Loaded from its file: it depends on nothing else in the service,
+    # which then need not be configured.
+    module_path = path.join(APP_DIR, "database", "postgres", "columnar.py")
+    spec = spec_from_file_location("columnar", module_path)
+    module = module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def make_records(rows: int, seed: int = 0) -> List[Any]:
+    with open(path.join(APP_DIR, "common", "assets", "metrics.json")) as fp:
+        metrics = load(fp)
+
+    rand = Random(seed)
+    mapping = {name: index for index, name in enumerate(COLUMNS)}
+    latest = date(2026, 10, 19)
+    records = list()
+
+    for index in range(rows):
+        area_code, area_type, area_name = AREAS[index % len(AREAS)]
+        values = (
+            area_code,
+            "SW1A 1AA",
+            area_type,
+            area_name,
+            latest - timedelta(days=rand.randrange(DATES)),
+            metrics[index % len(metrics)],
+            Decimal(rand.randrange(100_000)) / 10,
+            index % len(AREAS) + 1
+        )
+        records.append(_create_record(mapping, values))
+
+    return records
+
+
+def by_row(records: List[Any]) -> DataFrame:
+    df = DataFrame(records, columns=COLUMNS)
+
+    return df.assign(formatted_date=df.date.map(lambda x: f"{x:%-d %B %Y}"))
+
+
+def measure(call: Callable[[], Any], runs: int) -> List[float]:
+    timings = list()
+
+    for _ in range(runs):
+        start = perf_counter()
+        call()
+        timings.append((perf_counter() - start) * 1_000_000)
+
+    return timings
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("Author:")[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[30, 100, 300])
+    parser.add_argument("--runs", type=int, default=500)
+    args = parser.parse_args()
+
+    records_to_frame = load_columnar().records_to_frame
+
+    print(f"{'rows':>5} {'decoding':<10} {'median (us)':>12} {'min (us)':>9}")
+
+    for rows in args.rows:
+        records = make_records(rows)
+
+        expected = by_row(records)
+        result = records_to_frame(records, COLUMNS)
+        assert result.columns.tolist() == expected.columns.tolist()
+        assert result.value.tolist() == expected.value.astype(float).tolist()
+        assert result.formatted_date.tolist() == expected.formatted_date.tolist()
+
+        timings = {
+            "by row": measure(lambda: by_row(records), args.runs),
+            "by column": measure(lambda: records_to_frame(records, COLUMNS), args.runs)
+        }
+
+        for label, values in timings.items():
+            print(f"{rows:>5} {label:<10} {median(values):12.1f} {min(values):9.1f}")
+
+        speedup = median(timings["by row"]) / median(timings["by column"])
+        print(f"{rows:>5} speed-up: {speedup:.1f}x\n")
+
+
+if __name__ == "__main__":
+    main()
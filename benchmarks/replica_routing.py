@@ -0,0 +1,109 @@
+#!/usr/bin python3
+
+"""
+Replica routing
+===============
+
+Runs reads through ``app.database.postgres`` against a primary and any
+number of replicas - e.g. local Postgres instances - and reports, each
+second, how many reads each endpoint served, how many failed, and the
+state of the circuit breakers.
+
+Stop and restart an instance while it runs to see the reads fail over
+to the others and return once the instance is back.
+
+Usage - from the root of the repository:
+
+    python benchmarks/replica_routing.py \
+        --primary postgresql://postgres@localhost:5432/postgres \
+        --replica postgresql://postgres@localhost:5433/postgres \
+        [--replica ...] [--concurrency 20] [--duration 60]
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import sys
+from argparse import ArgumentParser
+from asyncio import gather, run, sleep
+from collections import Counter
+from os import environ, path
+from time import monotonic
+
+# 3rd party:
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+ROOT_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+
+REPORT_INTERVAL = 1  # second
+READ_INTERVAL = 0.01  # seconds - per reader
+
+
+async def read_continuously(until: float, served: Counter):
+    from app.database.postgres import Connection
+
+    while monotonic() < until:
+        try:
+            async with Connection() as conn:
+                await conn.fetchval("SELECT 1;")
+                served[conn._endpoint.name] += 1
+        except Exception as err:
+            served[f"failed:{type(err).__name__}"] += 1
+
+        await sleep(READ_INTERVAL)
+
+
+async def report(until: float, served: Counter):
+    from app.database.postgres import get_endpoints
+
+    while monotonic() < until:
+        await sleep(REPORT_INTERVAL)
+
+        counts = ", ".join(f"{key}: {value}" for key, value in sorted(served.items())) or "-"
+        breakers = ", ".join(f"{item.name}: {item.breaker.state}" for item in get_endpoints())
+        print(f"served {counts} | breakers {breakers}")
+
+        served.clear()
+
+
+async def route(concurrency: int, duration: float):
+    from app.database.postgres import close_pools
+
+    until = monotonic() + duration
+    served = Counter()
+
+    try:
+        await gather(
+            report(until, served),
+            *(read_continuously(until, served) for _ in range(concurrency))
+        )
+    finally:
+        await close_pools()
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("Author:")[0])
+    parser.add_argument("--primary", required=True)
+    parser.add_argument("--replica", action="append", default=list(), dest="replicas")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=60, help="seconds")
+    args = parser.parse_args()
+
+    # Read as the service is imported.
+    environ["POSTGRES_CONNECTION_STRING"] = args.primary
+    environ["POSTGRES_REPLICA_CONNECTION_STRINGS"] = " ".join(args.replicas)
+    sys.path.insert(0, ROOT_DIR)
+
+    run(route(args.concurrency, args.duration))
+
+
+if __name__ == "__main__":
+    main()
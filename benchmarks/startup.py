@@ -0,0 +1,120 @@
+#!/usr/bin python3
+
+"""
+Worker start-up
+===============
+
+Starts a fresh worker - a single uvicorn process serving ``app.main`` -
+and reports the time from the start of the process to:
+
+- the first response to the liveness probe, i.e. the point at which
+  the worker accepts traffic - after the warm-up, where enabled;
+- the first response to each of the paths given with ``--path``.
+
+Each run uses a new process; the median of the runs is reported.
+
+Usage - from the root of the repository, with the environment variables
+of the service set:
+
+    python benchmarks/startup.py [--runs 5] [--path /easy_read ...]
+
+Author:        Pouria Hadjibagheri <pouria.hadjibagheri@phe.gov.uk>
+Created:       19 Oct 2026
+License:       MIT
+Contributors:  Pouria Hadjibagheri
+"""
+
+# Imports
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# Python:
+import sys
+import socket
+from argparse import ArgumentParser
+from os import environ, path
+from statistics import median
+from subprocess import Popen, DEVNULL
+from time import perf_counter, sleep
+from typing import Dict, List
+from urllib.error import URLError, HTTPError
+from urllib.request import urlopen
+
+# 3rd party:
+
+# Internal:
+
+# ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+ROOT_DIR = path.dirname(path.dirname(path.abspath(__file__)))
+APP_DIR = path.join(ROOT_DIR, "app")
+
+LIVENESS_PATH = "/healthcheck/live"
+POLL_INTERVAL = 0.01  # seconds
+STARTUP_TIMEOUT = 120  # seconds
+
+
+def get_free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_response(url: str, timeout: float) -> int:
+    deadline = perf_counter() + timeout
+
+    while perf_counter() < deadline:
+        try:
+            with urlopen(url, timeout=timeout) as response:
+                return response.status
+        except HTTPError as err:
+            # Any response - including an error page - means the worker
+            # is serving requests.
+            return err.code
+        except (URLError, ConnectionError):
+            sleep(POLL_INTERVAL)
+
+    raise TimeoutError(f"No response from {url} within {timeout}s")
+
+
+def run_once(paths: List[str]) -> Dict[str, float]:
+    port = get_free_port()
+    base_url = f"http://127.0.0.1:{port}"
+
+    start = perf_counter()
+    process = Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=APP_DIR,
+        env={**environ, "PYTHONPATH": ROOT_DIR},
+        stdout=DEVNULL,
+        stderr=DEVNULL
+    )
+
+    try:
+        wait_for_response(base_url + LIVENESS_PATH, STARTUP_TIMEOUT)
+        timings = {"ready": perf_counter() - start}
+
+        for url_path in paths:
+            wait_for_response(base_url + url_path, STARTUP_TIMEOUT)
+            timings[url_path] = perf_counter() - start
+    finally:
+        process.terminate()
+        process.wait()
+
+    return timings
+
+
+def main():
+    parser = ArgumentParser(description=__doc__.split("Author:")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--path", action="append", default=list(), dest="paths")
+    args = parser.parse_args()
+
+    runs = [run_once(args.paths) for _ in range(args.runs)]
+
+    print(f"{'median (s)':>11} {'min (s)':>8} {'max (s)':>8}  time to first response")
+    for key in runs[0]:
+        values = [item[key] for item in runs]
+        print(f"{median(values):11.3f} {min(values):8.3f} {max(values):8.3f}  {key}")
+
+
+if __name__ == "__main__":
+    main()
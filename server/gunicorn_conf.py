@@ -16,7 +16,8 @@ Contributors:  Pouria Hadjibagheri
 # Python:
 from json import dumps
 from multiprocessing import cpu_count
-from os import getenv
+from os import getenv, listdir, remove, makedirs, path
+from shutil import rmtree
 
 # 3rd party:
 
@@ -68,6 +69,9 @@ use_errorlog = errorlog_var or None
 graceful_timeout_str = getenv("GRACEFUL_TIMEOUT", "120")
 timeout_str = getenv("TIMEOUT", "120")
 keepalive_str = getenv("KEEP_ALIVE", "5")
+metrics_dir = getenv("METRICS_MULTIPROC_DIR", "/dev/shm/easyread-metrics")
+shared_cache_dir = getenv("SHARED_CACHE_DIR", "/dev/shm/easyread-cache")
+use_preload = getenv("PRELOAD", "0") == "1"
 
 # Gunicorn config variables
 loglevel = use_loglevel
@@ -102,6 +106,45 @@ log_data = {
     "proxy_protocol": proxy_protocol,
     "host": host,
     "port": port,
+    "metrics_dir": metrics_dir,
+    "shared_cache_dir": shared_cache_dir,
+    "preload": use_preload,
 }
 
 print(dumps(log_data))
+
+
+def on_starting(server):
+    # Values left behind by a previous run of the master must not be
+    # merged into the metrics of this one.
+    rmtree(metrics_dir, ignore_errors=True)
+    makedirs(metrics_dir, exist_ok=True)
+
+    # Entries of a previous run may have been stored by a different
+    # version of the app.
+    rmtree(shared_cache_dir, ignore_errors=True)
+
+
+def when_ready(server):
+    # Runs in the master once, before the first workers are forked. This
+    # is not gunicorn's ``preload_app``: the app itself must still be
+    # built in each worker - see ``app.common.preload``.
+    if not use_preload:
+        return
+
+    from app.common.preload import preload
+
+    print(dumps(preload()))
+
+
+def child_exit(server, worker):
+    # Gauges of dead workers are dropped; counters and histograms are
+    # kept so that the totals exposed on ``/metrics`` remain monotonic.
+    suffix = f"_{worker.pid}.db"
+
+    for filename in listdir(metrics_dir):
+        if filename.startswith("gauge_") and filename.endswith(suffix):
+            try:
+                remove(path.join(metrics_dir, filename))
+            except FileNotFoundError:
+                pass